@@ -0,0 +1,109 @@
+"""Бенчмарк поиска и замены в открытом документе.
+
+Открывает ModernCodeEditor с файлом из --lines строк, в каждой строке есть
+совпадение, и измеряет:
+- полный поиск: от ввода запроса до готового индекса совпадений (снимок
+  документа в GUI-потоке, поиск в фоне) - для простого текста, с учетом
+  регистра и для регулярного выражения;
+- ввод символа в документ при открытой панели: индекс обновляется по
+  contentsChange, счетчик совпадений - сразу;
+- замену всех совпадений (одно действие отмены) и ее отмену.
+
+Для сравнения число совпадений считается циклом QTextDocument.find, как
+это сделал бы поиск без индекса на каждое изменение.
+
+Запуск из корня репозитория:
+    python -m benchmarks.find_replace_benchmark [--lines 100000] [--keys 200]
+"""
+import argparse
+import sys
+import time
+
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtWidgets import QApplication
+
+from widgets.QCodeEditor import ModernCodeEditor
+
+
+def make_text(lines: int) -> str:
+    return "\n".join(f"result_{number} = compute_total(value_{number}) + offset" for number in range(lines))
+
+
+def timed(action) -> float:
+    start = time.perf_counter()
+    action()
+    QApplication.processEvents()
+    return time.perf_counter() - start
+
+
+def wait_for_search(panel):
+    while panel._search_revision is not None:
+        QApplication.processEvents()
+        time.sleep(0.0005)
+
+
+def search(panel, text: str, case_sensitive: bool = False, regex: bool = False):
+    panel.case_button.setChecked(case_sensitive)
+    panel.regex_button.setChecked(regex)
+    panel.find_input.setText(text)
+    wait_for_search(panel)
+
+
+def naive_count(document: QTextDocument, text: str) -> int:
+    count = 0
+    found = document.find(text, 0)
+    while not found.isNull():
+        count += 1
+        found = document.find(text, found.selectionEnd())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--keys", type=int, default=200)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    widget = ModernCodeEditor(language="py")
+    widget.resize(900, 700)
+    widget.show()
+    widget.set_code(make_text(args.lines))
+    app.processEvents()
+    editor, panel = widget.editor, widget.find_panel
+    panel.show_find(replace=True)
+
+    results = [
+        ("naive count", timed(lambda: naive_count(editor.document(), "compute_total"))),
+        ("search text", timed(lambda: search(panel, "compute_total"))),
+        ("search case", timed(lambda: search(panel, "compute_total", case_sensitive=True))),
+        ("search regex", timed(lambda: search(panel, r"value_\d+", regex=True))),
+    ]
+    matches = len(panel.index)
+
+    search(panel, "compute_total", case_sensitive=True)
+    cursor = editor.textCursor()
+    cursor.setPosition(editor.document().findBlockByNumber(args.lines // 2).position())
+    editor.setTextCursor(cursor)
+    typed = "compute_total "
+    start = time.perf_counter()
+    for number in range(args.keys):
+        editor.insertPlainText(typed[number % len(typed)])
+    app.processEvents()
+    results.append(("type char", (time.perf_counter() - start) / args.keys))
+    counted = panel.count_label.text()
+
+    panel.replace_input.setText("calculate_sum")
+    results += [
+        ("replace all", timed(panel.replace_all)),
+        ("undo", timed(editor.undo)),
+    ]
+    wait_for_search(panel)
+
+    print(f"{args.lines} lines, {matches} regex matches, after typing: {counted}")
+    for name, seconds in results:
+        print(f"{name:<14} {seconds * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
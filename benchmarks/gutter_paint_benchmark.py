@@ -0,0 +1,113 @@
+"""Бенчмарк отрисовки полей с номерами строк редактора.
+
+Открывает CodeEditor с длинным файлом, прокручивает его в середину и
+отрисовывает поле номеров строк целиком и полосой одной строки (как при
+правке). Сравниваются:
+- legacy: прежний line_number_area_paint_event - градиент и жирный шрифт
+  создаются при каждой отрисовке, номер выводится drawText;
+- cached: widgets.GutterRenderer.GutterRenderer - заранее растеризованные
+  цифры и кеш картинок номеров.
+
+Дополнительно считается, сколько раз поле перерисовывается за серию
+миганий курсора (updateRequest с прямоугольником курсора).
+
+Запуск из корня репозитория:
+    python -m benchmarks.gutter_paint_benchmark [--lines 20000] [--repeat 500]
+"""
+import argparse
+import sys
+import time
+
+from PyQt5.QtCore import QPoint, QRect, Qt
+from PyQt5.QtGui import QColor, QFont, QLinearGradient, QPainter, QPixmap, QRegion
+from PyQt5.QtWidgets import QApplication
+
+from widgets.QCodeEditor import CodeEditor
+
+
+def legacy_paint_event(editor: CodeEditor, event):
+    painter = QPainter(editor.line_number_area)
+    painter.fillRect(event.rect(), QColor("#1E1E1E"))
+    gradient = QLinearGradient(0, 0, editor.line_number_area.width(), 0)
+    gradient.setColorAt(0, QColor("#1E1E1E"))
+    gradient.setColorAt(1, QColor("#2D3139"))
+    painter.fillRect(QRect(editor.line_number_area.width() - 2, 0, 2, editor.height()), gradient)
+
+    block = editor.firstVisibleBlock()
+    block_number = block.blockNumber()
+    top = editor.blockBoundingGeometry(block).translated(editor.contentOffset()).top()
+    bottom = top + editor.blockBoundingRect(block).height()
+    current_line = editor.textCursor().blockNumber() + 1
+    line_height = editor.fontMetrics().height()
+    while block.isValid() and top <= event.rect().bottom():
+        if block.isVisible() and bottom >= event.rect().top():
+            if block_number + 1 == current_line:
+                painter.setPen(QColor("#FFFFFF"))
+                painter.setFont(QFont("Cascadia Code", editor.font().pointSize(), QFont.Bold))
+            else:
+                painter.setPen(QColor("#6E7681"))
+                painter.setFont(editor.font())
+            painter.drawText(0, int(top), editor.line_number_area.width() - 8,
+                             int(line_height), Qt.AlignRight, str(block_number + 1))
+        block = block.next()
+        top = bottom
+        bottom = top + editor.blockBoundingRect(block).height()
+        block_number += 1
+
+
+def measure(editor: CodeEditor, repeat: int):
+    area = editor.line_number_area
+    pixmap = QPixmap(area.size())
+    line_height = editor.fontMetrics().height()
+    band = QRegion(QRect(0, 5 * line_height, area.width(), line_height))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        area.render(pixmap, QPoint(), QRegion(area.rect()))
+    full = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        area.render(pixmap, QPoint(), band)
+    line = (time.perf_counter() - start) / repeat
+    return full, line
+
+
+def count_blink_updates(editor: CodeEditor, repeat: int) -> int:
+    area = editor.line_number_area
+    updates = []
+    area.update = lambda *args: updates.append(args)
+    cursor = editor.cursorRect()
+    for _ in range(repeat):
+        editor.updateRequest.emit(QRect(cursor.x(), cursor.y(), 2, cursor.height()), 0)
+    del area.update
+    return len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    editor = CodeEditor(language="py")
+    editor.resize(900, 900)
+    editor.show()
+    editor.load_text("\n".join(f"value_{number} = {number}" for number in range(args.lines)))
+    editor.verticalScrollBar().setValue(args.lines // 2)
+    app.processEvents()
+
+    cached = measure(editor, args.repeat)
+    blink_updates = count_blink_updates(editor, args.repeat)
+    editor.line_number_area_paint_event = lambda event: legacy_paint_event(editor, event)
+    legacy = measure(editor, args.repeat)
+
+    print(f"{'mode':<8} {'full ms':>9} {'line ms':>9}")
+    for mode, (full, line) in (("legacy", legacy), ("cached", cached)):
+        print(f"{mode:<8} {full * 1000:>9.3f} {line * 1000:>9.3f}")
+    print(f"gutter updates for {args.repeat} cursor blinks: {blink_updates} (legacy: {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Микро-бенчмарк подсветки синтаксиса.
+
+Сравнивает скорость (строк в секунду) старого пути - отдельный QRegExp на
+каждое правило из LanguageConfig.syntax_rules, как в прежнем
+ModernSyntaxHighlighter._compile_rules - и однопроходного HighlightEngine
+для каждого зарегистрированного провайдера языка. Для языков на лексерах
+Pygments проверяется, что строки из PYGMENTS_CHECKS подсвечиваются.
+
+Запуск из корня репозитория:
+    python -m benchmarks.highlight_benchmark [--lines 20000]
+"""
+import argparse
+import time
+
+from PyQt5.QtCore import QRegExp
+
+from utils.CodeAnalyzer import LanguageProviderFactory
+from utils.SyntaxEngine import HighlightEngine, STATE_NORMAL, create_highlight_engine
+
+
+SAMPLES = {
+    "py": '''class User(Base):
+    """Пользователь системы"""
+    def __init__(self, name, age=42):
+        self.name = name  # имя
+        self.age = age * 1.5e3
+        if self.age > 10 and name is not None:
+            return f"{name}: {self.age}"
+''',
+    "js": '''export default class Widget extends Base {
+    /* блочный комментарий */
+    constructor(name) { super(); this.name = name; }
+    render() {
+        const items = [1, 2.5, 3e4].map(x => `item ${x}`);
+        return document.querySelector("#app") || null; // fallback
+    }
+}
+''',
+    "html": '''<div class="container" id="main">
+    <!-- комментарий -->
+    <a href="https://example.com" title='link'>Example</a>
+    <img src="logo.png" alt="Logo"/>
+</div>
+''',
+    "css": '''/* тема */
+.container #main {
+    color: #ffffff;
+    background: "url(bg.png)";
+    margin-left: 10px;
+}
+''',
+    "json": '''{
+    "name": "PyScribe",
+    "version": 1.5,
+    "enabled": true,
+    "items": [1, 2, 3, null]
+}
+''',
+    "cs": '''using System;
+#region Models
+public class Program {
+    /* entry point */
+    static void Main(string[] args) {
+        var count = 42; // counter
+        Console.WriteLine("Hello " + 'c' + count);
+    }
+}
+''',
+}
+
+# Языки на Pygments: текст, номера строк кода (должны получить токены) и
+# номера строк блочного комментария (целиком один токен)
+PYGMENTS_CHECKS = {
+    "php": ('''<?php
+$x = "hello"; // c
+function foo($a) {
+    echo $x;
+}
+''', (1, 2, 3), ()),
+    "rb": ('''=begin
+def x
+=end
+def y; end
+''', (3,), (0, 1, 2)),
+}
+
+
+def build_lines(language: str, count: int):
+    sample = SAMPLES.get(language, SAMPLES["py"]).splitlines()
+    return [sample[i % len(sample)] for i in range(count)]
+
+
+def bench_legacy(config, lines):
+    """Прежний путь: N полных сканирований строки на N правил"""
+    rules = [QRegExp(rule.pattern) for rule in config.syntax_rules]
+    start = time.perf_counter()
+    spans = 0
+    for text in lines:
+        for regex in rules:
+            index = regex.indexIn(text)
+            while index >= 0:
+                length = regex.matchedLength()
+                if length <= 0:
+                    break
+                spans += 1
+                index = regex.indexIn(text, index + length)
+    return time.perf_counter() - start, spans
+
+
+def bench_engine(config, lines):
+    """Однопроходный движок с множеством ключевых слов"""
+    engine = HighlightEngine(config)
+    start = time.perf_counter()
+    spans = 0
+    state = STATE_NORMAL
+    for text in lines:
+        tokens, state = engine.tokenize(text, state)
+        spans += len(tokens)
+    return time.perf_counter() - start, spans
+
+
+def check_pygments():
+    """Ошибки подсветки образцов PYGMENTS_CHECKS (пустой список - все в порядке)"""
+    failures = []
+    for language, (sample, code_lines, comment_lines) in PYGMENTS_CHECKS.items():
+        engine = create_highlight_engine(LanguageProviderFactory.get_language_config(language))
+        state = STATE_NORMAL
+        for number, text in enumerate(sample.splitlines()):
+            tokens, state = engine.tokenize(text, state)
+            if number in code_lines and not tokens:
+                failures.append(f"{language}: line {number + 1} {text!r} has no tokens")
+            if number in comment_lines and [token[:2] for token in tokens] != [(0, len(text))]:
+                failures.append(f"{language}: line {number + 1} {text!r} is not a single comment token")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'language':<10} {'legacy lines/s':>16} {'engine lines/s':>16} {'speedup':>8} {'spans':>14}")
+    for language in sorted(LanguageProviderFactory._providers):
+        config = LanguageProviderFactory.get_language_config(language)
+        if not config.syntax_rules:
+            # Языки на лексерах Pygments старого пути не имеют
+            continue
+        lines = build_lines(language, args.lines)
+
+        legacy_time, legacy_spans = bench_legacy(config, lines)
+        engine_time, engine_spans = bench_engine(config, lines)
+
+        legacy_rate = len(lines) / legacy_time
+        engine_rate = len(lines) / engine_time
+        print(f"{language:<10} {legacy_rate:>16,.0f} {engine_rate:>16,.0f} "
+              f"{engine_rate / legacy_rate:>7.2f}x {legacy_spans:>6}/{engine_spans:<7}")
+
+    failures = check_pygments()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        raise SystemExit(1)
+    print(f"pygments checks ok: {', '.join(PYGMENTS_CHECKS)}")
+
+
+if __name__ == "__main__":
+    main()
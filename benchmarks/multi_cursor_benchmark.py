@@ -0,0 +1,82 @@
+"""Бенчмарк редактирования несколькими каретками.
+
+Открывает CodeEditor с файлом, где символ встречается --occurrences раз,
+ставит каретки на все вхождения (как Ctrl+Shift+L) и измеряет:
+- поиск вхождений;
+- переименование: вставку нового имени во все каретки (как Ctrl+V);
+- ввод символа и Backspace во всех каретках;
+- отмену переименования (одно действие) с возвратом кареток.
+
+Для сравнения то же переименование выполняется отдельной правкой
+QTextCursor на каждое вхождение (naive) - каждая со своим шагом отмены.
+
+Запуск из корня репозитория:
+    python -m benchmarks.multi_cursor_benchmark [--occurrences 2000]
+"""
+import argparse
+import sys
+import time
+
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtWidgets import QApplication
+
+from widgets.QCodeEditor import CodeEditor
+
+
+def make_text(occurrences: int) -> str:
+    return "\n".join(f"result_{number} = compute_total(value_{number}) + offset" for number in range(occurrences))
+
+
+def timed(action) -> float:
+    start = time.perf_counter()
+    action()
+    QApplication.processEvents()
+    return time.perf_counter() - start
+
+
+def naive_rename(editor: CodeEditor, old: str, new: str):
+    """Каждое вхождение - отдельный find и отдельная правка"""
+    document = editor.document()
+    found = document.find(old, 0, QTextDocument.FindCaseSensitively)
+    while not found.isNull():
+        found.insertText(new)
+        found = document.find(old, found.position(), QTextDocument.FindCaseSensitively)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--occurrences", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    editor = CodeEditor(language="py")
+    editor.resize(900, 700)
+    editor.show()
+    editor.load_text(make_text(args.occurrences))
+    app.processEvents()
+
+    naive = timed(lambda: naive_rename(editor, "compute_total", "calculate_sum"))
+    naive_undo_steps = editor.document().availableUndoSteps()
+
+    editor.load_text(make_text(args.occurrences))
+    app.processEvents()
+    cursor = editor.textCursor()
+    cursor.setPosition(editor.document().firstBlock().text().index("compute_total") + 1)
+    editor.setTextCursor(cursor)
+
+    results = [("select all", timed(editor.add_cursors_at_all_occurrences))]
+    carets = len(editor.multi_cursor.carets)
+    results += [
+        ("rename", timed(lambda: editor.multi_cursor.replace("calculate_sum"))),
+        ("type char", timed(lambda: editor.multi_cursor.replace("s"))),
+        ("backspace", timed(lambda: editor.multi_cursor.delete())),
+        ("undo", timed(editor.multi_cursor.undo)),
+    ]
+    print(f"{carets} cursors")
+    print(f"{'naive':<12} {naive * 1000:>9.2f} ms ({naive_undo_steps} undo commands)")
+    for name, seconds in results:
+        print(f"{name:<12} {seconds * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Бенчмарк отрисовки страниц PDF.
+
+Сравнивает задержку на страницу и пиковую память двух путей получения
+изображения страницы для окна заданной ширины:
+- legacy: отрисовка в 300%, кодирование pix.tobytes("ppm"), разбор
+  QImage.loadFromData и сглаживающее уменьшение до ширины окна, как в
+  прежнем PDFViewerWidget.update_page_display;
+- direct: отрисовка сразу в нужном масштабе и QImage поверх pix.samples
+  без копирования (utils.PDFRenderer.pixmap_to_image).
+
+Каждый путь выполняется в отдельном процессе, чтобы пиковая память
+(ru_maxrss) не смешивалась. Без --pdf создается тестовый документ.
+
+Запуск из корня репозитория:
+    python -m benchmarks.pdf_render_benchmark [--pdf file.pdf] [--pages 50] [--width 900]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import fitz
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+
+from utils.PDFRenderer import pixmap_to_image
+
+
+def build_document(path: str, pages: int):
+    """Документ со страницами текста и векторной графики"""
+    document = fitz.open()
+    for number in range(pages):
+        page = document.new_page()
+        page.insert_text((72, 72), f"Section {number + 1}", fontsize=18)
+        for line in range(45):
+            page.insert_text((72, 100 + line * 15), f"{number}.{line} The quick brown fox jumps over the lazy dog " * 2, fontsize=9)
+        for box in range(20):
+            page.draw_rect(fitz.Rect(60 + box * 4, 60 + box * 4, 540 - box * 4, 780 - box * 4), color=(0, 0, box / 20))
+    document.save(path)
+
+
+def peak_memory_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def render_legacy(page, width: int) -> QImage:
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(3, 3))
+    image = QImage()
+    image.loadFromData(pixmap.tobytes("ppm"))
+    return image.scaledToWidth(width, Qt.SmoothTransformation)
+
+
+def render_direct(page, width: int) -> QImage:
+    scale = width / page.rect.width
+    return pixmap_to_image(page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csRGB, alpha=False))
+
+
+def run_mode(mode: str, path: str, pages: int, width: int):
+    render = render_legacy if mode == "legacy" else render_direct
+    document = fitz.open(path)
+    pages = min(pages, len(document))
+    baseline = peak_memory_mb()
+    timings = []
+    for number in range(pages):
+        page = document.load_page(number)
+        start = time.perf_counter()
+        image = render(page, width)
+        timings.append(time.perf_counter() - start)
+        assert image.width() == width
+    timings.sort()
+    average = sum(timings) / len(timings) * 1000
+    median = timings[len(timings) // 2] * 1000
+    print(f"{average:.2f} {median:.2f} {timings[-1] * 1000:.2f} {peak_memory_mb() - baseline:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--width", type=int, default=900)
+    parser.add_argument("--mode", choices=("legacy", "direct"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf, args.pages, args.width)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.pdf
+        if not path:
+            path = os.path.join(directory, "sample.pdf")
+            build_document(path, args.pages)
+
+        print(f"{'path':<8} {'avg ms':>8} {'median ms':>10} {'max ms':>8} {'peak +MB':>9}")
+        results = {}
+        for mode in ("legacy", "direct"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.pdf_render_benchmark", "--mode", mode,
+                 "--pdf", path, "--pages", str(args.pages), "--width", str(args.width)],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            average, median, worst, peak = map(float, output[-4:])
+            results[mode] = average
+            print(f"{mode:<8} {average:>8.2f} {median:>10.2f} {worst:>8.2f} {peak:>9.1f}")
+        print(f"speedup: {results['legacy'] / results['direct']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
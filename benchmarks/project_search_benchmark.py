@@ -0,0 +1,133 @@
+"""Бенчмарк поиска по проекту (Find in Project).
+
+Создает во временном каталоге дерево из --files исходных файлов (или
+использует --root) с .gitignore, исключенным node_modules, двоичными и
+крупными файлами и измеряет:
+- обход дерева с учетом .gitignore (walk_project);
+- поиск ProjectSearch в пуле потоков и в пуле процессов: время до первых
+  результатов и до окончания;
+- для сравнения - наивный поиск: os.walk без .gitignore, чтение и
+  декодирование каждого файла и проверка каждой строки.
+
+Запуск из корня репозитория:
+    python -m benchmarks.project_search_benchmark [--files 30000] [--root PATH] [--query TEXT]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from PyQt5.QtCore import QCoreApplication
+
+from utils.FindEngine import SearchQuery
+from utils.ProjectSearch import ProjectSearch, compile_bytes_query, walk_project
+
+
+WORDS = ["value", "result", "compute", "index", "buffer", "config", "handler", "widget", "offset", "cache"]
+
+
+def make_tree(root: str, files: int):
+    random.seed(1)
+    with open(os.path.join(root, ".gitignore"), "w") as file:
+        file.write("node_modules/\n*.pyc\n/build\n")
+    per_directory = 100
+    for number in range(files):
+        directory = os.path.join(root, "src", f"package_{number // per_directory // 20}", f"module_{number // per_directory}")
+        os.makedirs(directory, exist_ok=True)
+        lines = [f"def {random.choice(WORDS)}_{line}(argument):\n    return argument + {line}\n"
+                 for line in range(random.randint(20, 120))]
+        if number % 500 == 0:
+            lines.insert(len(lines) // 2, "    # needle_marker: the line we are looking for\n")
+        if number % 3000 == 0:
+            # Крупный файл читается через mmap
+            lines *= 40
+        with open(os.path.join(directory, f"file_{number}.py"), "w") as file:
+            file.writelines(lines)
+        if number % 100 == 0:
+            with open(os.path.join(directory, f"data_{number}.bin"), "wb") as file:
+                file.write(b"\0needle_marker" * 1000)
+    for number in range(files // 6):
+        directory = os.path.join(root, "node_modules", f"dependency_{number // 100}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"index_{number}.js"), "w") as file:
+            file.write("// needle_marker\n" * 20)
+
+
+def naive_search(root: str, text: str) -> int:
+    hits = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as file:
+                    for line in file:
+                        if text in line:
+                            hits += 1
+            except OSError:
+                pass
+    return hits
+
+
+def run_search(app, root: str, query: str, use_processes: bool):
+    search = ProjectSearch(use_processes=use_processes)
+    pattern = compile_bytes_query(SearchQuery(query, case_sensitive=True))
+    state = {"first": None, "hits": 0, "done": None}
+    started = time.perf_counter()
+
+    def on_results(generation, results):
+        if state["first"] is None:
+            state["first"] = time.perf_counter() - started
+        state["hits"] += sum(len(hits) for _, hits in results)
+
+    def on_finished(generation, files, hits, seconds):
+        state["done"] = (time.perf_counter() - started, files, hits)
+
+    search.resultsReady.connect(on_results)
+    search.finished.connect(on_finished)
+    search.search(root, pattern)
+    while state["done"] is None:
+        app.processEvents()
+        time.sleep(0.001)
+    search.shutdown()
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=30000)
+    parser.add_argument("--root")
+    parser.add_argument("--query", default="needle_marker")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    root = args.root or tempfile.mkdtemp(prefix="project_search_")
+    try:
+        if not args.root:
+            make_tree(root, args.files)
+
+        start = time.perf_counter()
+        walked = sum(1 for _ in walk_project(root))
+        walk = time.perf_counter() - start
+
+        start = time.perf_counter()
+        naive_hits = naive_search(root, args.query)
+        naive = time.perf_counter() - start
+
+        print(f"{walked} files after .gitignore")
+        print(f"{'walk':<18} {walk * 1000:>9.1f} ms")
+        print(f"{'naive':<18} {naive * 1000:>9.1f} ms ({naive_hits} hits, no .gitignore)")
+        for name, use_processes in (("threads", False), ("processes", True)):
+            state = run_search(app, root, args.query, use_processes)
+            total, files, hits = state["done"]
+            first = state["first"] * 1000 if state["first"] is not None else float("nan")
+            print(f"{name + ' first hit':<18} {first:>9.1f} ms")
+            print(f"{name + ' total':<18} {total * 1000:>9.1f} ms ({files} files, {hits} hits)")
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Бенчмарк прямоугольного (колоночного) выделения.
+
+Открывает CodeEditor с файлом из заданного числа строк и измеряет:
+- шаг протягивания мышью: прямоугольник растет вниз на --step строк за
+  шаг, после каждого шага выделения показываются (apply_extra_selections),
+  как при движении мыши;
+- ввод символа во все строки прямоугольника;
+- удаление символа перед каретками во всех строках (Backspace);
+- вставку многострочного текста (построчно в строки прямоугольника).
+
+Запуск из корня репозитория:
+    python -m benchmarks.rectangle_selection_benchmark [--lines 5000] [--step 50]
+"""
+import argparse
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+from widgets.QCodeEditor import CodeEditor, SelectionMode
+
+
+def timed(action) -> float:
+    start = time.perf_counter()
+    action()
+    QApplication.processEvents()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--step", type=int, default=50)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    editor = CodeEditor(language="py")
+    editor.resize(900, 700)
+    editor.show()
+    editor.load_text("\n".join(f"value_{number:05d} = compute({number})" for number in range(args.lines)))
+    app.processEvents()
+
+    editor.selection_mode = SelectionMode.RECTANGLE
+    steps = 0
+    start = time.perf_counter()
+    for last_line in range(0, args.lines, args.step):
+        if editor.rectangle.set_rect(0, last_line, 6, 11):
+            editor.apply_extra_selections()
+        steps += 1
+    drag = (time.perf_counter() - start) / steps
+    editor.rectangle.set_rect(0, args.lines - 1, 6, 11)
+    editor.finalize_rectangle_selection()
+
+    results = [
+        ("drag step", drag),
+        ("type char", timed(lambda: editor.insert_text_in_rectangle("X"))),
+        ("backspace", timed(lambda: editor.delete_rectangle_selection())),
+        ("paste lines", timed(lambda: editor.insert_text_in_rectangle(
+            "\n".join(f"p{number}" for number in range(args.lines))))),
+    ]
+    print(f"{args.lines} lines in rectangle")
+    for name, seconds in results:
+        print(f"{name:<12} {seconds * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Бенчмарк пропускной способности вывода терминала.
+
+Подает в виджет вывода заданное число строк порциями, как они приходят
+из readyReadStandardOutput, и обрабатывает события после каждой порции
+(таймер пакетной вставки срабатывает как в работающем приложении).
+Сравниваются:
+- legacy: QTextEdit, вставка каждой порции курсором и ensureCursorVisible,
+  как в прежнем TerminalTab.append_output;
+- batched: widgets.TerminalOutput.TerminalOutputView - буфер, вставка раз
+  в кадр и ограниченная прокрутка.
+
+Выводятся строки в секунду (до появления последней строки в документе),
+самая долгая обработка порции и число блоков в документе в конце.
+
+Запуск из корня репозитория:
+    python -m benchmarks.terminal_output_benchmark [--lines 100000] [--chunk 4096] [--scrollback 10000]
+"""
+import argparse
+import sys
+import time
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+from widgets.TerminalOutput import TerminalOutputView
+
+
+def make_chunks(lines: int, chunk_size: int):
+    text = "".join(f"[{number:06d}] building module_{number % 97}.o ... ok\n" for number in range(lines))
+    return [text[start:start + chunk_size] for start in range(0, len(text), chunk_size)]
+
+
+def legacy_append(view: QTextEdit, text: str):
+    cursor = view.textCursor()
+    cursor.movePosition(QTextCursor.End)
+    cursor.insertText(text)
+    view.setTextCursor(cursor)
+    view.ensureCursorVisible()
+
+
+def run(mode: str, app: QApplication, chunks, scrollback: int):
+    if mode == "legacy":
+        view = QTextEdit()
+        view.setReadOnly(True)
+        append = lambda text: legacy_append(view, text)
+    else:
+        view = TerminalOutputView(scrollback_lines=scrollback)
+        append = view.append_output
+    view.resize(800, 400)
+    view.show()
+    app.processEvents()
+
+    worst = 0.0
+    start = time.perf_counter()
+    for chunk in chunks:
+        chunk_start = time.perf_counter()
+        append(chunk)
+        app.processEvents()
+        worst = max(worst, time.perf_counter() - chunk_start)
+    if mode == "batched":
+        # Дожидаемся последней вставки по таймеру
+        while view.flush_timer.isActive():
+            app.processEvents()
+    elapsed = time.perf_counter() - start
+    blocks = view.document().blockCount()
+    view.close()
+    return elapsed, worst, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--scrollback", type=int, default=10000)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    chunks = make_chunks(args.lines, args.chunk)
+
+    print(f"{'mode':<8} {'seconds':>8} {'lines/sec':>11} {'worst chunk ms':>15} {'blocks':>8}")
+    for mode in ("legacy", "batched"):
+        if mode == "legacy" and args.skip_legacy:
+            continue
+        elapsed, worst, blocks = run(mode, app, chunks, args.scrollback)
+        print(f"{mode:<8} {elapsed:>8.2f} {args.lines / elapsed:>11.0f} {worst * 1000:>15.1f} {blocks:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import json
 import sys
+import multiprocessing
 import os
 from pathlib import Path
 from functools import partial
@@ -29,6 +30,10 @@ from widgets.TabWidget import TabWidget
 from widgets.PushButtons import *
 from widgets.Explorer import Explorer
 from widgets.QCodeEditor import ModernCodeEditor
+from widgets.LargeFileView import LargeFileEditor
+from widgets.HexViewer import HexEditor
+from widgets.ProjectManager import project_manager
+from utils.SymbolIndex import symbol_index
 from widgets.ConsoleWidget import ConsoleWidget
 
 
@@ -211,7 +216,9 @@ class UIManager:
                 ('Cut', 'Ctrl+X', self.main_window.action_cut),
                 ('Copy', 'Ctrl+C', self.main_window.action_copy),
                 ('Paste', 'Ctrl+V', self.main_window.action_paste),
-                ('Select All', 'Ctrl+A', self.main_window.action_select_all)
+                ('Select All', 'Ctrl+A', self.main_window.action_select_all),
+                ('---', None, None),
+                ('Find in Project', 'Ctrl+Shift+F', self.main_window.action_find_in_project)
             ],
             'run': [
                 ('Run', 'Ctrl+R', self.main_window.action_run_code),
@@ -345,18 +352,28 @@ class FileManager:
                 return
                 
             languages = self.app_manager.languages
+            # В настройках расширения указаны без точки
+            language_key = file_extension.lstrip('.')
             
-            if file_extension in languages['list']:
-                file_type = languages['types'].get(file_extension, 1)
-                if file_type == 0:
-                    content = file_path_obj.read_bytes()
-                else:
-                    content = file_path_obj.read_text(encoding='utf-8')
-                    backup(str(file_path_obj))
+            file_type = languages['types'].get(language_key, 1) if language_key in languages['list'] else 1
+            large_file_threshold = int(self.app_manager.settings.get("large_file_threshold_mb", 20)) * 1024 * 1024
+            if file_type == 0:
+                # Двоичные файлы отображаются в память в шестнадцатеричном просмотре
+                self.main_window.create_hex_tab(str(file_path_obj))
+            elif file_path_obj.stat().st_size >= large_file_threshold:
+                # Большие текстовые файлы открываются без загрузки в память
+                self.main_window.create_large_file_tab(str(file_path_obj))
             else:
-                content = file_path_obj.read_text(encoding='utf-8')
+                try:
+                    content = file_path_obj.read_text(encoding='utf-8')
+                except UnicodeDecodeError:
+                    # Двоичный файл с неизвестным расширением
+                    self.main_window.create_hex_tab(str(file_path_obj))
+                else:
+                    if language_key in languages['list']:
+                        backup(str(file_path_obj))
+                    self.main_window.create_editor_tab(content, str(file_path_obj))
                 
-            self.main_window.create_editor_tab(content, str(file_path_obj))
             if str(file_path_obj) not in self.app_manager.session_files:
                 self.app_manager.session_files.append(str(file_path_obj))
             
@@ -439,6 +456,10 @@ class ProjectHandler:
             self.open_project_files(project_config)
             self.main_window._update_project_menu()
             
+            # Индекс символов обновляется в фоне только по измененным файлам
+            root_path = project_config.root_path
+            symbol_index.open_project(root_path, partial(project_manager.get_project_files, root_path))
+            
             self.main_window.status_bar.showMessage(f"Project opened: {project_config.name}")
 
     def open_project_files(self, project_config):
@@ -573,7 +594,8 @@ class ModernMainWindow(QMainWindow):
         
     def _setup_terminal(self):
         """Настройка консоли с вкладками под редактором"""
-        self.console_widget = ConsoleWidget(self)
+        scrollback_lines = int(self.app_manager.settings.get("terminal_scrollback_lines", 10000))
+        self.console_widget = ConsoleWidget(self, scrollback_lines)
         self.console_widget.setVisible(False)
         
         if hasattr(self, 'editor_splitter') and self.editor_splitter:
@@ -826,6 +848,9 @@ class ModernMainWindow(QMainWindow):
         self.terminal_shortcut = QShortcut(QKeySequence("Ctrl+E"), self)
         self.terminal_shortcut.activated.connect(self.toggle_terminal)
         
+        self.console_widget.get_project_search().openRequested.connect(self.go_to_definition)
+        self.console_widget.diagnosticActivated.connect(self.go_to_definition)
+        
     def _initialize_application(self):
         restore_backup()
         self.load_session_files()
@@ -883,7 +908,7 @@ class ModernMainWindow(QMainWindow):
         self.project_handler.open_project()
 
     def action_save_file(self):
-        current_editor = self.get_current_editor()
+        current_editor = self.get_current_document()
         if current_editor and self.file_manager.save_file(current_editor):
             current_index = self.tab_widget.currentIndex()
             self.remove_unsaved_marker(current_index)
@@ -892,30 +917,25 @@ class ModernMainWindow(QMainWindow):
         self.file_manager.save_all_files()
         
     def action_save_as_file(self):
-        current_editor = self.get_current_editor()
-        if current_editor:
+        current_editor = self.get_current_document()
+        if current_editor and hasattr(current_editor, 'save_file_as'):
             current_index = self.tab_widget.currentIndex()
             file_path, _ = QFileDialog.getSaveFileName(
                 self, "Save File As", "", "All Files (*)"
             )
             if file_path:
-                try:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(current_editor.get_text())
-                    
-                    if hasattr(current_editor, 'set_file_path'):
-                        current_editor.set_file_path(file_path)
-                    
-                    self.update_tab_title(current_index, Path(file_path).name)
-                    self.remove_unsaved_marker(current_index)
-                    
-                    old_path = getattr(current_editor, 'file_path', None)
-                    if old_path and old_path in self.app_manager.session_files:
-                        self.app_manager.session_files.remove(old_path)
-                    self.app_manager.session_files.append(file_path)
-                    
-                except Exception as e:
-                    CustomDialog(f"Error saving file: {str(e)}").exec()
+                old_path = getattr(current_editor, 'file_path', None)
+                # Вкладка пишет файл сама: большой файл сохраняется потоково, без get_text()
+                if not current_editor.save_file_as(file_path):
+                    CustomDialog(f"Error saving file: {file_path}").exec()
+                    return
+                
+                self.update_tab_title(current_index, Path(file_path).name)
+                self.remove_unsaved_marker(current_index)
+                
+                if old_path and str(old_path) in self.app_manager.session_files:
+                    self.app_manager.session_files.remove(str(old_path))
+                self.app_manager.session_files.append(file_path)
                     
     def action_close_file(self):
         current_index = self.tab_widget.currentIndex()
@@ -975,6 +995,24 @@ class ModernMainWindow(QMainWindow):
         if current_editor and hasattr(current_editor, 'editor'):
             current_editor.editor.paste()
             
+    def action_find_in_project(self):
+        """Поиск по файлам текущего проекта; выделенный текст становится запросом"""
+        project = self.current_project
+        if not project:
+            self.project_handler.show_no_project_message()
+            return
+        if not self.terminal_visible:
+            self.toggle_terminal()
+        self.console_widget.set_current_tab("Search")
+        
+        search = self.console_widget.get_project_search()
+        search.set_root(project.root_path)
+        selected = ""
+        editor = self.get_current_editor()
+        if editor and hasattr(editor, 'editor'):
+            selected = editor.editor.textCursor().selectedText()
+        search.focus_query(selected if '\u2029' not in selected else "")
+    
     def action_select_all(self):
         current_editor = self.get_current_editor()
         if current_editor and hasattr(current_editor, 'editor'):
@@ -1063,6 +1101,7 @@ class ModernMainWindow(QMainWindow):
         
         if reply == QMessageBox.Yes:
             self.current_project = None
+            symbol_index.close_project()
             self.setWindowTitle("PyScribe - Modern Code Editor")
             self.project_indicator.setVisible(False)
             self.status_bar.showMessage(f"Project closed: {project_name}")
@@ -1080,6 +1119,32 @@ class ModernMainWindow(QMainWindow):
             
             if hasattr(editor, 'editor') and hasattr(editor.editor, 'textChanged'):
                 editor.editor.textChanged.connect(self.on_text_changed)
+            editor.definitionRequested.connect(self.go_to_definition)
+            
+            tab_name = f"       {Path(file_path).name}       "
+            tab_index = self.tab_widget.addTab(editor, tab_name)
+            self.tab_widget.setCurrentIndex(tab_index)
+            
+        except Exception as e:
+            CustomDialog(f"Error creating editor tab: {str(e)}").exec()
+            
+    def create_hex_tab(self, file_path: str):
+        try:
+            viewer = HexEditor(self.tab_widget)
+            viewer.open_file(file_path)
+            
+            tab_name = f"       {Path(file_path).name}       "
+            tab_index = self.tab_widget.addTab(viewer, tab_name)
+            self.tab_widget.setCurrentIndex(tab_index)
+            
+        except Exception as e:
+            CustomDialog(f"Error creating editor tab: {str(e)}").exec()
+            
+    def create_large_file_tab(self, file_path: str):
+        try:
+            editor = LargeFileEditor(parent=self.tab_widget, settings=self.app_manager.settings)
+            editor.open_file(file_path)
+            editor.editor.textChanged.connect(self.on_text_changed)
             
             tab_name = f"       {Path(file_path).name}       "
             tab_index = self.tab_widget.addTab(editor, tab_name)
@@ -1088,6 +1153,22 @@ class ModernMainWindow(QMainWindow):
         except Exception as e:
             CustomDialog(f"Error creating editor tab: {str(e)}").exec()
             
+    def go_to_definition(self, file_path: str, line: int, column: int):
+        """Открытие файла с определением (или переход на его вкладку) и позиционирование"""
+        target = Path(file_path).resolve()
+        for i in range(self.tab_widget.count()):
+            editor = self.tab_widget.widget(i)
+            editor_path = getattr(editor, 'file_path', None)
+            if editor_path and Path(editor_path).resolve() == target:
+                self.tab_widget.setCurrentIndex(i)
+                break
+        else:
+            self.file_manager.open_file(file_path)
+        
+        editor = self.tab_widget.currentWidget()
+        if hasattr(editor, 'go_to_position'):
+            editor.go_to_position(line, column)
+            
     def close_tab(self, index: int):
         if index < 0 or index >= self.tab_widget.count():
             return
@@ -1109,6 +1190,8 @@ class ModernMainWindow(QMainWindow):
             if file_path in self.app_manager.session_files:
                 self.app_manager.session_files.remove(file_path)
                 
+        if hasattr(editor, 'close_file'):
+            editor.close_file()
         self.tab_widget.removeTab(index)
         
         if self.tab_widget.count() == 0:
@@ -1194,6 +1277,13 @@ class ModernMainWindow(QMainWindow):
                 return editor
         return None
 
+    def get_current_document(self):
+        """Текущая вкладка, которую можно сохранить: редактор кода или большой файл"""
+        editor = self.tab_widget.currentWidget()
+        if editor is not None and hasattr(editor, 'save_file'):
+            return editor
+        return None
+
     def load_launch_arguments(self, file_path: str) -> str:
         try:
             if self.config_path.exists():
@@ -1324,6 +1414,8 @@ class ModernMainWindow(QMainWindow):
             event.accept()
             
     def finalize_application(self):
+        if self.console_widget:
+            self.console_widget.get_project_search().shutdown()
         try:
             saveSession(self.app_manager.session_files)
             saveRecent(self.app_manager.recent_files)
@@ -1371,4 +1463,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Нужен для пула процессов анализа в собранном приложении
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+# Анализаторы внутри рабочего процесса, по одному на язык
+_worker_analyzers = {}
+
+
+def analyze_chunks(language: str, chunks: List[str]) -> List[Tuple[str, ...]]:
+    """Разбор фрагментов кода; выполняется в рабочем процессе или потоке"""
+    from utils.CodeAnalyzer import IncrementalCodeAnalyzer
+
+    analyzer = _worker_analyzers.get(language)
+    if analyzer is None:
+        analyzer = _worker_analyzers[language] = IncrementalCodeAnalyzer(language)
+    return [analyzer.analyze_chunk(code) for code in chunks]
+
+
+class AnalysisPool(QObject):
+    """Общий пул фонового анализа кода для всех редакторов
+
+    ast.parse нагружает процессор, поэтому разбор идет в пуле процессов
+    (в обход GIL); если процессы недоступны, используется пул потоков.
+    Запросы объединяются по владельцу: для редактора выполняется не больше
+    одного задания, а из ожидающих остается только последнее - более ранние
+    отменяются. Результат приходит в GUI-поток сигналом
+    resultsReady(owner, {текст фрагмента: имена}).
+    """
+
+    resultsReady = pyqtSignal(object, object)
+
+    def __init__(self, max_workers: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._use_processes = True
+        self._lock = threading.Lock()
+        self._running: Dict[object, Tuple[str, Tuple[str, ...]]] = {}
+        self._pending: Dict[object, Tuple[str, Tuple[str, ...]]] = {}
+        # Незавершенные задания: при закрытии пула они отменяются
+        self._futures: Set[Future] = set()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self._use_processes:
+                try:
+                    # spawn: форк процесса с запущенным Qt небезопасен
+                    context = multiprocessing.get_context("spawn")
+                    self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+                except (OSError, ValueError, NotImplementedError):
+                    self._use_processes = False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def submit(self, owner, language: str, chunks: List[str]):
+        """Запрос разбора; заменяет еще не начатый запрос того же владельца"""
+        request = (language, tuple(chunks))
+        with self._lock:
+            if self._running.get(owner) == request:
+                self._pending.pop(owner, None)
+                return
+            if owner in self._running:
+                self._pending[owner] = request
+                return
+            self._running[owner] = request
+        self._start(owner, request)
+
+    def cancel(self, owner):
+        """Отмена ожидающего запроса владельца; результат текущего будет отброшен"""
+        with self._lock:
+            self._pending.pop(owner, None)
+            self._running.pop(owner, None)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._stop_executor()
+
+    def _stop_executor(self):
+        """Отмена еще не начатых заданий и остановка пула без ожидания"""
+        executor, self._executor = self._executor, None
+        with self._lock:
+            futures = list(self._futures)
+        # cancel вызывает _on_done в этом же потоке - не под блокировкой
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _start(self, owner, request):
+        language, chunks = request
+        try:
+            future = self._get_executor().submit(analyze_chunks, language, list(chunks))
+        except (BrokenProcessPool, RuntimeError):
+            self._fall_back_to_threads()
+            future = self._get_executor().submit(analyze_chunks, language, list(chunks))
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda done: self._on_done(owner, request, done))
+
+    def _fall_back_to_threads(self):
+        if self._executor is not None:
+            self._stop_executor()
+        self._use_processes = False
+
+    def _on_done(self, owner, request, future):
+        """Вызывается в служебном потоке пула"""
+        with self._lock:
+            self._futures.discard(future)
+        results = None
+        if not future.cancelled():
+            try:
+                results = dict(zip(request[1], future.result()))
+            except BrokenProcessPool:
+                # Процессы недоступны (ограниченное окружение) - повтор в потоках
+                self._fall_back_to_threads()
+                self._start(owner, request)
+                return
+            except Exception as e:
+                print(f"Analysis error: {e}")
+
+        with self._lock:
+            if self._running.get(owner) != request:
+                # Владелец отменил запрос
+                return
+            next_request = self._pending.pop(owner, None)
+            if next_request is None:
+                del self._running[owner]
+            else:
+                self._running[owner] = next_request
+
+        if results is not None:
+            try:
+                self.resultsReady.emit(owner, results)
+            except RuntimeError:
+                # Приложение уже закрывается
+                return
+        if next_request is not None:
+            self._start(owner, next_request)
+
+
+_analysis_pool = None
+
+
+def get_analysis_pool() -> AnalysisPool:
+    """Общий для всех вкладок пул анализа"""
+    global _analysis_pool
+    if _analysis_pool is None:
+        _analysis_pool = AnalysisPool()
+    return _analysis_pool
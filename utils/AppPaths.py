@@ -0,0 +1,34 @@
+import os
+from pathlib import Path
+
+from PyQt5.QtCore import QStandardPaths
+
+
+APP_DIR_NAME = "pyscribe"
+
+
+def _private_dir(location, fallback: str, parts) -> Path:
+    base = QStandardPaths.writableLocation(location) or os.path.join(os.path.expanduser("~"), fallback)
+    Path(base).mkdir(parents=True, exist_ok=True)
+    directories = [Path(base) / APP_DIR_NAME]
+    for part in parts:
+        directories.append(directories[-1] / part)
+    for directory in directories:
+        directory.mkdir(mode=0o700, exist_ok=True)
+        # mode не меняет права уже существующего каталога
+        if directory.stat().st_mode & 0o077:
+            os.chmod(directory, 0o700)
+    return directories[-1]
+
+
+def app_cache_dir(*parts: str) -> Path:
+    """Личный каталог кеша приложения пользователя (права 0700)
+
+    Данные, которые можно построить заново: индексы PDF и т.п.
+    """
+    return _private_dir(QStandardPaths.GenericCacheLocation, ".cache", parts)
+
+
+def app_data_dir(*parts: str) -> Path:
+    """Личный каталог данных приложения пользователя (права 0700)"""
+    return _private_dir(QStandardPaths.GenericDataLocation, os.path.join(".local", "share"), parts)
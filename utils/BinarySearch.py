@@ -0,0 +1,325 @@
+import mmap
+import os
+import re
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Pattern, Tuple, Union
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+# Порция поиска: после каждой порции проверяется отмена и отдается GIL
+SEARCH_CHUNK_SIZE = 4 * 1024 * 1024
+# Перекрытие порций для регулярных выражений: совпадения длиннее не гарантируются
+REGEX_OVERLAP = 4096
+# Минимальная длина строки в индексе строк
+MIN_STRING_LENGTH = 4
+# Число файлов, для которых хранится индекс строк
+STRINGS_CACHE_SIZE = 4
+
+# Виды строк
+ASCII = 0
+UTF16 = 1
+
+SEARCH_MODES = ("hex", "ascii", "utf-16", "regex")
+
+Hit = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class BytePattern:
+    """Образец поиска: точная последовательность байтов или регулярное выражение"""
+    needle: Optional[bytes] = None
+    regex: Optional[Pattern] = None
+
+    @property
+    def overlap(self) -> int:
+        return len(self.needle) - 1 if self.needle is not None else REGEX_OVERLAP
+
+
+def compile_pattern(text: str, mode: str = "hex", ignore_case: bool = False) -> BytePattern:
+    """Образец из строки запроса
+
+    hex - байты через пробел или подряд, ?? - любой байт ("DE AD ?? EF");
+    ascii и utf-16 - текст (utf-16 в порядке little-endian);
+    regex - регулярное выражение над байтами.
+    """
+    if mode == "hex":
+        digits = text.replace(" ", "").replace("0x", "")
+        if not digits or len(digits) % 2:
+            raise ValueError("Hex pattern must contain whole bytes")
+        parts = [digits[i:i + 2] for i in range(0, len(digits), 2)]
+        if "??" not in parts:
+            return BytePattern(needle=bytes.fromhex(digits))
+        regex = b"".join(b"." if part == "??" else re.escape(bytes.fromhex(part)) for part in parts)
+        return BytePattern(regex=re.compile(regex, re.S))
+    if mode == "regex":
+        return BytePattern(regex=re.compile(text.encode("utf-8"), re.S | (re.I if ignore_case else 0)))
+    if not text:
+        raise ValueError("Empty pattern")
+    data = text.encode("utf-16-le" if mode == "utf-16" else "utf-8")
+    if ignore_case:
+        return BytePattern(regex=re.compile(re.escape(data), re.I))
+    return BytePattern(needle=data)
+
+
+def find_all(data, pattern: BytePattern, cancelled: Optional[Callable[[], bool]] = None,
+             progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Hit]:
+    """Совпадения (смещение, длина) по порциям с перекрытием
+
+    Точная последовательность ищется data.find, регулярное выражение -
+    по memoryview окна перекрытие + порция + перекрытие (без
+    копирования). Из окна берутся только совпадения, начинающиеся в самой
+    порции, поэтому совпадения на границе не теряются и не повторяются.
+    Выражение в следующем окне ищется с конца последнего совпадения:
+    совпадение, заходящее в перекрытие, не находится второй раз хвостом.
+    """
+    size = len(data)
+    view = memoryview(data) if pattern.regex is not None and size else None
+    last_end = 0
+    try:
+        for chunk_start in range(0, size, SEARCH_CHUNK_SIZE):
+            if cancelled is not None and cancelled():
+                return
+            chunk_end = min(size, chunk_start + SEARCH_CHUNK_SIZE)
+            window_end = min(size, chunk_end + pattern.overlap)
+            if pattern.needle is not None:
+                needle = pattern.needle
+                position = data.find(needle, chunk_start, window_end)
+                while 0 <= position < chunk_end:
+                    yield position, len(needle)
+                    position = data.find(needle, position + 1, window_end)
+            else:
+                # Байты перед порцией - контекст для ретроспективных проверок (?<=...)
+                window_start = max(0, chunk_start - pattern.overlap)
+                window = view[window_start:window_end]
+                for match in pattern.regex.finditer(window, max(chunk_start, last_end) - window_start):
+                    if match.start() >= chunk_end - window_start:
+                        break
+                    if match.end() > match.start():
+                        last_end = window_start + match.end()
+                        yield window_start + match.start(), match.end() - match.start()
+            if progress is not None:
+                progress(chunk_end, size)
+            # Поиск идет в фоновом потоке - отдаем GIL GUI-потоку
+            time.sleep(0)
+    finally:
+        if view is not None:
+            view.release()
+
+
+# Классы байтов для индекса строк: печатаемый (P), нулевой (Z), прочий (X).
+# По перекодированным данным строки ищутся выражениями с литеральным
+# префиксом, которые движок re находит быстрым поиском подстроки.
+_BYTE_CLASSES = bytes(
+    ord("P") if 32 <= byte <= 126 or byte == 9 else ord("Z") if byte == 0 else ord("X")
+    for byte in range(256)
+)
+
+# Вид строки: (выражение строки, продолжения строки за окном)
+_STRING_PATTERNS = (
+    (ASCII, re.compile(b"P" * MIN_STRING_LENGTH + b"P*"), re.compile(rb"P*")),
+    (UTF16, re.compile(b"PZ" * MIN_STRING_LENGTH + b"(?:PZ)*"), re.compile(rb"(?:PZ)*")),
+)
+
+
+class StringsIndex:
+    """Индекс печатаемых строк файла (как утилита strings)
+
+    Хранятся только смещения, длины в байтах и виды строк в компактных
+    массивах; текст строки читается из данных файла при отображении.
+    """
+
+    def __init__(self):
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.kinds = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def append(self, offset: int, length: int, kind: int):
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.kinds.append(kind)
+
+    def extend(self, strings: List[Tuple[int, int, int]]):
+        self.offsets.extend(offset for offset, _length, _kind in strings)
+        self.lengths.extend(length for _offset, length, _kind in strings)
+        self.kinds.extend(kind for _offset, _length, kind in strings)
+
+
+def extract_strings(data, cancelled: Optional[Callable[[], bool]] = None,
+                    progress: Optional[Callable[[int, int], None]] = None) -> Optional[StringsIndex]:
+    """Строки ASCII и UTF-16LE длиной от MIN_STRING_LENGTH; None при отмене
+
+    Строка, обрезанная концом окна, дочитывается за его пределы, а в
+    следующей порции ее продолжение пропускается.
+    """
+    index = StringsIndex()
+    size = len(data)
+    covered = {ASCII: 0, UTF16: 0}
+    for chunk_start in range(0, size, SEARCH_CHUNK_SIZE):
+        if cancelled is not None and cancelled():
+            return None
+        chunk_end = min(size, chunk_start + SEARCH_CHUNK_SIZE)
+        window_end = min(size, chunk_end + REGEX_OVERLAP)
+        classes = data[chunk_start:window_end].translate(_BYTE_CLASSES)
+        found = []
+        for kind, regex, continuation in _STRING_PATTERNS:
+            strings = [(chunk_start + start, end - start, kind) for start, end in map(re.Match.span, regex.finditer(classes))]
+            # Начало порции - продолжение уже найденной строки, конец окна - следующая порция
+            while strings and strings[0][0] < covered[kind]:
+                strings.pop(0)
+            while strings and strings[-1][0] >= chunk_end:
+                strings.pop()
+            if strings:
+                offset, length, _kind = strings[-1]
+                end = offset + length
+                # Строка, обрезанная концом окна, может продолжаться за ним
+                while end >= window_end - 1 and end < size:
+                    tail = continuation.match(data[end:end + SEARCH_CHUNK_SIZE].translate(_BYTE_CLASSES))
+                    end += tail.end()
+                    if tail.end() < SEARCH_CHUNK_SIZE - 1:
+                        break
+                strings[-1] = (offset, end - offset, kind)
+                covered[kind] = end
+            found.append(strings)
+        ascii_strings, utf16_strings = found
+        # Индекс упорядочен по смещению
+        index.extend(sorted(ascii_strings + utf16_strings) if utf16_strings else ascii_strings)
+        if progress is not None:
+            progress(chunk_end, size)
+        time.sleep(0)
+    return index
+
+
+# Индексы строк: (путь, размер, время изменения) -> StringsIndex
+_strings_cache: "OrderedDict[tuple, StringsIndex]" = OrderedDict()
+
+
+def _cache_key(path: str) -> tuple:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+class BinarySearchWorker(QObject):
+    """Фоновый поиск по двоичному файлу
+
+    Источник - путь (файл отображается в память в потоке поиска) или
+    bytes. Совпадения отправляются порциями сигналом hitsFound(job, hits),
+    прогресс - progress(job, обработано, всего), окончание -
+    finished(job, число совпадений). Индекс строк приходит сигналом
+    stringsReady(job, index) и кешируется для последних файлов. Новое
+    задание прерывает предыдущее.
+    """
+
+    hitsFound = pyqtSignal(int, object)
+    progress = pyqtSignal(int, int, int)
+    finished = pyqtSignal(int, int)
+    stringsReady = pyqtSignal(int, object)
+
+    # Наибольшее число совпадений в одном поиске
+    MAX_HITS = 100000
+    # Размер порции совпадений в сигнале
+    HITS_BATCH = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._job = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def search(self, source: Union[str, bytes], pattern: BytePattern) -> int:
+        """Запуск поиска; возвращает номер задания"""
+        self._job += 1
+        self._executor.submit(self._run_search, self._job, source, pattern)
+        return self._job
+
+    def build_strings(self, source: Union[str, bytes]) -> int:
+        """Построение (или выдача из кеша) индекса строк"""
+        self._job += 1
+        self._executor.submit(self._run_strings, self._job, source)
+        return self._job
+
+    def cancel(self):
+        self._job += 1
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _open(self, source):
+        """Данные источника и функция их освобождения"""
+        if not isinstance(source, str):
+            return source, lambda: None
+        handle = open(source, "rb")
+        if not os.fstat(handle.fileno()).st_size:
+            handle.close()
+            return b"", lambda: None
+        data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        def release():
+            data.close()
+            handle.close()
+        return data, release
+
+    def _run_search(self, job: int, source, pattern: BytePattern):
+        """Выполняется в потоке пула"""
+        try:
+            data, release = self._open(source)
+        except OSError as e:
+            print(f"Binary search error: {e}")
+            self.finished.emit(job, 0)
+            return
+        cancelled = lambda: self._job != job
+        count = 0
+        batch = []
+        try:
+            for hit in find_all(data, pattern, cancelled, lambda done, total: self.progress.emit(job, done, total)):
+                batch.append(hit)
+                count += 1
+                if len(batch) >= self.HITS_BATCH:
+                    self.hitsFound.emit(job, batch)
+                    batch = []
+                if count >= self.MAX_HITS:
+                    break
+            if batch:
+                self.hitsFound.emit(job, batch)
+            self.finished.emit(job, count)
+        except RuntimeError:
+            # Объект удален во время поиска
+            pass
+        finally:
+            release()
+
+    def _run_strings(self, job: int, source):
+        """Выполняется в потоке пула"""
+        key = None
+        try:
+            if isinstance(source, str):
+                key = _cache_key(source)
+                if key in _strings_cache:
+                    _strings_cache.move_to_end(key)
+                    self.stringsReady.emit(job, _strings_cache[key])
+                    return
+            data, release = self._open(source)
+        except OSError as e:
+            print(f"Strings index error: {e}")
+            return
+        try:
+            index = extract_strings(data, lambda: self._job != job,
+                                    lambda done, total: self.progress.emit(job, done, total))
+            if index is None:
+                return
+            if key is not None:
+                _strings_cache[key] = index
+                while len(_strings_cache) > STRINGS_CACHE_SIZE:
+                    _strings_cache.popitem(last=False)
+            self.stringsReady.emit(job, index)
+        except RuntimeError:
+            pass
+        finally:
+            release()
@@ -1,8 +1,10 @@
 import ast
 import re
 import json
+from bisect import bisect_right
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Set, Any, Callable
+from typing import Dict, FrozenSet, List, Tuple, Optional, Set, Any, Callable
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 from enum import Enum
@@ -38,37 +40,73 @@ class Language(Enum):
     PLAINTEXT = "txt"
 
 
-@dataclass
+@dataclass(frozen=True)
 class SyntaxRule:
     pattern: str
     color: str
     weight: int = QFont.Normal
     italic: bool = False
+    priority: int = 0
 
 
-@dataclass
+@dataclass(frozen=True)
+class MultiLineRule:
+    """Конструкция, которая может продолжаться на следующих строках"""
+    start: str
+    end: str
+    color: str
+    weight: int = QFont.Normal
+    italic: bool = False
+    escape: bool = False
+
+
+@dataclass(frozen=True)
 class LanguageConfig:
+    """Неизменяемая конфигурация языка
+
+    Один экземпляр на язык разделяется всеми редакторами и движками
+    подсветки; списки при создании превращаются в кортежи, ключевые
+    слова - в frozenset.
+    """
     name: str
-    extensions: List[str]
-    keywords: List[str]
-    syntax_rules: List[SyntaxRule]
+    extensions: Tuple[str, ...]
+    keywords: FrozenSet[str]
+    syntax_rules: Tuple[SyntaxRule, ...]
     auto_indent: bool = True
     brace_auto_close: bool = True
     line_comment: str = "//"
     block_comment_start: str = "/*"
     block_comment_end: str = "*/"
-    string_delimiters: List[str] = None
+    string_delimiters: Tuple[str, ...] = ('"', "'")
+    multiline_rules: Tuple[MultiLineRule, ...] = ()
+    keyword_color: str = "#569CD6"
+    keyword_weight: int = QFont.Normal
+    filenames: Tuple[str, ...] = ()
+    pygments_lexer: Optional[str] = None
+    # Параметры лексера Pygments: ((имя, значение), ...)
+    pygments_options: Tuple[Tuple[str, object], ...] = ()
     
     def __post_init__(self):
-        if self.string_delimiters is None:
-            self.string_delimiters = ['"', "'"]
+        for field_name in ("extensions", "syntax_rules", "string_delimiters", "multiline_rules", "filenames"):
+            object.__setattr__(self, field_name, tuple(getattr(self, field_name) or ()))
+        if isinstance(self.pygments_options, dict):
+            object.__setattr__(self, "pygments_options", tuple(sorted(self.pygments_options.items())))
+        object.__setattr__(self, "keywords", frozenset(self.keywords or ()))
 
 
 class LanguageProvider(ABC):
     """Абстрактный базовый класс для провайдеров языков"""
     
-    @abstractmethod
+    _config: Optional[LanguageConfig] = None
+    
     def get_config(self) -> LanguageConfig:
+        """Конфигурация языка; строится один раз и затем разделяется"""
+        if self._config is None:
+            self._config = self.build_config()
+        return self._config
+    
+    @abstractmethod
+    def build_config(self) -> LanguageConfig:
         pass
     
     @abstractmethod
@@ -78,10 +116,14 @@ class LanguageProvider(ABC):
     @abstractmethod
     def get_completion_items(self, code: str) -> List[str]:
         pass
+    
+    def is_chunk_start(self, line: str, previous_line: str) -> bool:
+        """Начинается ли в строке новый фрагмент верхнего уровня для инкрементального анализа"""
+        return bool(line) and not line[0].isspace() and line[0] not in "}])"
 
 
 class PythonLanguageProvider(LanguageProvider):
-    def get_config(self) -> LanguageConfig:
+    def build_config(self) -> LanguageConfig:
         keywords = [
             "False", "None", "True", "and", "as", "assert", "async", "await", "break", 
             "class", "continue", "def", "del", "elif", "else", "except", "finally", 
@@ -100,6 +142,11 @@ class PythonLanguageProvider(LanguageProvider):
             SyntaxRule(r"'[^'\\]*(\\.[^'\\]*)*'", "#CE9178"),
         ]
         
+        multiline_rules = [
+            MultiLineRule('"""', '"""', "#CE9178", escape=True),
+            MultiLineRule("'''", "'''", "#CE9178", escape=True),
+        ]
+        
         return LanguageConfig(
             name="Python",
             extensions=["py", "pyw"],
@@ -107,9 +154,14 @@ class PythonLanguageProvider(LanguageProvider):
             syntax_rules=syntax_rules,
             line_comment="#",
             block_comment_start='"""',
-            block_comment_end='"""'
+            block_comment_end='"""',
+            multiline_rules=multiline_rules
         )
     
+    def is_chunk_start(self, line: str, previous_line: str) -> bool:
+        # Фрагмент - def/class верхнего уровня вместе с декораторами
+        return line.startswith(("def ", "class ", "async def ", "@")) and not previous_line.startswith("@")
+    
     def analyze_code(self, code: str, analyzer: 'CodeAnalyzer'):
         try:
             tree = ast.parse(code)
@@ -127,30 +179,23 @@ class PythonLanguageProvider(LanguageProvider):
         except SyntaxError:
             self._analyze_with_regex(code, analyzer)
     
+    # Все шаблоны запасного разбора в одном выражении: один проход вместо пяти
+    _REGEX_FALLBACK = re.compile(
+        r'def\s+(\w+)\s*\(|class\s+(\w+)|from\s+(\w+)|import\s+(\w+)|(\w+)\s*='
+    )
+    
     def _analyze_with_regex(self, code: str, analyzer: 'CodeAnalyzer'):
-        patterns = [
-            r'def\s+(\w+)\s*\(',
-            r'class\s+(\w+)',
-            r'(\w+)\s*=',
-            r'from\s+(\w+)',
-            r'import\s+(\w+)'
-        ]
-        for pattern in patterns:
-            matches = re.findall(pattern, code)
-            for match in matches:
-                if isinstance(match, tuple):
-                    for m in match:
-                        if m and m.isidentifier():
-                            analyzer.add_defined_name(m)
-                elif match and match.isidentifier():
-                    analyzer.add_defined_name(match)
+        for match in self._REGEX_FALLBACK.finditer(code):
+            name = match.group(match.lastindex)
+            if name and name.isidentifier():
+                analyzer.add_defined_name(name)
     
     def get_completion_items(self, code: str) -> List[str]:
         return []
 
 
 class CSLanguageProvider(LanguageProvider):
-    def get_config(self) -> LanguageConfig:
+    def build_config(self) -> LanguageConfig:
         keywords = [
             'abstract', 'as', 'base', 'bool', 'break', 'byte', 'case', 'catch',
             'char', 'checked', 'class', 'const', 'continue', 'decimal', 'default',
@@ -169,7 +214,6 @@ class CSLanguageProvider(LanguageProvider):
         
         syntax_rules = [
             SyntaxRule(r'//[^\n]*', "#6A9955"),  # Комментарии
-            SyntaxRule(r'/\*.*?\*/', "#6A9955"),
             SyntaxRule(r'\bclass\s+(\w+)', "#D7BA7D", QFont.Normal, False),
             SyntaxRule(r'\binterface\s+(\w+)', "#D7BA7D", QFont.Normal, False),
             SyntaxRule(r'\bstruct\s+(\w+)', "#D7BA7D", QFont.Normal, False),
@@ -188,7 +232,8 @@ class CSLanguageProvider(LanguageProvider):
             syntax_rules=syntax_rules,
             line_comment="//",
             block_comment_start='/*',
-            block_comment_end='*/'
+            block_comment_end='*/',
+            multiline_rules=[MultiLineRule('/*', '*/', "#6A9955")]
         )
     
     def analyze_code(self, code: str, analyzer: 'CodeAnalyzer'):
@@ -202,7 +247,7 @@ class CSLanguageProvider(LanguageProvider):
 
 
 class JavaScriptLanguageProvider(LanguageProvider):
-    def get_config(self) -> LanguageConfig:
+    def build_config(self) -> LanguageConfig:
         keywords = [
             "abstract", "arguments", "await", "boolean", "break", "byte", "case", "catch",
             "char", "class", "const", "continue", "debugger", "default", "delete", "do",
@@ -217,7 +262,6 @@ class JavaScriptLanguageProvider(LanguageProvider):
         
         syntax_rules = [
             SyntaxRule(r'//.*$', "#6A9955"),  # Комментарии
-            SyntaxRule(r'/\*[\s\S]*?\*/', "#6A9955"),  # Блочные комментарии
             SyntaxRule(r'\b(function|class|const|let|var)\b', "#569CD6"),
             SyntaxRule(r'\b(console|document|window|this)\b', "#4EC9B0"),
             SyntaxRule(r'\b(export|import|from|default)\b', "#569CD6"),
@@ -225,27 +269,33 @@ class JavaScriptLanguageProvider(LanguageProvider):
             SyntaxRule(r'\b\d+\.?\d*([eE][+-]?\d+)?\b', "#B5CEA8"),
             SyntaxRule(r'"[^"\\]*(\\.[^"\\]*)*"', "#CE9178"),
             SyntaxRule(r"'[^'\\]*(\\.[^'\\]*)*'", "#CE9178"),
-            SyntaxRule(r'`[^`\\]*(\\.[^`\\]*)*`', "#CE9178"),  # Template literals
+        ]
+        
+        multiline_rules = [
+            MultiLineRule('/*', '*/', "#6A9955"),  # Блочные комментарии
+            MultiLineRule('`', '`', "#CE9178", escape=True),  # Template literals
         ]
         
         return LanguageConfig(
             name="JavaScript",
             extensions=["js", "jsx"],
             keywords=keywords,
-            syntax_rules=syntax_rules
+            syntax_rules=syntax_rules,
+            multiline_rules=multiline_rules
         )
     
+    _PATTERNS = tuple(re.compile(pattern) for pattern in (
+        r'function\s+(\w+)\s*\(',
+        r'class\s+(\w+)',
+        r'const\s+(\w+)\s*=',
+        r'let\s+(\w+)\s*=',
+        r'var\s+(\w+)\s*=',
+        r'(\w+)\s*:\s*function'
+    ))
+    
     def analyze_code(self, code: str, analyzer: 'CodeAnalyzer'):
-        patterns = [
-            r'function\s+(\w+)\s*\(',
-            r'class\s+(\w+)',
-            r'const\s+(\w+)\s*=',
-            r'let\s+(\w+)\s*=',
-            r'var\s+(\w+)\s*=',
-            r'(\w+)\s*:\s*function'
-        ]
-        for pattern in patterns:
-            matches = re.findall(pattern, code)
+        for pattern in self._PATTERNS:
+            matches = pattern.findall(code)
             for match in matches:
                 if match and match.isidentifier():
                     analyzer.add_defined_name(match)
@@ -255,10 +305,10 @@ class JavaScriptLanguageProvider(LanguageProvider):
 
 
 class HTMLLanguageProvider(LanguageProvider):
-    def get_config(self) -> LanguageConfig:
+    def build_config(self) -> LanguageConfig:
         syntax_rules = [
-            SyntaxRule(r'<!--.*?-->', "#6A9955"),  # Комментарии
-            SyntaxRule(r'<\/?[^>]+>', "#569CD6"),  # HTML теги
+            SyntaxRule(r'<\/?[\w:-]+', "#569CD6"),  # HTML теги
+            SyntaxRule(r'\/?>', "#569CD6"),
             SyntaxRule(r'\b(src|href|class|id|style|alt|title)\b', "#9CDCFE"),  # Атрибуты
             SyntaxRule(r'"[^"\\]*(\\.[^"\\]*)*"', "#CE9178"),
             SyntaxRule(r"'[^'\\]*(\\.[^'\\]*)*'", "#CE9178"),
@@ -270,7 +320,8 @@ class HTMLLanguageProvider(LanguageProvider):
             keywords=[],
             syntax_rules=syntax_rules,
             auto_indent=False,
-            brace_auto_close=False
+            brace_auto_close=False,
+            multiline_rules=[MultiLineRule('<!--', '-->', "#6A9955")]  # Комментарии
         )
     
     def analyze_code(self, code: str, analyzer: 'CodeAnalyzer'):
@@ -281,9 +332,8 @@ class HTMLLanguageProvider(LanguageProvider):
 
 
 class CSSLanguageProvider(LanguageProvider):
-    def get_config(self) -> LanguageConfig:
+    def build_config(self) -> LanguageConfig:
         syntax_rules = [
-            SyntaxRule(r'\/\*[\s\S]*?\*\/', "#6A9955"),  # Комментарии
             SyntaxRule(r'\.[\w-]+\b', "#D7BA7D"),  # CSS классы
             SyntaxRule(r'#[\w-]+\b', "#D7BA7D"),  # CSS ID
             SyntaxRule(r'\b[\w-]+\s*:', "#9CDCFE"),  # CSS свойства
@@ -296,17 +346,19 @@ class CSSLanguageProvider(LanguageProvider):
             keywords=[],
             syntax_rules=syntax_rules,
             auto_indent=True,
-            brace_auto_close=True
+            brace_auto_close=True,
+            multiline_rules=[MultiLineRule('/*', '*/', "#6A9955")]  # Комментарии
         )
     
+    _PATTERNS = tuple(re.compile(pattern) for pattern in (
+        r'\.([\w-]+)\s*\{',
+        r'#([\w-]+)\s*\{',
+        r'@(\w+)'  # CSS directives
+    ))
+    
     def analyze_code(self, code: str, analyzer: 'CodeAnalyzer'):
-        patterns = [
-            r'\.([\w-]+)\s*\{',
-            r'#([\w-]+)\s*\{',
-            r'@(\w+)'  # CSS directives
-        ]
-        for pattern in patterns:
-            matches = re.findall(pattern, code)
+        for pattern in self._PATTERNS:
+            matches = pattern.findall(code)
             for match in matches:
                 if match:
                     analyzer.add_defined_name(match)
@@ -316,7 +368,7 @@ class CSSLanguageProvider(LanguageProvider):
 
 
 class JSONLanguageProvider(LanguageProvider):
-    def get_config(self) -> LanguageConfig:
+    def build_config(self) -> LanguageConfig:
         syntax_rules = [
             SyntaxRule(r'"[^"\\]*(\\.[^"\\]*)*"\s*:', "#9CDCFE"),  # Ключи
             SyntaxRule(r'"[^"\\]*(\\.[^"\\]*)*"', "#CE9178"),  # Строки
@@ -340,6 +392,10 @@ class JSONLanguageProvider(LanguageProvider):
         except:
             pass
     
+    def is_chunk_start(self, line: str, previous_line: str) -> bool:
+        # JSON разбирается только целиком
+        return False
+    
     def _extract_keys(self, data, analyzer: 'CodeAnalyzer', prefix=""):
         if isinstance(data, dict):
             for key in data.keys():
@@ -353,11 +409,54 @@ class JSONLanguageProvider(LanguageProvider):
         return []
 
 
+class PygmentsLanguageProvider(LanguageProvider):
+    """Провайдер для языков без собственных правил: подсветку выполняет лексер Pygments
+
+    Сам Pygments импортируется только при создании движка подсветки
+    (см. create_highlight_engine), поэтому регистрация провайдеров ничего
+    не стоит при запуске.
+    """
+
+    def __init__(self, name: str, lexer: str, extensions: List[str], filenames: List[str] = None,
+                 line_comment: str = "//", block_comment: Tuple[str, str] = ("/*", "*/"),
+                 multiline_rules: List[MultiLineRule] = None, lexer_options: Dict[str, object] = None):
+        self.name = name
+        self.lexer = lexer
+        self.extensions = extensions
+        self.filenames = filenames or []
+        self.line_comment = line_comment
+        self.block_comment = block_comment
+        self.multiline_rules = multiline_rules or []
+        self.lexer_options = lexer_options or {}
+
+    def build_config(self) -> LanguageConfig:
+        return LanguageConfig(
+            name=self.name,
+            extensions=self.extensions,
+            keywords=[],
+            syntax_rules=[],
+            line_comment=self.line_comment,
+            block_comment_start=self.block_comment[0],
+            block_comment_end=self.block_comment[1],
+            filenames=self.filenames,
+            pygments_lexer=self.lexer,
+            pygments_options=self.lexer_options,
+            multiline_rules=self.multiline_rules
+        )
+
+    def analyze_code(self, code: str, analyzer: 'CodeAnalyzer'):
+        analyzer._analyze_generic(code)
+
+    def get_completion_items(self, code: str) -> List[str]:
+        return []
+
+
 class LanguageProviderFactory:
     """Фабрика для создания и управления провайдерами языков"""
     
     _providers: Dict[str, LanguageProvider] = {}
     _extension_map: Dict[str, str] = {}
+    _filename_map: Dict[str, str] = {}
     
     @classmethod
     def register_provider(cls, language: Language, provider: LanguageProvider):
@@ -368,6 +467,8 @@ class LanguageProviderFactory:
         # Регистрируем расширения файлов
         for ext in config.extensions:
             cls._extension_map[ext] = language.value
+        for filename in config.filenames:
+            cls._filename_map[filename.lower()] = language.value
     
     @classmethod
     def get_provider(cls, language: str) -> Optional[LanguageProvider]:
@@ -380,6 +481,16 @@ class LanguageProviderFactory:
         language = cls._extension_map.get(extension.lower())
         return cls.get_provider(language) if language else None
     
+    @classmethod
+    def get_language_by_extension(cls, extension: str) -> Optional[str]:
+        """Получение идентификатора языка по расширению файла"""
+        return cls._extension_map.get(extension.lower())
+    
+    @classmethod
+    def get_language_by_filename(cls, filename: str) -> Optional[str]:
+        """Получение идентификатора языка по имени файла без расширения (Dockerfile, Makefile)"""
+        return cls._filename_map.get(filename.lower())
+    
     @classmethod
     def get_supported_extensions(cls) -> List[str]:
         """Получение списка поддерживаемых расширений"""
@@ -400,6 +511,46 @@ LanguageProviderFactory.register_provider(Language.CSS, CSSLanguageProvider())
 LanguageProviderFactory.register_provider(Language.JSON, JSONLanguageProvider())
 LanguageProviderFactory.register_provider(Language.CS, CSLanguageProvider())
 
+# Остальные языки подсвечиваются лексерами Pygments. Многострочные
+# конструкции указаны только там, где лексер сам не переносит их состояние
+# между строками. Лексеры PHP, Ruby и YAML разбирают каждую строку отдельно:
+# PHP подсвечивается как код без HTML вокруг <?php ... ?> (startinline),
+# у YAML строки блочных списков ("  - item") остаются без подсветки
+_C_COMMENT = MultiLineRule('/*', '*/', "#6A9955")
+_PYGMENTS_LANGUAGES = [
+    (Language.TYPESCRIPT, PygmentsLanguageProvider("TypeScript", "typescript", ["ts", "tsx"],
+                                                   multiline_rules=[_C_COMMENT])),
+    (Language.JAVA, PygmentsLanguageProvider("Java", "java", ["java"], multiline_rules=[_C_COMMENT])),
+    (Language.CPP, PygmentsLanguageProvider("C++", "cpp", ["cpp", "cc", "cxx", "hpp", "hh", "hxx"],
+                                            multiline_rules=[_C_COMMENT])),
+    (Language.C, PygmentsLanguageProvider("C", "c", ["c", "h"], multiline_rules=[_C_COMMENT])),
+    (Language.PHP, PygmentsLanguageProvider("PHP", "php", ["php"], multiline_rules=[_C_COMMENT],
+                                            lexer_options={"startinline": True})),
+    (Language.RUBY, PygmentsLanguageProvider("Ruby", "ruby", ["rb"], ["Gemfile", "Rakefile"], "#", ("=begin", "=end"),
+                                             multiline_rules=[MultiLineRule('=begin', '=end', "#6A9955")])),
+    (Language.GO, PygmentsLanguageProvider("Go", "go", ["go"],
+                                           multiline_rules=[_C_COMMENT, MultiLineRule('`', '`', "#CE9178")])),
+    (Language.RUST, PygmentsLanguageProvider("Rust", "rust", ["rs"])),
+    (Language.KOTLIN, PygmentsLanguageProvider("Kotlin", "kotlin", ["kt", "kts"], multiline_rules=[_C_COMMENT])),
+    (Language.SWIFT, PygmentsLanguageProvider("Swift", "swift", ["swift"],
+                                              multiline_rules=[_C_COMMENT, MultiLineRule('"""', '"""', "#CE9178")])),
+    (Language.SQL, PygmentsLanguageProvider("SQL", "sql", ["sql"], line_comment="--")),
+    (Language.XML, PygmentsLanguageProvider("XML", "xml", ["xml", "xsd", "xsl", "svg", "rss"],
+                                            line_comment="", block_comment=("<!--", "-->"),
+                                            multiline_rules=[MultiLineRule('<!--', '-->', "#6A9955")])),
+    (Language.YAML, PygmentsLanguageProvider("YAML", "yaml", ["yaml", "yml"], line_comment="#", block_comment=("", ""))),
+    (Language.MARKDOWN, PygmentsLanguageProvider("Markdown", "markdown", ["md", "markdown"],
+                                                 line_comment="", block_comment=("<!--", "-->"),
+                                                 multiline_rules=[MultiLineRule('```', '```', "#CE9178"),
+                                                                  MultiLineRule('<!--', '-->', "#6A9955")])),
+    (Language.DOCKERFILE, PygmentsLanguageProvider("Dockerfile", "docker", ["dockerfile"], ["Dockerfile", "Containerfile"],
+                                                   "#", ("", ""))),
+    (Language.BASH, PygmentsLanguageProvider("Bash", "bash", ["sh", "bash", "zsh"], [".bashrc", ".zshrc", ".profile"],
+                                             "#", ("", ""))),
+]
+for _language, _provider in _PYGMENTS_LANGUAGES:
+    LanguageProviderFactory.register_provider(_language, _provider)
+
 
 class CodeAnalyzer:
     """Анализатор кода с поддержкой различных языков"""
@@ -434,16 +585,17 @@ class CodeAnalyzer:
         if name and name.isidentifier():
             self.defined_names.add(name)
     
+    _GENERIC_PATTERNS = tuple(re.compile(pattern) for pattern in (
+        r'function\s+(\w+)\s*\(',
+        r'def\s+(\w+)\s*\(',
+        r'class\s+(\w+)',
+        r'(\w+)\s*='
+    ))
+    
     def _analyze_generic(self, code: str):
         """Общий анализ для неподдерживаемых языков"""
-        patterns = [
-            r'function\s+(\w+)\s*\(',
-            r'def\s+(\w+)\s*\(',
-            r'class\s+(\w+)',
-            r'(\w+)\s*='
-        ]
-        for pattern in patterns:
-            matches = re.findall(pattern, code)
+        for pattern in self._GENERIC_PATTERNS:
+            matches = pattern.findall(code)
             for match in matches:
                 if match and match.isidentifier():
                     self.add_defined_name(match)
@@ -457,3 +609,237 @@ class CodeAnalyzer:
             completion_list.extend(self.provider.get_completion_items(""))
         
         return completion_list
+
+
+class IncrementalCodeAnalyzer(CodeAnalyzer):
+    """Анализатор, который перечитывает только измененные фрагменты
+
+    Документ делится на фрагменты верхнего уровня (для Python - по границам
+    def/class, см. LanguageProvider.is_chunk_start). Для каждого фрагмента
+    хранятся найденные имена, а общая таблица символов - счетчик имен по
+    всем фрагментам. lines_changed помечает затронутые фрагменты, update
+    разбирает только их, поэтому стоимость обновления не зависит от
+    размера файла.
+
+    При deferred = True фрагменты, которых нет в кэше результатов, не
+    разбираются на месте: их текст попадает в missing, а сами фрагменты
+    остаются грязными до add_results (разбор в AnalysisPool).
+
+    pop_changes возвращает имена, появившиеся и исчезнувшие с прошлого
+    вызова (без ключевых слов), - для инкрементального индекса дополнения;
+    по тем же изменениям обновляется defined_names.
+
+    Кэш результатов разбора вытесняет давно не использованные фрагменты
+    и вмещает не меньше двух фрагментов на фрагмент документа, так что
+    большая пачка из AnalysisPool не вытесняет сама себя.
+    """
+    
+    CACHE_SIZE = 4096
+    
+    def __init__(self, language: str):
+        super().__init__(language)
+        self._keywords = set(self.defined_names)
+        self._starts: List[int] = [0]
+        self._chunk_names: List[Tuple[str, ...]] = [()]
+        self._dirty: List[bool] = [True]
+        self._counts: Dict[str, int] = {}
+        self._added: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._collected: Optional[Set[str]] = None
+        self._cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self.deferred = False
+        self.missing: List[str] = []
+    
+    def analyze_code(self, code: str):
+        """Полный анализ текста"""
+        lines = code.split("\n")
+        self._starts = [0]
+        self._chunk_names = [()]
+        self._dirty = [True]
+        for name in list(self._counts):
+            self._name_gone(name)
+        self._counts.clear()
+        deferred, self.deferred = self.deferred, False
+        try:
+            self.update(lambda start, end: lines[start:end], len(lines))
+        finally:
+            self.deferred = deferred
+    
+    def add_defined_name(self, name: str):
+        if not (name and name.isidentifier()):
+            return
+        if self._collected is not None:
+            self._collected.add(name)
+        else:
+            self.defined_names.add(name)
+    
+    def lines_changed(self, first: int, last: int, delta: int):
+        """Строки first..last (в новой нумерации) изменены, число строк изменилось на delta"""
+        starts = self._starts
+        first_chunk = max(bisect_right(starts, first) - 1, 0)
+        last_chunk = max(bisect_right(starts, last - delta) - 1, first_chunk)
+        
+        # Фрагменты внутри правки сливаются в один грязный
+        for index in range(last_chunk, first_chunk, -1):
+            self._forget(index)
+            del starts[index], self._chunk_names[index], self._dirty[index]
+        self._dirty[first_chunk] = True
+        
+        if delta:
+            for index in range(first_chunk + 1, len(starts)):
+                starts[index] += delta
+    
+    def is_dirty(self) -> bool:
+        return any(self._dirty)
+    
+    def update(self, get_lines: Callable[[int, int], List[str]], line_count: int):
+        """Разбор грязных фрагментов; get_lines(start, end) возвращает строки [start, end)"""
+        self.missing = []
+        # Удаленные в конце документа фрагменты
+        while len(self._starts) > 1 and self._starts[-1] >= line_count:
+            self._forget(len(self._starts) - 1)
+            self._dirty[-2] = True
+            del self._starts[-1], self._chunk_names[-1], self._dirty[-1]
+        
+        index = len(self._starts) - 1
+        while index >= 0:
+            if self._dirty[index]:
+                index = self._reanalyze(index, get_lines, line_count)
+            index -= 1
+    
+    def _chunk_end(self, index: int, line_count: int) -> int:
+        return self._starts[index + 1] if index + 1 < len(self._starts) else line_count
+    
+    def _reanalyze(self, index: int, get_lines, line_count: int) -> int:
+        """Повторный разбор фрагмента index; возвращает индекс первого затронутого фрагмента"""
+        start = self._starts[index]
+        end = self._chunk_end(index, line_count)
+        lines = get_lines(start, end)
+        
+        # Первая строка перестала быть границей - фрагмент сливается с предыдущим
+        if index > 0 and lines and not self._is_start(lines[0], get_lines, start):
+            self._forget(index)
+            del self._starts[index], self._chunk_names[index], self._dirty[index]
+            index -= 1
+            start = self._starts[index]
+            lines = get_lines(start, end)
+        
+        # Следующий фрагмент может перестать быть границей (например, после нового декоратора)
+        while index + 1 < len(self._starts):
+            next_start = self._starts[index + 1]
+            next_lines = get_lines(next_start, next_start + 1)
+            if next_lines and self.provider is not None and not self.provider.is_chunk_start(
+                    next_lines[0], lines[-1] if lines else ""):
+                self._forget(index + 1)
+                end = self._chunk_end(index + 1, line_count)
+                del self._starts[index + 1], self._chunk_names[index + 1], self._dirty[index + 1]
+                lines = get_lines(start, end)
+            else:
+                break
+        
+        # Разбиение на новые фрагменты
+        self._forget(index)
+        boundaries = [0]
+        if self.provider is not None:
+            for offset in range(1, len(lines)):
+                if self.provider.is_chunk_start(lines[offset], lines[offset - 1]):
+                    boundaries.append(offset)
+        boundaries.append(len(lines))
+        
+        new_starts = []
+        new_names = []
+        new_dirty = []
+        for chunk_start, chunk_end in zip(boundaries, boundaries[1:]):
+            names = self._names_for("\n".join(lines[chunk_start:chunk_end]))
+            for name in names or ():
+                count = self._counts.get(name, 0)
+                self._counts[name] = count + 1
+                if not count:
+                    self._name_appeared(name)
+            new_starts.append(start + chunk_start)
+            new_names.append(names or ())
+            new_dirty.append(names is None)
+        if not new_starts:
+            new_starts, new_names, new_dirty = [start], [()], [False]
+        
+        self._starts[index:index + 1] = new_starts
+        self._chunk_names[index:index + 1] = new_names
+        self._dirty[index:index + 1] = new_dirty
+        return index
+    
+    def _names_for(self, code: str) -> Optional[Tuple[str, ...]]:
+        """Имена фрагмента из кэша или разбором; None - разбор отложен"""
+        names = self._cache.get(code)
+        if names is not None:
+            self._cache.move_to_end(code)
+            return names
+        if self.deferred:
+            self.missing.append(code)
+            return None
+        names = self.analyze_chunk(code)
+        self._remember(code, names)
+        return names
+    
+    def _remember(self, code: str, names: Tuple[str, ...]):
+        cache = self._cache
+        cache[code] = names
+        cache.move_to_end(code)
+        limit = max(self.CACHE_SIZE, 2 * len(self._starts))
+        while len(cache) > limit:
+            cache.popitem(last=False)
+    
+    def add_results(self, results: Dict[str, Tuple[str, ...]]):
+        """Результаты фонового разбора; применяются при следующем update"""
+        for code, names in results.items():
+            self._remember(code, names)
+    
+    def _is_start(self, line: str, get_lines, line_number: int) -> bool:
+        if self.provider is None:
+            return False
+        previous = get_lines(line_number - 1, line_number) if line_number > 0 else []
+        return self.provider.is_chunk_start(line, previous[0] if previous else "")
+    
+    def analyze_chunk(self, code: str) -> Tuple[str, ...]:
+        """Имена, найденные во фрагменте"""
+        self._collected = set()
+        try:
+            if self.provider:
+                self.provider.analyze_code(code, self)
+            else:
+                self._analyze_generic(code)
+            return tuple(self._collected)
+        finally:
+            self._collected = None
+    
+    def _forget(self, index: int):
+        """Удаление имен фрагмента из общей таблицы"""
+        counts = self._counts
+        for name in self._chunk_names[index]:
+            remaining = counts.get(name, 0) - 1
+            if remaining > 0:
+                counts[name] = remaining
+            elif counts.pop(name, None) is not None:
+                self._name_gone(name)
+        self._chunk_names[index] = ()
+    
+    def _name_appeared(self, name: str):
+        self.defined_names.add(name)
+        if name in self._removed:
+            self._removed.discard(name)
+        else:
+            self._added.add(name)
+    
+    def _name_gone(self, name: str):
+        if name not in self._keywords:
+            self.defined_names.discard(name)
+        if name in self._added:
+            self._added.discard(name)
+        else:
+            self._removed.add(name)
+    
+    def pop_changes(self) -> Tuple[Set[str], Set[str]]:
+        """Имена (появившиеся, исчезнувшие) с прошлого вызова"""
+        changes = (self._added, self._removed)
+        self._added = set()
+        self._removed = set()
+        return changes
@@ -0,0 +1,271 @@
+import heapq
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Кандидат автодополнения: (оценка, имя)
+Candidate = Tuple[float, str]
+
+
+# Начала слов внутри имени: символ после _ и заглавная после строчной или цифры
+_BOUNDARY_RE = re.compile(r"(?<=_)[^_]|(?<=[a-z0-9])[A-Z]")
+
+# При добавлении стольких имен сразу массив пересортировывается целиком
+BULK_ADD_THRESHOLD = 64
+
+
+def _boundaries(name: str) -> List[int]:
+    """Начала слов в имени, включая первый символ"""
+    return [0] + [match.start() for match in _BOUNDARY_RE.finditer(name)]
+
+
+def fuzzy_score(query: str, name: str, starts: Optional[List[int]] = None) -> Optional[float]:
+    """Оценка совпадения query с name как подпоследовательности или None
+
+    Символы запроса ищутся сначала в началах слов (getCompletionList -
+    gcl), затем подряд; бонусы за префикс, начала слов, соседние совпадения
+    и точный регистр, штраф за пропуски и длину имени. starts - готовый
+    результат _boundaries(name).
+    """
+    lower = name.lower()
+    query_lower = query.lower()
+    if lower.startswith(query_lower):
+        return 1000.0 + (50.0 if name.startswith(query) else 0.0) - len(name)
+
+    if starts is None:
+        starts = _boundaries(name)
+    score = 0.0
+    pos = 0
+    previous = -2
+    for char in query_lower:
+        found = -1
+        # Начало слова предпочтительнее, если до него нет соседнего совпадения
+        if previous + 1 < len(lower) and lower[previous + 1] == char and previous >= 0:
+            found = previous + 1
+        else:
+            for start in starts:
+                if start >= pos and lower[start] == char:
+                    found = start
+                    break
+            if found < 0:
+                found = lower.find(char, pos)
+        if found < 0:
+            return None
+        if found == previous + 1:
+            score += 5.0
+        if found in starts:
+            score += 10.0
+        score -= min(found - pos, 5)
+        previous = found
+        pos = found + 1
+    return score - len(name) * 0.1
+
+
+def _word_keys(name: str) -> List[str]:
+    """Ключи нечеткого поиска: инициалы слов и имя с начала каждого слова
+
+    getCompletionList -> gcl, completionlist, list
+    """
+    starts = _boundaries(name)
+    if len(starts) < 2:
+        return []
+    lower = name.lower()
+    keys = ["".join(lower[start] for start in starts)]
+    keys.extend(lower[start:] for start in starts[1:])
+    return keys
+
+
+class _SortedKeys:
+    """Отсортированный массив ключей с именами для поиска по префиксу"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.names: List[str] = []
+
+    def insert(self, key: str, name: str):
+        index = bisect_left(self.keys, key)
+        while index < len(self.keys) and self.keys[index] == key and self.names[index] < name:
+            index += 1
+        self.keys.insert(index, key)
+        self.names.insert(index, name)
+
+    def delete(self, key: str, name: str):
+        index = bisect_left(self.keys, key)
+        while self.names[index] != name:
+            index += 1
+        del self.keys[index], self.names[index]
+
+    def extend(self, pairs: List[Tuple[str, str]]):
+        pairs = sorted(list(zip(self.keys, self.names)) + pairs)
+        self.keys = [key for key, _name in pairs]
+        self.names = [name for _key, name in pairs]
+
+    def clear(self):
+        self.keys.clear()
+        self.names.clear()
+
+    def bounds(self, prefix: str) -> Tuple[int, int]:
+        """Диапазон [low, high) ключей, начинающихся с prefix"""
+        low = bisect_left(self.keys, prefix)
+        return low, bisect_left(self.keys, prefix + "\uffff", low)
+
+    def prefixed(self, prefix: str, limit: int) -> List[str]:
+        """Первые limit имен, ключ которых начинается с prefix"""
+        low, high = self.bounds(prefix)
+        return self.names[low:min(high, low + limit)]
+
+
+class CompletionIndex:
+    """Индекс имен для автодополнения
+
+    Кандидаты берутся без перебора всех имен:
+    - по префиксу самого имени (без учета регистра) - диапазон
+      отсортированного массива (bisect); оценка такого совпадения зависит
+      только от длины и регистра имени и считается сразу для всего
+      диапазона;
+    - по префиксу ключей слов: инициалов (getCompletionList - gcl) и
+      хвостов имени с начала каждого слова (completionlist, list);
+    - как подпоследовательность (valRes - valueResult, hndl - handler) -
+      одним регулярным выражением по склеенной строке имен, начинающихся с
+      той же буквы, что и запрос.
+    Ключи слов и подпоследовательности проверяются, только если им есть
+    место среди limit лучших: оценка fuzzy_score совпадения не с начала
+    имени не больше NON_PREFIX_SCORE_LIMIT на символ запроса. Из всех
+    кандидатов отбираются limit лучших по fuzzy_score.
+
+    Имена учитываются со счетчиком ссылок: add/remove применяют только
+    изменения, и одно имя из нескольких источников (ключевые слова,
+    фрагменты кода) удаляется, когда его убрали все источники.
+    """
+
+    # Наибольшая оценка fuzzy_score на символ запроса, если имя не начинается с запроса
+    NON_PREFIX_SCORE_LIMIT = 15.0
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._refs: Dict[str, int] = {}
+        self._by_name = _SortedKeys()
+        self._by_word = _SortedKeys()
+        # Имена по первой букве (без учета регистра) и их склеенные строки
+        self._by_first: Dict[str, Dict[str, None]] = {}
+        self._joined: Dict[str, str] = {}
+        # Начала слов уже оцененных имен: при вводе запроса оцениваются одни и те же имена
+        self._starts: Dict[str, List[int]] = {}
+        self.add(names)
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._refs
+
+    def add(self, names: Iterable[str]):
+        """Добавление имен (для уже известных увеличивается счетчик)"""
+        refs = self._refs
+        new_names = []
+        for name in names:
+            count = refs.get(name, 0)
+            refs[name] = count + 1
+            if count == 0:
+                new_names.append(name)
+        if not new_names:
+            return
+        for name in new_names:
+            first = name[:1].lower()
+            self._by_first.setdefault(first, {})[name] = None
+            self._joined.pop(first, None)
+        if len(new_names) >= BULK_ADD_THRESHOLD:
+            self._by_name.extend([(name.lower(), name) for name in new_names])
+            self._by_word.extend([(key, name) for name in new_names for key in _word_keys(name)])
+            return
+        for name in new_names:
+            self._by_name.insert(name.lower(), name)
+            for key in _word_keys(name):
+                self._by_word.insert(key, name)
+
+    def remove(self, names: Iterable[str]):
+        """Уменьшение счетчиков; имя удаляется из индекса при нуле"""
+        refs = self._refs
+        for name in names:
+            count = refs.get(name, 0)
+            if count > 1:
+                refs[name] = count - 1
+            elif count == 1:
+                del refs[name]
+                self._by_name.delete(name.lower(), name)
+                for key in _word_keys(name):
+                    self._by_word.delete(key, name)
+                first = name[:1].lower()
+                del self._by_first[first][name]
+                self._joined.pop(first, None)
+                self._starts.pop(name, None)
+
+    def clear(self):
+        self._refs.clear()
+        self._by_name.clear()
+        self._by_word.clear()
+        self._by_first.clear()
+        self._joined.clear()
+        self._starts.clear()
+
+    def prefix_matches(self, prefix: str, limit: int = 50) -> List[str]:
+        """Имена с префиксом в алфавитном порядке"""
+        return self._by_name.prefixed(prefix.lower(), limit)
+
+    def _subsequence_matches(self, query_lower: str) -> List[str]:
+        """Имена, начинающиеся с первой буквы запроса и содержащие его как подпоследовательность"""
+        first = query_lower[0]
+        if first not in self._by_first:
+            return []
+        joined = self._joined.get(first)
+        if joined is None:
+            joined = self._joined[first] = "\n".join(self._by_first[first])
+        pattern = re.compile(
+            "^" + "".join(
+                f"[^{re.escape(char)}\n]*{re.escape(char)}" if index else re.escape(char)
+                for index, char in enumerate(query_lower)
+            ) + "[^\n]*",
+            re.M | re.IGNORECASE
+        )
+        return pattern.findall(joined)
+
+    def search(self, query: str, limit: int = 50) -> List[Candidate]:
+        """Лучшие limit кандидатов для запроса, по убыванию оценки"""
+        if not query or not self._refs:
+            return []
+        query_lower = query.lower()
+
+        # Оценка fuzzy_score для имени, начинающегося с запроса
+        low, high = self._by_name.bounds(query_lower)
+        best = heapq.nlargest(limit, (
+            (1000.0 + (50.0 if name.startswith(query) else 0.0) - len(name), name)
+            for name in self._by_name.names[low:high]
+        ))
+        if len(query) < 2 or (len(best) == limit and best[-1][0] >= self.NON_PREFIX_SCORE_LIMIT * len(query)):
+            return best
+
+        seen = {name for _score, name in best}
+        low, high = self._by_word.bounds(query_lower)
+        candidates = dict.fromkeys(self._by_word.names[low:high])
+        candidates.update(dict.fromkeys(self._subsequence_matches(query_lower)))
+        scored = best
+        starts = self._starts
+        for name in candidates:
+            if name not in seen:
+                name_starts = starts.get(name)
+                if name_starts is None:
+                    name_starts = starts[name] = _boundaries(name)
+                score = fuzzy_score(query, name, name_starts)
+                if score is not None:
+                    scored.append((score, name))
+        return heapq.nlargest(limit, scored)
+
+
+def merge_candidates(*results: List[Candidate], limit: int = 50) -> List[str]:
+    """Объединение результатов нескольких индексов без повторов"""
+    best: Dict[str, float] = {}
+    for candidates in results:
+        for score, name in candidates:
+            if score > best.get(name, float("-inf")):
+                best[name] = score
+    return [name for name, _score in heapq.nlargest(limit, best.items(), key=lambda item: item[1])]
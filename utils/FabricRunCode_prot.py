@@ -7,12 +7,13 @@ from sys import platform
 from concurrent.futures import ThreadPoolExecutor
 import shlex
 import os
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, 
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                              QLineEdit, QPushButton, QLabel, QSplitter, 
                              QTabWidget, QComboBox, QMenu, QAction, QSizePolicy)
 from PyQt5.QtCore import Qt, QProcess, QTimer, pyqtSignal, QByteArray, QEvent
-from PyQt5.QtGui import (QFont, QTextCursor, QColor, QTextCharFormat, QKeySequence, 
-                        QSyntaxHighlighter, QKeyEvent, QPalette)
+from PyQt5.QtGui import QKeySequence, QKeyEvent, QPalette
+
+from widgets.TerminalOutput import DEFAULT_SCROLLBACK_LINES, DiagnosticOutputView
 
 def safe_path(file_path):
     """Безопасное экранирование пути для командной строки"""
@@ -185,60 +186,9 @@ def safe_command(command):
         print(f"Error in safe_command: {e}")
         return command
 
-class TerminalHighlighter(QSyntaxHighlighter):
-    """Подсветка синтаксиса для терминала"""
-    
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlighting_rules = []
-        
-        # Ошибки (красный)
-        error_format = QTextCharFormat()
-        error_format.setForeground(QColor("#FF6B6B"))
-        error_format.setFontWeight(QFont.Bold)
-        self.highlighting_rules.append((r'.*error.*|.*Error.*|.*ERROR.*', error_format))
-        
-        # Предупреждения (желтый)
-        warning_format = QTextCharFormat()
-        warning_format.setForeground(QColor("#FFD93D"))
-        self.highlighting_rules.append((r'.*warning.*|.*Warning.*|.*WARNING.*', warning_format))
-        
-        # Успех (зеленый)
-        success_format = QTextCharFormat()
-        success_format.setForeground(QColor("#6BCF7F"))
-        self.highlighting_rules.append((r'.*success.*|.*Success.*|.*SUCCESS.*', success_format))
-        
-        # Пути (синий)
-        path_format = QTextCharFormat()
-        path_format.setForeground(QColor("#4DABF7"))
-        self.highlighting_rules.append((r'/[\w/\-\.]+|[\w]:\\[^\n\r]*', path_format))
-        
-        # Команды (бирюзовый)
-        command_format = QTextCharFormat()
-        command_format.setForeground(QColor("#3BC9DB"))
-        self.highlighting_rules.append((r'^\$ .*', command_format))
-        
-        # Номера строк (серый)
-        line_number_format = QTextCharFormat()
-        line_number_format.setForeground(QColor("#868E96"))
-        self.highlighting_rules.append((r'^\s*\d+\.', line_number_format))
-
-    def highlightBlock(self, text):
-        for pattern, format in self.highlighting_rules:
-            import re
-            expression = re.compile(pattern, re.IGNORECASE)
-            for match in expression.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, format)
-
-class TerminalTextEdit(QTextEdit):
-    """Кастомный QTextEdit для терминала с улучшенным поведением"""
+class TerminalTextEdit(DiagnosticOutputView):
+    """Вывод встроенного терминала: редактирование запрещено, кроме служебных клавиш"""
     
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setAcceptRichText(False)
-        self.setUndoRedoEnabled(False)
-        
     def keyPressEvent(self, event: QKeyEvent):
         # Запрещаем редактирование кроме специальных клавиш
         if event.key() in (Qt.Key_Backspace, Qt.Key_Delete, Qt.Key_Return, Qt.Key_Enter):
@@ -252,9 +202,11 @@ class IntegratedTerminal(QWidget):
     commandExecuted = pyqtSignal(str)
     terminalReady = pyqtSignal()
     directoryChanged = pyqtSignal(str)  # Сигнал при смене директории
+    diagnosticActivated = pyqtSignal(str, int, int)  # Переход к месту ошибки: путь, строка, колонка
     
-    def __init__(self, parent=None, working_directory=None):
+    def __init__(self, parent=None, working_directory=None, scrollback_lines=DEFAULT_SCROLLBACK_LINES):
         super().__init__(parent)
+        self.scrollback_lines = scrollback_lines
         self.working_directory = working_directory or os.getcwd()
         self.process = None
         self.command_history = []
@@ -354,10 +306,9 @@ class IntegratedTerminal(QWidget):
         header_layout.addWidget(new_tab_button)
         
         # Область вывода терминала
-        self.output = TerminalTextEdit()
-        self.output.setReadOnly(True)
+        self.output = TerminalTextEdit(scrollback_lines=self.scrollback_lines)
         self.output.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #0D1117;
                 color: #E9ECEF;
                 font-family: 'Cascadia Code', 'Consolas', 'Monaco', monospace;
@@ -372,7 +323,8 @@ class IntegratedTerminal(QWidget):
         self.output.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         
         # Подсветка синтаксиса
-        self.highlighter = TerminalHighlighter(self.output.document())
+        self.highlighter = self.output.highlighter
+        self.output.diagnosticActivated.connect(self.open_diagnostic)
         
         # Панель ввода команды
         input_layout = QHBoxLayout()
@@ -686,10 +638,7 @@ Shortcuts:
         self.update_status("Error", "error")
     
     def append_output(self, text, message_type="normal"):
-        """Добавление текста в вывод с типом сообщения"""
-        cursor = self.output.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        
+        """Добавление текста в вывод с типом сообщения (вставляется пакетом при следующей отрисовке)"""
         # Цвета для разных типов сообщений
         colors = {
             "normal": "#E9ECEF",
@@ -700,19 +649,13 @@ Shortcuts:
             "command": "#3BC9DB"
         }
         
-        color = colors.get(message_type, "#E9ECEF")
-        format = cursor.charFormat()
-        format.setForeground(QColor(color))
-        cursor.setCharFormat(format)
-        
-        cursor.insertText(text)
-        
-        # Возвращаем обычный цвет
-        format.setForeground(QColor("#E9ECEF"))
-        cursor.setCharFormat(format)
-        
-        self.output.setTextCursor(cursor)
-        self.output.ensureCursorVisible()
+        self.output.append_output(text, colors.get(message_type, "#E9ECEF"))
+    
+    def open_diagnostic(self, file_path, line, column):
+        """Относительные пути диагностик отсчитываются от текущей директории"""
+        if not os.path.isabs(file_path):
+            file_path = os.path.normpath(os.path.join(self.current_directory, file_path))
+        self.diagnosticActivated.emit(file_path, line, column)
     
     def update_status(self, status, status_type="normal"):
         """Обновление статуса терминала"""
@@ -773,6 +716,8 @@ Shortcuts:
 class TerminalManager(QWidget):
     """Менеджер терминалов с вкладками"""
     
+    diagnosticActivated = pyqtSignal(str, int, int)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setup_ui()
@@ -855,6 +800,7 @@ class TerminalManager(QWidget):
     def create_terminal(self, working_directory=None):
         """Создание нового терминала"""
         terminal = IntegratedTerminal(self, working_directory)
+        terminal.diagnosticActivated.connect(self.diagnosticActivated)
         tab_index = self.tab_widget.addTab(terminal, f"Terminal {self.tab_widget.count() + 1}")
         self.tab_widget.setCurrentIndex(tab_index)
         
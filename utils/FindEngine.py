@@ -0,0 +1,297 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Match, NamedTuple, Optional, Pattern, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+# Разделитель блоков в QTextDocument.toRawText()
+BLOCK_SEPARATOR = "\u2029"
+# Правка, затронувшая больше символов, перепроверяется полным поиском в фоне
+LOCAL_RESCAN_LIMIT = 256 * 1024
+# Совпадения ближе этого расстояния заменяются одной правкой
+REPLACE_MERGE_GAP = 4096
+
+_ASTRAL_RE = re.compile("[\U00010000-\U0010FFFF]")
+# Конструкции, которые могут совпасть с переводом строки
+_NEWLINE_RE = re.compile(r"\\[nsWD]|\[\^|\\x0[aA]|\\012|\(\?[a-zA-Z]*s")
+
+
+class SearchQuery(NamedTuple):
+    text: str
+    case_sensitive: bool = False
+    whole_words: bool = False
+    regex: bool = False
+
+
+def compile_query(query: SearchQuery) -> Optional[Pattern]:
+    """Регулярное выражение для запроса; None - пустой или ошибочный запрос"""
+    if not query.text:
+        return None
+    source = query.text if query.regex else re.escape(query.text)
+    if query.whole_words:
+        # Целые идентификаторы: подчеркивание - часть слова
+        source = rf"(?<!\w)(?:{source})(?!\w)"
+    flags = re.MULTILINE | (0 if query.case_sensitive else re.IGNORECASE)
+    try:
+        return re.compile(source, flags)
+    except re.error:
+        return None
+
+
+def may_span_lines(pattern: Pattern) -> bool:
+    """Может ли совпадение захватить несколько строк (оценка по тексту выражения)"""
+    return bool(pattern.flags & re.DOTALL or _NEWLINE_RE.search(pattern.pattern))
+
+
+def iter_matches(pattern: Pattern, text: str, offset: int = 0) -> Iterator[Tuple[int, int, Match]]:
+    """(начало, конец, совпадение) для непустых совпадений в text - в позициях документа
+
+    text - фрагмент toRawText() или строки блоков через '\\n', offset -
+    позиция его начала в документе. Символы вне BMP занимают в документе
+    две позиции (UTF-16), поэтому смещения строки Python для них пересчитываются.
+    """
+    text = text.replace(BLOCK_SEPARATOR, "\n")
+    astral = [match.start() for match in _ASTRAL_RE.finditer(text)] if not text.isascii() else []
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if start == end:
+            continue
+        if astral:
+            start += bisect_left(astral, start)
+            end += bisect_left(astral, end)
+        yield offset + start, offset + end, match
+
+
+def find_matches(pattern: Pattern, text: str, offset: int = 0) -> Tuple[List[int], List[int]]:
+    """Начала и длины совпадений (см. iter_matches)"""
+    if text.isascii():
+        # Без символов вне BMP позиции строки совпадают с позициями документа
+        starts = []
+        lengths = []
+        for match in pattern.finditer(text.replace(BLOCK_SEPARATOR, "\n")):
+            start, end = match.span()
+            if start != end:
+                starts.append(offset + start)
+                lengths.append(end - start)
+        return starts, lengths
+    starts = []
+    lengths = []
+    for start, end, _ in iter_matches(pattern, text, offset):
+        starts.append(start)
+        lengths.append(end - start)
+    return starts, lengths
+
+
+def match_at(pattern: Pattern, text: str, start: int, end: int) -> Optional[Match]:
+    """Совпадение pattern ровно на [start, end) - позициях документа в text (toRawText)
+
+    Выражение применяется ко всему тексту, как при поиске: просмотр вперед
+    и назад и якоря видят окружение совпадения. None - там больше нет
+    такого совпадения.
+    """
+    text = text.replace(BLOCK_SEPARATOR, "\n")
+    if not text.isascii():
+        # Позиции документа после символов вне BMP больше индексов строки на число этих символов
+        astral = [match.start() + number for number, match in enumerate(_ASTRAL_RE.finditer(text))]
+        start -= bisect_left(astral, start)
+        end -= bisect_left(astral, end)
+    match = pattern.match(text, start)
+    return match if match is not None and match.end() == end else None
+
+
+def plan_replacements(pattern: Pattern, text: str,
+                      expand: Callable[[Match], str]) -> Tuple[List[Tuple[int, int, str]], int]:
+    """Правки (начало, конец, текст) для замены всех совпадений в text
+    (toRawText документа) и число совпадений
+
+    Совпадения, между которыми меньше REPLACE_MERGE_GAP символов,
+    объединяются в одну правку с пересобранным текстом: десятки тысяч
+    отдельных insertText стоят дороже одной вставки того же объема.
+    """
+    edits = []
+    count = 0
+    run_start = run_end = source_end = -1
+    parts: List[str] = []
+    for start, end, match in iter_matches(pattern, text):
+        count += 1
+        source_start = match.start()
+        if parts and source_start - source_end <= REPLACE_MERGE_GAP:
+            parts.append(match.string[source_end:source_start])
+        else:
+            if parts:
+                edits.append((run_start, run_end, "".join(parts)))
+            run_start = start
+            parts = []
+        parts.append(expand(match))
+        run_end = end
+        source_end = match.end()
+    if parts:
+        edits.append((run_start, run_end, "".join(parts)))
+    return edits, count
+
+
+class MatchIndex:
+    """Отсортированный индекс совпадений в документе
+
+    Хранит начала и длины совпадений (позиции документа). Правка документа
+    (update) перепроверяет только затронутые ею блоки: совпадения из них
+    заменяются найденными заново, следующие за правкой сдвигаются на
+    разницу длин; выражения, способные захватить перевод строки, требуют
+    полного поиска. Сдвиг откладывается: начала с номера _shift_from хранятся
+    без _shift, и при вводе в одном месте пересчитываются лишь совпадения
+    между соседними правками, а не весь хвост индекса.
+    """
+
+    def __init__(self, pattern: Optional[Pattern] = None):
+        self.pattern = pattern
+        self._multiline = False
+        self._starts: List[int] = []
+        self._lengths: List[int] = []
+        self._shift_from = 0
+        self._shift = 0
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def reset(self, pattern: Optional[Pattern], starts: List[int], lengths: List[int]):
+        self.pattern = pattern
+        self._multiline = pattern is not None and may_span_lines(pattern)
+        self._starts = starts
+        self._lengths = lengths
+        self._shift_from = 0
+        self._shift = 0
+
+    def clear(self):
+        self.reset(None, [], [])
+
+    def _start(self, index: int) -> int:
+        start = self._starts[index]
+        return start + self._shift if index >= self._shift_from else start
+
+    def _bisect(self, position: int, bisect=bisect_left) -> int:
+        index = bisect(self._starts, position, 0, self._shift_from)
+        if index < self._shift_from:
+            return index
+        return bisect(self._starts, position - self._shift, self._shift_from)
+
+    def _shift_tail(self, index: int, delta: int):
+        """Сдвинуть совпадения с номера index на delta"""
+        starts = self._starts
+        if index >= self._shift_from:
+            if self._shift:
+                starts[self._shift_from:index] = [start + self._shift for start in starts[self._shift_from:index]]
+            self._shift_from = index
+        elif delta:
+            starts[index:self._shift_from] = [start + delta for start in starts[index:self._shift_from]]
+        self._shift += delta
+
+    def match_at(self, index: int) -> Tuple[int, int]:
+        """(начало, конец) совпадения с номером index"""
+        start = self._start(index)
+        return start, start + self._lengths[index]
+
+    def index_after(self, position: int) -> int:
+        """Номер первого совпадения, начинающегося не раньше position (len - таких нет)"""
+        return self._bisect(position)
+
+    def visible(self, first_position: int, last_position: int) -> Iterator[Tuple[int, int]]:
+        """(начало, конец) совпадений, пересекающих диапазон позиций"""
+        index = max(0, self._bisect(first_position) - 1)
+        while index < len(self._starts):
+            start, end = self.match_at(index)
+            if start > last_position:
+                break
+            if end >= first_position:
+                yield start, end
+            index += 1
+
+    def update(self, document, position: int, removed: int, added: int) -> bool:
+        """Учесть правку документа; False - участок слишком велик, нужен полный поиск"""
+        if self.pattern is None:
+            return True
+        if self._multiline or removed > LOCAL_RESCAN_LIMIT or added > LOCAL_RESCAN_LIMIT:
+            return False
+        first_block = document.findBlock(position)
+        last_block = document.findBlock(position + added)
+        if not first_block.isValid():
+            return False
+        if not last_block.isValid():
+            last_block = document.lastBlock()
+        region_start = first_block.position()
+        region_end = last_block.position() + last_block.length() - 1
+        shift = added - removed
+
+        # Совпадения, начинающиеся в перепроверяемом участке (в старых позициях)
+        low = self._bisect(region_start)
+        # Совпадение через несколько строк могло начаться раньше участка
+        while low > 0 and self.match_at(low - 1)[1] > region_start:
+            low -= 1
+        high = self._bisect(region_end - shift, bisect_right)
+
+        lines = []
+        block = first_block
+        while block.isValid():
+            lines.append(block.text())
+            if block == last_block:
+                break
+            block = block.next()
+        starts, lengths = find_matches(self.pattern, "\n".join(lines), region_start)
+
+        self._shift_tail(high, shift)
+        # Теперь совпадения до high хранятся без отложенного сдвига
+        self._starts[low:high] = starts
+        self._lengths[low:high] = lengths
+        self._shift_from += len(starts) - (high - low)
+        return True
+
+
+class FindWorker(QObject):
+    """Поиск по снимку документа в фоновом потоке
+
+    Снимок (toRawText) делается в GUI-потоке, поиск регулярным выражением -
+    в потоке пула. Результат - сигнал finished(generation, (starts, lengths));
+    результат устаревшего поиска не отправляется.
+    """
+
+    finished = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def search(self, pattern: Pattern, text: str) -> int:
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self._executor.submit(self._run, generation, pattern, text)
+        return generation
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, generation: int, pattern: Pattern, text: str):
+        """Выполняется в потоке пула"""
+        if generation != self._generation:
+            return
+        result = find_matches(pattern, text)
+        if generation != self._generation:
+            return
+        try:
+            self.finished.emit(generation, result)
+        except RuntimeError:
+            # Панель удалена
+            pass
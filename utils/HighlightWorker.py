@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.SyntaxEngine import HighlightEngine
+
+
+# Разделитель блоков в QTextDocument.toRawText()
+BLOCK_SEPARATOR = "\u2029"
+
+
+class HighlightWorker(QObject):
+    """Фоновая токенизация снимка документа
+
+    Снимок текста (QTextDocument.toRawText, блоки разделены U+2029)
+    разбирается в отдельном потоке, результаты отправляются
+    порциями через сигнал chunkReady(revision, first_block, results), где
+    results - список (tokens, entry, exit) для блоков подряд, начиная с
+    first_block, а tokens - плоский array (start, length, style_id).
+    Задание с устаревшей ревизией прерывается, не дойдя до конца.
+    """
+
+    chunkReady = pyqtSignal(int, int, object)
+
+    CHUNK_SIZE = 1000
+    YIELD_EVERY = 50
+
+    def __init__(self, engine: HighlightEngine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self._revision = -1
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, revision: int, text: str, first_block: int, state: int):
+        """Поставить в очередь разбор text, начиная с блока first_block"""
+        self._revision = revision
+        self._executor.submit(self._run, revision, text, first_block, state)
+
+    def cancel(self):
+        """Прервать текущее задание"""
+        self._revision = -1
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, revision: int, text: str, first_block: int, state: int):
+        """Выполняется в потоке пула"""
+        tokenize = self.engine.tokenize_flat
+        lines = text.split(BLOCK_SEPARATOR)
+        for chunk_start in range(0, len(lines), self.CHUNK_SIZE):
+            if self._revision != revision:
+                return
+            results = []
+            for index, line in enumerate(lines[chunk_start:chunk_start + self.CHUNK_SIZE], 1):
+                tokens, exit_state = tokenize(line, state)
+                results.append((tokens, state, exit_state))
+                state = exit_state
+                if not index % self.YIELD_EVERY:
+                    # Отдаем GIL, чтобы не задерживать GUI-поток
+                    time.sleep(0)
+            self.chunkReady.emit(revision, first_block + chunk_start, results)
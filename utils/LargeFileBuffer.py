@@ -0,0 +1,228 @@
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+
+# Порция индексации: короткие порции не держат GIL подолгу
+INDEX_CHUNK_SIZE = 1024 * 1024
+# Порция записи при сохранении
+WRITE_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Источники кусков таблицы
+ORIGINAL = 0
+ADDED = 1
+
+
+class LinePieceTable:
+    """Таблица кусков над строками файла
+
+    Документ - последовательность кусков (источник, первая строка, число
+    строк): ORIGINAL ссылается на строки исходного файла, ADDED - на
+    список добавленных строк. Правка не трогает исходные данные, а только
+    делит куски и вставляет новые, поэтому стоимость правки зависит от
+    числа кусков, а не от размера файла.
+    """
+
+    def __init__(self, line_count: int):
+        self.pieces: List[Tuple[int, int, int]] = [(ORIGINAL, 0, line_count)] if line_count else []
+        self.added: List[str] = []
+        self._ends: List[int] = []
+        self._update_ends()
+
+    def _update_ends(self):
+        self._ends = list(accumulate(piece[2] for piece in self.pieces))
+
+    @property
+    def line_count(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def locate(self, line: int) -> Tuple[int, int]:
+        """(источник, индекс в источнике) для строки документа"""
+        index = bisect_right(self._ends, line)
+        source, start, _count = self.pieces[index]
+        offset = line - (self._ends[index - 1] if index else 0)
+        return source, start + offset
+
+    def _split(self, line: int) -> int:
+        """Граница кусков перед строкой line; возвращает индекс куска, начинающегося с нее"""
+        if line >= self.line_count:
+            return len(self.pieces)
+        index = bisect_right(self._ends, line)
+        piece_start = self._ends[index - 1] if index else 0
+        if piece_start == line:
+            return index
+        source, start, count = self.pieces[index]
+        head = line - piece_start
+        self.pieces[index:index + 1] = [(source, start, head), (source, start + head, count - head)]
+        self._update_ends()
+        return index + 1
+
+    def replace(self, first: int, count: int, lines: List[str]):
+        """Замена count строк начиная с first на lines"""
+        begin = self._split(first)
+        end = self._split(first + count)
+        new_pieces = []
+        if lines:
+            new_pieces.append((ADDED, len(self.added), len(lines)))
+            self.added.extend(lines)
+        self.pieces[begin:end] = new_pieces
+        self._update_ends()
+
+
+class LargeFileBuffer:
+    """Буфер большого файла: mmap, индекс строк и таблица кусков для правок
+
+    Файл не читается целиком: смещения начал строк хранятся в компактном
+    array('Q') (8 байт на строку), строка декодируется только когда ее
+    запрашивают. Индекс строится порциями (build_index), пока он не готов,
+    доступны уже проиндексированные строки, а правки запрещены. Сохранение
+    потоково пишет исходные диапазоны байтов из mmap и добавленные строки
+    во временный файл, который затем заменяет исходный.
+    """
+
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        self.path = Path(path)
+        self.encoding = encoding
+        self._open()
+        self.offsets = array("Q", [0])
+        self.indexed = False
+        self.table: Optional[LinePieceTable] = None
+        self.modified = False
+        self.newline = b"\n"
+
+        head = self._map[:65536] if self._map is not None else b""
+        first_newline = head.find(b"\n")
+        if first_newline > 0 and head[first_newline - 1:first_newline] == b"\r":
+            self.newline = b"\r\n"
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def build_index(self, progress: Optional[Callable[[int, int], None]] = None,
+                    cancelled: Optional[Callable[[], bool]] = None) -> bool:
+        """Построение индекса строк; progress(обработано байт, всего байт) после каждой порции"""
+        offsets = self.offsets
+        position = 0
+        while position < self.size:
+            if cancelled is not None and cancelled():
+                return False
+            chunk = self._map[position:position + INDEX_CHUNK_SIZE]
+            parts = chunk.split(b"\n")
+            if len(parts) > 1:
+                # Начала строк после каждого перевода строки: длины частей + 1, накопленно
+                first_start = position + len(parts[0]) + 1
+                offsets.extend(accumulate(map((1).__add__, map(len, parts[1:-1])), initial=first_start))
+            position += len(chunk)
+            if progress is not None:
+                progress(position, self.size)
+            # Индекс строится в фоновом потоке - отдаем GIL GUI-потоку
+            time.sleep(0)
+        self.table = LinePieceTable(len(offsets))
+        self.indexed = True
+        return True
+
+    @property
+    def line_count(self) -> int:
+        if self.table is not None:
+            return self.table.line_count
+        # Пока индекс строится, последняя найденная строка может быть неполной
+        return max(len(self.offsets) - 1, 1)
+
+    def _original_span(self, first: int, last: int) -> Tuple[int, int]:
+        """Байтовый диапазон исходных строк [first, last), включая переводы строк"""
+        end = self.offsets[last] if last < len(self.offsets) else self.size
+        return self.offsets[first], end
+
+    def _original_line(self, number: int) -> str:
+        start, end = self._original_span(number, number + 1)
+        data = self._map[start:end] if self._map is not None else b""
+        if data.endswith(b"\n"):
+            data = data[:-2] if data.endswith(b"\r\n") else data[:-1]
+        return data.decode(self.encoding, errors="replace")
+
+    def line(self, number: int) -> str:
+        """Текст строки без перевода строки"""
+        if self.table is None:
+            return self._original_line(number) if number < len(self.offsets) else ""
+        source, index = self.table.locate(number)
+        if source == ORIGINAL:
+            return self._original_line(index)
+        return self.table.added[index]
+
+    def lines(self, first: int, count: int) -> List[str]:
+        last = min(first + count, self.line_count)
+        return [self.line(number) for number in range(first, last)]
+
+    def replace_lines(self, first: int, count: int, lines: List[str]):
+        """Замена count строк начиная с first; допускается только после построения индекса"""
+        if self.table is None:
+            raise RuntimeError("Line index is not ready")
+        self.table.replace(first, count, lines)
+        self.modified = True
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        """Содержимое документа порциями: исходные диапазоны из mmap и добавленные строки"""
+        if self.table is None:
+            raise RuntimeError("Line index is not ready")
+        original_count = len(self.offsets)
+        pieces = self.table.pieces
+        total = self.table.line_count
+        written = 0
+        for source, start, count in pieces:
+            written += count
+            is_last = written == total
+            if source == ORIGINAL:
+                begin, end = self._original_span(start, start + count)
+                if is_last and start + count < original_count:
+                    # Документ заканчивается строкой, за которой в файле был перевод строки
+                    end -= 2 if self._map[end - 2:end] == b"\r\n" else 1
+                for chunk_start in range(begin, end, WRITE_CHUNK_SIZE):
+                    yield self._map[chunk_start:min(end, chunk_start + WRITE_CHUNK_SIZE)]
+                # Последняя строка файла без перевода строки оказалась не в конце
+                if start + count == original_count and not is_last:
+                    yield self.newline
+            else:
+                text = self.newline.decode("ascii").join(self.table.added[start:start + count])
+                yield text.encode(self.encoding)
+                if not is_last:
+                    yield self.newline
+
+    def save(self, path: Optional[str] = None):
+        """Потоковое сохранение через временный файл; после успеха буфер закрыт"""
+        target = Path(path) if path else self.path
+        descriptor, temp_name = tempfile.mkstemp(dir=str(target.parent), prefix=f".{target.name}.")
+        try:
+            with os.fdopen(descriptor, "wb") as output:
+                for chunk in self.iter_bytes():
+                    output.write(chunk)
+            # mkstemp создает файл с правами 0600 - права берутся у заменяемого (или исходного) файла
+            mode_source = target if target.exists() else self.path
+            if mode_source.exists():
+                shutil.copymode(str(mode_source), temp_name)
+            # Отображение закрывается до замены: иначе Windows не даст заменить файл
+            self.close()
+            try:
+                os.replace(temp_name, target)
+            except OSError:
+                self._open()
+                raise
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if not self._file.closed:
+            self._file.close()
@@ -0,0 +1,120 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+
+# Виды строк вывода
+NORMAL = 0
+ERROR = 1
+WARNING = 2
+SUCCESS = 3
+COMMAND = 4
+
+# Классификаций повторяющихся строк в кеше
+CLASSIFY_CACHE_SIZE = 4096
+
+# Путь начинается с начала "слова" (после пробела, кавычки, скобки или с начала строки):
+# иначе search пробовал бы каждое смещение внутри длинного слова - квадратичное время
+_PATH = r"(?<![^\s\"'(])(?P<path>(?:[A-Za-z]:[\\/])?[^\s:\"'(]+)"
+# file:line[:col]: error|warning|note - gcc, clang, rustc, tsc, mypy, pylint...
+_DIAGNOSTIC_RE = re.compile(
+    _PATH + r":(?P<line>\d+)(?::(?P<column>\d+))?:?\s*(?:fatal error|error|warning|note)\b",
+    re.IGNORECASE,
+)
+# MSBuild, csc: path(line,col): error
+_MSBUILD_RE = re.compile(
+    _PATH + r"\((?P<line>\d+)(?:,(?P<column>\d+))?\)\s*:\s*(?:fatal error|error|warning)\b",
+    re.IGNORECASE,
+)
+# Трассировка Python: File "path", line N
+_TRACEBACK_RE = re.compile(r'File "(?P<path>[^"]+)", line (?P<line>\d+)')
+# Место ошибки rustc на отдельной строке: --> path:line:col
+_LOCATION_RE = re.compile(r"--> (?P<path>(?:[A-Za-z]:[\\/])?[^\s:]+):(?P<line>\d+):(?P<column>\d+)")
+_PATH_RE = re.compile(r"/[\w/\-.]+|\w:\\[^\n\r]*")
+_NUMBERED_RE = re.compile(r"\s*\d+\.")
+
+
+class Diagnostic(NamedTuple):
+    """Ссылка на место в файле: [start, end) - ее положение в строке"""
+    path: str
+    line: int
+    column: int
+    start: int
+    end: int
+
+
+class LineClass(NamedTuple):
+    kind: int
+    # Пути в строке: ((начало, конец), ...)
+    paths: Tuple[Tuple[int, int], ...]
+    # Длина номера в начале строки ("12.") или 0
+    number: int
+    diagnostic: Optional[Diagnostic]
+
+
+def _path_like(path: str) -> bool:
+    """Похоже на путь: есть расширение или разделитель (12:30:45 error - время, а не файл 12)"""
+    return "." in path or "/" in path or "\\" in path
+
+
+def _find_diagnostic(pattern, text: str):
+    for match in pattern.finditer(text):
+        if _path_like(match.group("path")):
+            return match
+    return None
+
+
+def _diagnostic(match) -> Diagnostic:
+    groups = match.groupdict()
+    column = groups.get("column")
+    end = match.end("column") if column else match.end("line")
+    if match.re is _MSBUILD_RE:
+        # Вместе с закрывающей скобкой
+        end += 1
+    # В трассировке Python ссылка - весь фрагмент File "...", line N
+    start = match.start() if match.re is _TRACEBACK_RE else match.start("path")
+    return Diagnostic(groups["path"], int(groups["line"]), int(column or 1), start, end)
+
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def classify_line(text: str) -> LineClass:
+    """Вид строки вывода, пути и ссылка на диагностику компилятора
+
+    Регулярные выражения применяются, только если строка содержит нужные
+    символы (проверки вхождения подстрок); путь в них привязан к началу
+    слова, поэтому длинные строки не перебираются с каждого смещения.
+    """
+    lower = text.lower()
+    if text.startswith("$ "):
+        kind = COMMAND
+    elif "error" in lower:
+        kind = ERROR
+    elif "warning" in lower:
+        kind = WARNING
+    elif "success" in lower:
+        kind = SUCCESS
+    else:
+        kind = NORMAL
+
+    match = None
+    if ":" in text and (kind in (ERROR, WARNING) or "note" in lower):
+        match = _find_diagnostic(_DIAGNOSTIC_RE, text)
+    if match is None and "(" in text and kind in (ERROR, WARNING):
+        match = _find_diagnostic(_MSBUILD_RE, text)
+    if match is None and 'File "' in text:
+        match = _TRACEBACK_RE.search(text)
+    if match is None and "--> " in text:
+        match = _LOCATION_RE.search(text)
+    diagnostic = _diagnostic(match) if match else None
+
+    paths = ()
+    if "/" in text or ":\\" in text:
+        paths = tuple(match.span() for match in _PATH_RE.finditer(text))
+
+    number = 0
+    if text[:1].isdigit() or text[:1].isspace():
+        match = _NUMBERED_RE.match(text)
+        if match:
+            number = match.end()
+
+    return LineClass(kind, paths, number, diagnostic)
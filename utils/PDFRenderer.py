@@ -0,0 +1,192 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+
+# Ключ отрисовки: (страница, масштаб в процентах, поворот) - вся страница,
+# (страница, масштаб, поворот, колонка, строка) - плитка страницы
+RenderKey = Tuple[int, ...]
+
+# Сторона плитки в пикселях устройства
+TILE_SIZE = 512
+
+# Объем кеша отрисованных страниц по умолчанию
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def pixmap_to_image(pixmap) -> QImage:
+    """QImage поверх буфера пикселей fitz.Pixmap, без кодирования и копирования
+    
+    QImage не владеет буфером, поэтому pixmap хранится в атрибуте
+    изображения и освобождается вместе с ним.
+    """
+    image_format = QImage.Format_RGBA8888 if pixmap.alpha else QImage.Format_RGB888
+    image = QImage(sip.voidptr(pixmap.samples_ptr), pixmap.width, pixmap.height, pixmap.stride, image_format)
+    image._pixmap = pixmap
+    return image
+
+
+class PageImageCache:
+    """LRU-кеш отрисованных страниц с вытеснением по занимаемой памяти"""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._images: "OrderedDict[RenderKey, QImage]" = OrderedDict()
+
+    def __contains__(self, key: RenderKey) -> bool:
+        return key in self._images
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def get(self, key: RenderKey) -> Optional[QImage]:
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+        return image
+
+    def put(self, key: RenderKey, image: QImage):
+        old = self._images.pop(key, None)
+        if old is not None:
+            self.used_bytes -= old.sizeInBytes()
+        self._images[key] = image
+        self.used_bytes += image.sizeInBytes()
+        # Последнее добавленное изображение не вытесняется, даже если оно больше лимита
+        while self.used_bytes > self.max_bytes and len(self._images) > 1:
+            _key, evicted = self._images.popitem(last=False)
+            self.used_bytes -= evicted.sizeInBytes()
+
+    def closest(self, page: int, rotation: int, zoom: int) -> Optional[Tuple[RenderKey, QImage]]:
+        """Страница в ближайшем масштабе - временная замена до отрисовки"""
+        candidates = [key for key in self._images if len(key) == 3 and key[0] == page and key[2] == rotation]
+        if not candidates:
+            return None
+        key = min(candidates, key=lambda key: abs(key[1] - zoom))
+        return key, self._images[key]
+
+    def clear(self):
+        self._images.clear()
+        self.used_bytes = 0
+
+
+class PDFRenderWorker(QObject):
+    """Фоновая отрисовка страниц PDF
+
+    Документ открывается отдельным экземпляром в потоке отрисовки (объекты
+    PyMuPDF нельзя делить между потоками). Запросы образуют очередь с
+    приоритетом: request() ставит нужную страницу первой, а соседние
+    страницы для упреждающей отрисовки - следом, вытесняя устаревшие
+    запросы. Отрисовывается вся страница или ее плитка TILE_SIZE x
+    TILE_SIZE (ключ с колонкой и строкой). Страница отрисовывается сразу в размере отображения (масштаб
+    с учетом device_pixel_ratio экрана). Готовые QImage приходят сигналом
+    pageRendered(generation, key, image); generation меняется при открытии
+    другого документа.
+    """
+
+    pageRendered = pyqtSignal(int, object, object)
+    renderFailed = pyqtSignal(int, object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._queue: List[RenderKey] = []
+        self._running = False
+        self._path: Optional[str] = None
+        self._generation = 0
+        self._document = None
+        self._document_path: Optional[str] = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.device_pixel_ratio = 1.0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def open_document(self, path: str):
+        with self._lock:
+            self._path = path
+            self._generation += 1
+            self._queue.clear()
+
+    def close_document(self):
+        with self._lock:
+            self._path = None
+            self._generation += 1
+            self._queue.clear()
+        # Документ закрывается в потоке отрисовки
+        self._executor.submit(self._close_document)
+
+    def request(self, keys: List[RenderKey]):
+        """Новая очередь отрисовки: первые ключи отрисовываются раньше"""
+        with self._lock:
+            self._queue = list(dict.fromkeys(keys))
+            if self._running or not self._queue:
+                return
+            self._running = True
+        self._executor.submit(self._drain)
+
+    def shutdown(self):
+        self.close_document()
+        self._executor.shutdown(wait=False)
+
+    def _close_document(self):
+        if self._document is not None:
+            self._document.close()
+        self._document = None
+        self._document_path = None
+
+    def _drain(self):
+        """Выполняется в потоке отрисовки"""
+        while True:
+            with self._lock:
+                if not self._queue or self._path is None:
+                    self._running = False
+                    return
+                key = self._queue.pop(0)
+                path, generation = self._path, self._generation
+            try:
+                image = self._render(path, key)
+            except Exception as e:
+                self._emit(self.renderFailed, generation, key, str(e))
+                continue
+            self._emit(self.pageRendered, generation, key, image)
+
+    def _emit(self, signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # Виджет удален
+            pass
+
+    def _render(self, path: str, key: RenderKey) -> QImage:
+        if self._document_path != path:
+            self._close_document()
+            self._document = fitz.open(path)
+            self._document_path = path
+        page_number, zoom, rotation = key[:3]
+        page = self._document.load_page(page_number)
+        ratio = self.device_pixel_ratio
+        scale = zoom / 100 * ratio
+        matrix = fitz.Matrix(scale, scale).prerotate(rotation)
+        clip = None
+        if len(key) == 5:
+            # Плитка: ее прямоугольник в отрисованной странице переводится в координаты страницы
+            column, row = key[3:]
+            bounds = page.rect * matrix
+            left, top = bounds.x0 + column * TILE_SIZE, bounds.y0 + row * TILE_SIZE
+            clip = fitz.Rect(left, top, left + TILE_SIZE, top + TILE_SIZE) * ~matrix & page.rect
+        pixmap = page.get_pixmap(matrix=matrix, clip=clip, colorspace=fitz.csRGB, alpha=False)
+        image = pixmap_to_image(pixmap)
+        image.setDevicePixelRatio(ratio)
+        return image
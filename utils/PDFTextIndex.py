@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.AppPaths import app_cache_dir
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+
+# Версия формата сохраненного индекса
+INDEX_VERSION = 2
+# Наибольшая длина строки-заголовка сохраненного индекса
+MAX_HEADER_SIZE = 4096
+# Наибольшее число совпадений в одном поиске
+MAX_HITS = 10000
+
+_TOKEN_RE = re.compile(r"\w+")
+
+Rect = Tuple[float, float, float, float]
+# Совпадение: (страница, прямоугольники слов в координатах страницы)
+Hit = Tuple[int, List[Rect]]
+
+
+def index_cache_dir() -> Path:
+    """Каталог сохраненных индексов в личном кеше приложения пользователя"""
+    return app_cache_dir("pdf_index")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def map_rect(rect: Rect, page_size: Tuple[float, float], zoom: int, rotation: int) -> Rect:
+    """Прямоугольник страницы в координатах отрисовки с масштабом и поворотом по часовой"""
+    width, height = page_size
+    x0, y0, x1, y1 = rect
+    if rotation == 90:
+        x0, y0, x1, y1 = height - y1, x0, height - y0, x1
+    elif rotation == 180:
+        x0, y0, x1, y1 = width - x1, height - y1, width - x0, height - y0
+    elif rotation == 270:
+        x0, y0, x1, y1 = y0, width - x1, y1, width - x0
+    scale = zoom / 100
+    return x0 * scale, y0 * scale, x1 * scale, y1 * scale
+
+
+class PDFTextIndex:
+    """Инвертированный индекс текста документа
+
+    Для каждой страницы хранятся токены (слова в нижнем регистре) по
+    порядку, номер слова PyMuPDF для каждого токена и прямоугольники слов.
+    Словарь токен -> позиции (страница, номер токена) в плоском array('I')
+    и отсортированный список токенов позволяют находить и точные
+    совпадения, и слова по префиксу (bisect). Фраза ищется по позициям
+    первого слова с проверкой следующих токенов; последнее слово запроса
+    может быть началом слова.
+    """
+
+    def __init__(self):
+        self.page_tokens: List[List[str]] = []
+        self.page_words: List[array] = []
+        self.page_rects: List[array] = []
+        self.postings: Dict[str, array] = {}
+        self._vocabulary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.page_tokens)
+
+    def add_page(self, words):
+        """Слова страницы из page.get_text("words")"""
+        page = len(self.page_tokens)
+        tokens = []
+        word_numbers = array("I")
+        rects = array("f")
+        for number, word in enumerate(words):
+            rects.extend(word[:4])
+            for token in tokenize(word[4]):
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = array("I")
+                postings.extend((page, len(tokens)))
+                tokens.append(token)
+                word_numbers.append(number)
+        self.page_tokens.append(tokens)
+        self.page_words.append(word_numbers)
+        self.page_rects.append(rects)
+        self._vocabulary = None
+
+    def _tokens_with_prefix(self, prefix: str) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\uffff", start)
+        return self._vocabulary[start:end]
+
+    def search(self, query: str, limit: int = MAX_HITS) -> List[Hit]:
+        """Совпадения фразы по порядку страниц и положения на странице"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        first_tokens = self._tokens_with_prefix(terms[0]) if len(terms) == 1 else [terms[0]]
+        positions = []
+        for token in first_tokens:
+            postings = self.postings.get(token)
+            if postings is not None:
+                positions.extend(zip(postings[::2], postings[1::2]))
+        positions.sort()
+
+        hits = []
+        last = len(terms) - 1
+        for page, position in positions:
+            tokens = self.page_tokens[page]
+            if position + last >= len(tokens):
+                continue
+            if any(tokens[position + i] != terms[i] for i in range(1, last)):
+                continue
+            if last and not tokens[position + last].startswith(terms[last]):
+                continue
+            hits.append((page, self._rects(page, position, position + last + 1)))
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def _rects(self, page: int, start: int, end: int) -> List[Rect]:
+        rects = self.page_rects[page]
+        numbers = dict.fromkeys(self.page_words[page][start:end])
+        return [tuple(rects[number * 4:number * 4 + 4]) for number in numbers]
+
+    def dump(self, file, mtime: int):
+        """Запись индекса: строка-заголовок JSON, затем тексты токенов и массивы чисел
+
+        Формат не содержит ничего исполняемого (в отличие от pickle):
+        загрузка только разбирает текст и числа.
+        """
+        vocabulary = sorted(self.postings)
+        words, rects, postings = array("I"), array("f"), array("I")
+        for page_words, page_rects in zip(self.page_words, self.page_rects):
+            words.extend(page_words)
+            rects.extend(page_rects)
+        for token in vocabulary:
+            postings.extend(self.postings[token])
+        sections = [
+            "\n".join(token for tokens in self.page_tokens for token in tokens).encode("utf-8"),
+            "\n".join(vocabulary).encode("utf-8"),
+            array("I", map(len, self.page_tokens)).tobytes(),
+            array("I", map(len, self.page_rects)).tobytes(),
+            array("I", (len(self.postings[token]) for token in vocabulary)).tobytes(),
+            words.tobytes(),
+            rects.tobytes(),
+            postings.tobytes(),
+        ]
+        header = {"version": INDEX_VERSION, "mtime": mtime, "byteorder": sys.byteorder,
+                  "sizes": [len(section) for section in sections]}
+        file.write(json.dumps(header).encode("ascii") + b"\n")
+        for section in sections:
+            file.write(section)
+
+    @staticmethod
+    def read_header(file) -> dict:
+        header = json.loads(file.readline(MAX_HEADER_SIZE))
+        if not isinstance(header, dict):
+            raise ValueError("Invalid index header")
+        return header
+
+    @classmethod
+    def load(cls, file, header: dict) -> "PDFTextIndex":
+        """Чтение индекса, записанного dump, после read_header; ValueError при повреждении"""
+        if header.get("byteorder") != sys.byteorder:
+            raise ValueError("Index written on another platform")
+        sections = []
+        for size in header["sizes"]:
+            size = int(size)
+            data = file.read(size)
+            if size < 0 or len(data) != size:
+                raise ValueError("Truncated index")
+            sections.append(data)
+        if len(sections) != 8:
+            raise ValueError("Invalid index sections")
+        tokens_data, vocabulary_data = (data.decode("utf-8") for data in sections[:2])
+        token_counts, rect_counts, posting_counts, words, postings = (array("I") for _ in range(5))
+        rects = array("f")
+        for target, data in zip((token_counts, rect_counts, posting_counts, words, rects, postings), sections[2:]):
+            target.frombytes(data)
+
+        tokens = tokens_data.split("\n") if tokens_data else []
+        vocabulary = vocabulary_data.split("\n") if vocabulary_data else []
+        if (len(token_counts) != len(rect_counts) or sum(token_counts) != len(tokens)
+                or len(words) != len(tokens) or sum(rect_counts) != len(rects)
+                or len(posting_counts) != len(vocabulary) or sum(posting_counts) != len(postings)):
+            raise ValueError("Inconsistent index")
+
+        index = cls()
+        token_start = rect_start = 0
+        for token_count, rect_count in zip(token_counts, rect_counts):
+            index.page_tokens.append(tokens[token_start:token_start + token_count])
+            index.page_words.append(words[token_start:token_start + token_count])
+            index.page_rects.append(rects[rect_start:rect_start + rect_count])
+            token_start += token_count
+            rect_start += rect_count
+        posting_start = 0
+        for token, count in zip(vocabulary, posting_counts):
+            index.postings[token] = postings[posting_start:posting_start + count]
+            posting_start += count
+        index._vocabulary = vocabulary
+        return index
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_cached_index(path: str, digest: str) -> Optional[PDFTextIndex]:
+    """Сохраненный индекс, если он построен для того же содержимого и времени изменения"""
+    cache_file = index_cache_dir() / f"{digest}.idx"
+    try:
+        with open(cache_file, "rb") as file:
+            header = PDFTextIndex.read_header(file)
+            if header.get("version") != INDEX_VERSION or header.get("mtime") != os.stat(path).st_mtime_ns:
+                return None
+            return PDFTextIndex.load(file, header)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_cached_index(path: str, digest: str, index: PDFTextIndex):
+    directory = index_cache_dir()
+    descriptor, temp_name = tempfile.mkstemp(dir=str(directory), prefix=f".{digest}.")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            index.dump(file, os.stat(path).st_mtime_ns)
+        os.replace(temp_name, directory / f"{digest}.idx")
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+
+class PDFTextIndexer(QObject):
+    """Фоновое построение индекса текста PDF
+
+    Текст страниц извлекается в отдельном потоке собственным экземпляром
+    документа; готовый индекс сохраняется в кеш и при повторном открытии
+    того же файла загружается оттуда. Прогресс - сигнал progress(generation,
+    страниц готово, всего), результат - ready(generation, index).
+    """
+
+    progress = pyqtSignal(int, int, int)
+    ready = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, persist: bool = True, parent=None):
+        super().__init__(parent)
+        self.persist = persist
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def build(self, path: str) -> int:
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self._executor.submit(self._run, generation, path)
+        return generation
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+
+    def _cancelled(self, generation: int) -> bool:
+        return generation != self._generation
+
+    def _emit(self, signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # Виджет удален
+            pass
+
+    def _run(self, generation: int, path: str):
+        """Выполняется в потоке индексации"""
+        try:
+            digest = file_hash(path) if self.persist else None
+            index = load_cached_index(path, digest) if digest else None
+            if index is None:
+                index = self._extract(generation, path)
+                if index is None:
+                    return
+                if digest:
+                    try:
+                        save_cached_index(path, digest, index)
+                    except OSError as e:
+                        print(f"PDF index cache error: {e}")
+            if not self._cancelled(generation):
+                self._emit(self.ready, generation, index)
+        except Exception as e:
+            self._emit(self.failed, generation, str(e))
+
+    def _extract(self, generation: int, path: str) -> Optional[PDFTextIndex]:
+        index = PDFTextIndex()
+        with fitz.open(path) as document:
+            total = len(document)
+            for number, page in enumerate(document):
+                if self._cancelled(generation):
+                    return None
+                index.add_page(page.get_text("words", sort=False))
+                if not number % 10:
+                    self._emit(self.progress, generation, number + 1, total)
+        return index
@@ -0,0 +1,419 @@
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.FindEngine import SearchQuery
+
+
+# Служебные каталоги систем контроля версий не просматриваются никогда
+ALWAYS_SKIPPED = frozenset({".git", ".hg", ".svn"})
+# Файл с нулевым байтом в начале считается двоичным (как в git)
+BINARY_SNIFF_BYTES = 8000
+# Файлы больше этого размера пропускаются
+MAX_FILE_SIZE = 32 * 1024 * 1024
+# Файлы меньше этого размера читаются целиком: mmap для них дороже чтения
+MMAP_THRESHOLD = 64 * 1024
+# Совпадений в одном файле, после которых поиск в нем прекращается
+MAX_HITS_PER_FILE = 1000
+# Символов строки в результате
+PREVIEW_LENGTH = 200
+# Файлов в задании пула: первые задания маленькие, чтобы быстрее получить первые результаты
+FIRST_BATCH_SIZE = 16
+BATCH_SIZE = 128
+
+
+class SearchHit(NamedTuple):
+    line: int       # с 1
+    column: int     # с 0, в символах
+    length: int     # в символах
+    preview: str
+
+
+def compile_bytes_query(query: SearchQuery) -> Optional[Pattern]:
+    """Регулярное выражение для поиска в байтах файла (UTF-8); None - пустой или ошибочный запрос
+
+    Для байтов \\w и игнорирование регистра работают только в ASCII.
+    """
+    if not query.text:
+        return None
+    source = query.text if query.regex else re.escape(query.text)
+    if query.whole_words:
+        source = rf"(?<!\w)(?:{source})(?!\w)"
+    flags = re.MULTILINE | (0 if query.case_sensitive else re.IGNORECASE)
+    try:
+        return re.compile(source.encode("utf-8"), flags)
+    except (re.error, UnicodeEncodeError):
+        return None
+
+
+# gitignore
+
+def _glob_to_regex(pattern: str) -> str:
+    """Шаблон gitignore (без '!' и завершающего '/') -> регулярное выражение для пути с '/'"""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+            continue
+        if char == "*":
+            if pattern.startswith("**", i):
+                parts.append(".*")
+                i += 2
+                continue
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    body = "".join(parts)
+    # Шаблон без '/' относится к имени на любом уровне
+    return body if anchored else "(?:.*/)?" + body
+
+
+class IgnoreFile:
+    """Правила одного .gitignore; пути проверяются относительно его каталога
+
+    Если в файле нет исключений ('!'), порядок правил не важен, и все они
+    объединяются в одно выражение (отдельно для файлов и для каталогов).
+    """
+
+    def __init__(self, base: str, lines: List[str]):
+        self.base = base
+        # (выражение, исключение, только каталоги)
+        self.rules: List[tuple] = []
+        for line in lines:
+            line = line.rstrip("\n\r")
+            if not line.strip() or line.startswith("#"):
+                continue
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            self.rules.append((_glob_to_regex(line), negate, directory_only))
+
+        self.ordered = any(negate for _, negate, _ in self.rules)
+        if self.ordered:
+            self.rules = [(re.compile(source), negate, directory_only) for source, negate, directory_only in self.rules]
+            self.files_regex = self.dirs_regex = None
+        else:
+            self.files_regex = self._combine([source for source, _, directory_only in self.rules if not directory_only])
+            self.dirs_regex = self._combine([source for source, _, _ in self.rules])
+
+    @staticmethod
+    def _combine(sources: List[str]) -> Optional[Pattern]:
+        return re.compile("|".join(f"(?:{source})" for source in sources)) if sources else None
+
+    @classmethod
+    def load(cls, directory: str, base: str) -> Optional["IgnoreFile"]:
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as file:
+                ignore = cls(base, file.readlines())
+        except OSError:
+            return None
+        return ignore if ignore.rules else None
+
+    def match(self, relative: str, is_dir: bool) -> Optional[bool]:
+        """True/False - путь исключен/возвращен правилом этого файла, None - ни одно правило не подошло"""
+        if self.base:
+            relative = relative[len(self.base) + 1:]
+        if not self.ordered:
+            regex = self.dirs_regex if is_dir else self.files_regex
+            return True if regex is not None and regex.fullmatch(relative) else None
+        for regex, negate, directory_only in reversed(self.rules):
+            if directory_only and not is_dir:
+                continue
+            if regex.fullmatch(relative):
+                return not negate
+        return None
+
+
+def _is_ignored(ignores: Tuple[IgnoreFile, ...], relative: str, is_dir: bool) -> bool:
+    # Более глубокий .gitignore важнее: решает первый (с конца), где подошло правило
+    for ignore in reversed(ignores):
+        result = ignore.match(relative, is_dir)
+        if result is not None:
+            return result
+    return False
+
+
+def walk_project(root: str, should_stop=lambda: False) -> Iterator[str]:
+    """Файлы проекта без исключенных .gitignore (корня и вложенных каталогов)
+
+    Обход os.scandir без рекурсии; исключенные каталоги не открываются,
+    символические ссылки на каталоги не просматриваются.
+    """
+    stack: List[Tuple[str, str, Tuple[IgnoreFile, ...]]] = [(root, "", ())]
+    while stack:
+        if should_stop():
+            return
+        directory, relative_directory, ignores = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        if any(entry.name == ".gitignore" for entry in entries):
+            ignore = IgnoreFile.load(directory, relative_directory)
+            if ignore is not None:
+                ignores = ignores + (ignore,)
+        subdirectories = []
+        for entry in entries:
+            relative = f"{relative_directory}/{entry.name}" if relative_directory else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if is_dir and entry.name in ALWAYS_SKIPPED:
+                continue
+            if ignores and _is_ignored(ignores, relative, is_dir):
+                continue
+            if is_dir:
+                subdirectories.append((entry.path, relative, ignores))
+            else:
+                yield entry.path
+        # Каталоги - в порядке имен (стек разворачивает порядок)
+        subdirectories.sort(reverse=True)
+        stack.extend(subdirectories)
+
+
+# Поиск в файлах
+
+def search_file(path: str, pattern: Pattern) -> List[SearchHit]:
+    """Строки файла с совпадениями (первое совпадение в строке); двоичные файлы пропускаются"""
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0 or size > MAX_FILE_SIZE:
+                return []
+            if size < MMAP_THRESHOLD:
+                data = file.read()
+            else:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return []
+    try:
+        if data.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0:
+            return []
+        return _collect_hits(data, pattern)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def _collect_hits(data, pattern: Pattern) -> List[SearchHit]:
+    hits = []
+    line = 1
+    counted = 0
+    match = pattern.search(data)
+    while match is not None and len(hits) < MAX_HITS_PER_FILE:
+        start, end = match.span()
+        # Номер строки: переводы строк между предыдущим и этим совпадением
+        line += data[counted:start].count(b"\n")
+        counted = start
+        line_start = data.rfind(b"\n", 0, start) + 1
+        line_end = data.find(b"\n", start)
+        if line_end < 0:
+            line_end = len(data)
+        # Совпадение через несколько строк показывается до конца первой из них
+        matched_end = min(end, line_end)
+        prefix = data[line_start:start].decode("utf-8", "replace")
+        matched = data[start:matched_end].decode("utf-8", "replace")
+        column = len(prefix)
+        if column > PREVIEW_LENGTH // 2:
+            # Длинная строка: в результате - окрестность совпадения
+            prefix = "…" + prefix[-PREVIEW_LENGTH // 4:]
+        suffix = data[matched_end:min(line_end, matched_end + PREVIEW_LENGTH * 4)].decode("utf-8", "replace")
+        preview = (prefix + matched + suffix).rstrip("\r")[:PREVIEW_LENGTH]
+        hits.append(SearchHit(line, column, len(matched), preview.lstrip()))
+        if end > line_end:
+            line += data[start:end].count(b"\n")
+            counted = end
+            line_end = data.find(b"\n", end)
+            if line_end < 0:
+                break
+        # Следующее совпадение - не раньше следующей строки
+        match = pattern.search(data, line_end + 1)
+    return hits
+
+
+def search_files(paths: List[str], source: bytes, flags: int) -> List[Tuple[str, List[SearchHit]]]:
+    """Поиск в нескольких файлах; выполняется в рабочем процессе или потоке"""
+    pattern = re.compile(source, flags)
+    results = []
+    for path in paths:
+        hits = search_file(path, pattern)
+        if hits:
+            results.append((path, hits))
+    return results
+
+
+class ProjectSearch(QObject):
+    """Поиск по всем файлам проекта с выдачей результатов по мере готовности
+
+    Обход дерева (walk_project) идет в отдельном потоке и раздает файлы
+    пачками пулу поиска; результаты каждой пачки приходят в GUI-поток
+    сигналом resultsReady(generation, [(путь, [SearchHit])]), окончание -
+    finished(generation, файлов, совпадений, секунд). Новый поиск или
+    cancel() отменяет текущий: обход останавливается, пачки, еще не
+    начатые в пуле, отменяются, результаты устаревшего поиска отбрасываются.
+
+    Регулярные выражения Python не отпускают GIL, поэтому при
+    use_processes поиск идет в пуле процессов (spawn, как AnalysisPool);
+    по умолчанию - пул потоков: процессам нужно время на запуск, а первые
+    результаты нужны сразу.
+    """
+
+    resultsReady = pyqtSignal(int, object)
+    finished = pyqtSignal(int, int, int, float)
+
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = False, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers or max(2, min(8, os.cpu_count() or 2))
+        self.use_processes = use_processes
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._walker = ThreadPoolExecutor(max_workers=1)
+        self._executor = None
+        # Пачки текущего поиска - для отмены еще не начатых
+        self._futures = []
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                try:
+                    # spawn: форк процесса с запущенным Qt небезопасен
+                    context = multiprocessing.get_context("spawn")
+                    self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+                except (OSError, ValueError, NotImplementedError):
+                    self.use_processes = False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def search(self, root: str, pattern: Pattern) -> int:
+        """Запустить поиск pattern (из compile_bytes_query) в файлах root; возвращает номер поиска"""
+        self.cancel()
+        with self._lock:
+            generation = self._generation
+        self._walker.submit(self._run, generation, root, pattern.pattern, pattern.flags)
+        return generation
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self):
+        # cancel() снимает еще не начатые пачки (cancel_futures появился только в Python 3.9)
+        self.cancel()
+        self._walker.shutdown(wait=False)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _run(self, generation: int, root: str, source: bytes, flags: int):
+        """Выполняется в потоке обхода"""
+        started = time.perf_counter()
+        stopped = lambda: generation != self._generation
+        if stopped():
+            # Поиск отменен (или движок остановлен), пока ждал в очереди обхода
+            return
+        executor = self._get_executor()
+        # Незавершенные пачки, файлов, совпадений, обход закончен
+        state = {"pending": 0, "files": 0, "hits": 0, "walked": False}
+
+        def finish_if_done():
+            # Вызывается под self._lock; finished - после результатов последней пачки
+            if state["walked"] and state["pending"] == 0 and not stopped():
+                self._emit(self.finished, generation, state["files"], state["hits"],
+                           time.perf_counter() - started)
+
+        def on_done(future):
+            results = None
+            if not future.cancelled() and not stopped():
+                try:
+                    results = future.result()
+                except Exception:
+                    results = None
+            if results and not stopped():
+                self._emit(self.resultsReady, generation, results)
+            with self._lock:
+                state["pending"] -= 1
+                if results:
+                    state["hits"] += sum(len(hits) for _, hits in results)
+                finish_if_done()
+
+        def submit(batch):
+            with self._lock:
+                if stopped():
+                    return
+                state["pending"] += 1
+                state["files"] += len(batch)
+                future = executor.submit(search_files, batch, source, flags)
+                self._futures.append(future)
+            future.add_done_callback(on_done)
+
+        batch = []
+        batch_size = FIRST_BATCH_SIZE
+        for path in walk_project(root, stopped):
+            batch.append(path)
+            if len(batch) >= batch_size:
+                submit(batch)
+                batch = []
+                batch_size = min(BATCH_SIZE, batch_size * 2)
+        if batch:
+            submit(batch)
+        with self._lock:
+            state["walked"] = True
+            finish_if_done()
+
+    @staticmethod
+    def _emit(signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # Панель удалена
+            pass
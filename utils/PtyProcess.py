@@ -0,0 +1,193 @@
+import os
+import shutil
+import signal
+import struct
+import time
+from typing import List, Optional
+
+from PyQt5.QtCore import QObject, QSocketNotifier, pyqtSignal
+
+try:
+    import fcntl
+    import pty
+    import termios
+except ImportError:
+    # Нет псевдотерминалов (Windows)
+    pty = None
+
+
+PTY_AVAILABLE = pty is not None
+
+# Размер одного чтения из псевдотерминала
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _exec_child(master_fd: int, slave_fd: int, executable: str, argv: List[str], env: dict, cwd: Optional[str]):
+    """Дочерний процесс после fork: своя сессия, slave-сторона pty - управляющий терминал и stdio
+
+    Родитель многопоточный, поэтому до exec выполняются только системные
+    вызовы; все аргументы подготовлены заранее. Возврата нет.
+    """
+    try:
+        os.setsid()
+        fcntl.ioctl(slave_fd, termios.TIOCSCTTY, 0)
+        for fd in (0, 1, 2):
+            os.dup2(slave_fd, fd)
+        os.close(slave_fd)
+        os.close(master_fd)
+        if cwd:
+            os.chdir(cwd)
+        os.execve(executable, argv, env)
+    finally:
+        os._exit(127)
+
+
+def _exit_code(status: int) -> int:
+    """Код завершения из статуса waitpid: отрицательный номер сигнала, как у subprocess"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class PtyProcess(QObject):
+    """Процесс, подключенный к псевдотерминалу
+
+    Дочерний процесс (os.fork без preexec_fn subprocess - тот небезопасен
+    при работающих потоках) получает slave-сторону pty как
+    stdin/stdout/stderr и собственную сессию, поэтому программы видят настоящий терминал (буферизация
+    строк, Ctrl+C, размер окна). Готовность master-стороны к чтению отслеживает
+    QSocketNotifier: сигнал readyRead сообщает о данных, а потребитель сам
+    забирает их read() столько, сколько успевает обработать - остальное
+    остается в буфере ядра и притормаживает пишущую программу. Запись не
+    блокирует: что не поместилось, дописывается по готовности pty.
+    """
+
+    readyRead = pyqtSignal()
+    finished = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.master_fd: Optional[int] = None
+        self.pid: Optional[int] = None
+        self.exit_code: Optional[int] = None
+        self._read_notifier: Optional[QSocketNotifier] = None
+        self._write_notifier: Optional[QSocketNotifier] = None
+        self._write_buffer = bytearray()
+
+    def start(self, argv: List[str], cwd: Optional[str] = None, columns: int = 80, lines: int = 24):
+        executable = shutil.which(argv[0])
+        if executable is None:
+            raise FileNotFoundError(f"No such program: {argv[0]}")
+        if cwd and not os.path.isdir(cwd):
+            raise FileNotFoundError(f"No such directory: {cwd}")
+        env = dict(os.environ, TERM="xterm-256color", COLORTERM="truecolor")
+
+        master_fd, slave_fd = pty.openpty()
+        self._set_size(slave_fd, lines, columns)
+        try:
+            pid = os.fork()
+        except OSError:
+            os.close(master_fd)
+            os.close(slave_fd)
+            raise
+        if pid == 0:
+            _exec_child(master_fd, slave_fd, executable, argv, env, cwd)
+        os.close(slave_fd)
+        self.pid = pid
+        self.exit_code = None
+
+        os.set_blocking(master_fd, False)
+        self.master_fd = master_fd
+        self._read_notifier = QSocketNotifier(master_fd, QSocketNotifier.Read, self)
+        self._read_notifier.activated.connect(self.readyRead)
+        self._write_notifier = QSocketNotifier(master_fd, QSocketNotifier.Write, self)
+        self._write_notifier.setEnabled(False)
+        self._write_notifier.activated.connect(self._flush_writes)
+
+    def is_running(self) -> bool:
+        return self.master_fd is not None
+
+    def read(self, max_bytes: int = READ_CHUNK_SIZE) -> bytes:
+        """Доступные данные (не больше max_bytes); b"" - данных пока нет"""
+        if self.master_fd is None:
+            return b""
+        try:
+            return os.read(self.master_fd, max_bytes) or self._on_eof()
+        except BlockingIOError:
+            return b""
+        except OSError:
+            # EIO: все процессы закрыли slave-сторону
+            return self._on_eof()
+
+    def write(self, data: bytes):
+        if self.master_fd is None or not data:
+            return
+        self._write_buffer += data
+        self._flush_writes()
+
+    def _flush_writes(self):
+        while self._write_buffer and self.master_fd is not None:
+            try:
+                written = os.write(self.master_fd, self._write_buffer)
+            except BlockingIOError:
+                break
+            except OSError:
+                self._write_buffer.clear()
+                break
+            del self._write_buffer[:written]
+        if self._write_notifier is not None:
+            self._write_notifier.setEnabled(bool(self._write_buffer))
+
+    def resize(self, lines: int, columns: int):
+        """Новый размер окна; ядро отправляет SIGWINCH активной группе процессов"""
+        if self.master_fd is not None:
+            self._set_size(self.master_fd, lines, columns)
+
+    @staticmethod
+    def _set_size(fd: int, lines: int, columns: int):
+        fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", lines, columns, 0, 0))
+
+    def poll(self) -> Optional[int]:
+        """Код завершения процесса или None, пока он работает"""
+        if self.pid is not None and self.exit_code is None:
+            try:
+                pid, status = os.waitpid(self.pid, os.WNOHANG)
+            except ChildProcessError:
+                self.exit_code = -1
+            else:
+                if pid:
+                    self.exit_code = _exit_code(status)
+        return self.exit_code
+
+    def wait(self, timeout: float) -> Optional[int]:
+        deadline = time.monotonic() + timeout
+        while self.poll() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.exit_code
+
+    def send_signal(self, sig: int):
+        """Сигнал всей группе процессов сессии"""
+        if self.pid is not None and self.poll() is None:
+            try:
+                os.killpg(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGKILL)
+        self._on_eof()
+
+    def _on_eof(self) -> bytes:
+        if self.master_fd is None:
+            return b""
+        for notifier in (self._read_notifier, self._write_notifier):
+            notifier.setEnabled(False)
+            notifier.deleteLater()
+        self._read_notifier = self._write_notifier = None
+        os.close(self.master_fd)
+        self.master_fd = None
+        self._write_buffer.clear()
+
+        exit_code = self.wait(timeout=1)
+        self.finished.emit(-1 if exit_code is None else exit_code)
+        return b""
@@ -0,0 +1,244 @@
+import threading
+from array import array
+from typing import Dict, List, Tuple
+
+from PyQt5.QtGui import QFont
+
+from utils.SyntaxEngine import MAX_BLOCK_STATE, STATE_NORMAL, Token
+
+try:
+    from pygments.lexer import RegexLexer
+    from pygments.lexers import get_lexer_by_name
+    from pygments.token import Error, Token as PygmentsToken, _TokenType
+    from pygments.util import ClassNotFound
+    PYGMENTS_AVAILABLE = True
+except ImportError:
+    PYGMENTS_AVAILABLE = False
+
+
+# Цвета в стиле остальных провайдеров; берется ближайший предок типа токена
+TOKEN_STYLES = [
+    ("Comment", "#6A9955", QFont.Normal, False),
+    ("Comment.Preproc", "#C586C0", QFont.Normal, False),
+    ("Keyword", "#569CD6", QFont.Normal, False),
+    ("Keyword.Type", "#4EC9B0", QFont.Normal, False),
+    ("Name.Builtin", "#4EC9B0", QFont.Normal, False),
+    ("Name.Class", "#4EC9B0", QFont.Normal, False),
+    ("Name.Function", "#DCDCAA", QFont.Normal, False),
+    ("Name.Decorator", "#D7BA7D", QFont.Normal, False),
+    ("Name.Tag", "#569CD6", QFont.Normal, False),
+    ("Name.Attribute", "#9CDCFE", QFont.Normal, False),
+    ("Name.Variable", "#9CDCFE", QFont.Normal, False),
+    ("Name.Constant", "#4FC1FF", QFont.Normal, False),
+    ("String", "#CE9178", QFont.Normal, False),
+    ("String.Escape", "#D7BA7D", QFont.Normal, False),
+    ("Number", "#B5CEA8", QFont.Normal, False),
+    ("Generic.Heading", "#569CD6", QFont.Bold, False),
+    ("Generic.Subheading", "#569CD6", QFont.Bold, False),
+    ("Generic.Emph", "#D4D4D4", QFont.Normal, True),
+    ("Generic.Strong", "#D4D4D4", QFont.Bold, False),
+    ("Generic.Inserted", "#B5CEA8", QFont.Normal, False),
+    ("Generic.Deleted", "#CE9178", QFont.Normal, False),
+]
+
+# Максимум кэшированных блоков; при переполнении кэш сбрасывается целиком
+BLOCK_CACHE_SIZE = 50000
+
+
+class PygmentsHighlightEngine:
+    """Движок подсветки на основе лексеров Pygments
+
+    Повторяет цикл RegexLexer.get_tokens_unprocessed, но для одного блока и
+    с явным стеком состояний лексера: стек на конце блока получает
+    целочисленный идентификатор, который хранится как состояние блока.
+    Лексеры, не являющиеся простыми RegexLexer, разбирают каждый блок
+    отдельно. Результаты кэшируются по (текст блока, входное состояние).
+
+    Многие лексеры Pygments распознают блочные комментарии и сырые строки
+    одним регулярным выражением через несколько строк, что при разборе по
+    блокам не срабатывает. Такие конструкции описываются в
+    LanguageConfig.multiline_rules и отслеживаются самим движком.
+
+    Интерфейс совпадает с HighlightEngine: styles, tokenize, tokenize_flat.
+    """
+
+    def __init__(self, language_config):
+        self.language_config = language_config
+        self.styles: List[Tuple[str, int, bool]] = [style[1:] for style in TOKEN_STYLES]
+        self.region_rules = list(language_config.multiline_rules or [])
+        self._region_styles = []
+        for rule in self.region_rules:
+            self._region_styles.append(len(self.styles))
+            self.styles.append((rule.color, rule.weight, rule.italic))
+
+        self._lexer = None
+        if PYGMENTS_AVAILABLE and language_config.pygments_lexer:
+            try:
+                self._lexer = get_lexer_by_name(language_config.pygments_lexer, stripnl=False, ensurenl=False,
+                                                **dict(language_config.pygments_options))
+            except ClassNotFound:
+                self._lexer = None
+        self._stateful = (
+            self._lexer is not None
+            and type(self._lexer).get_tokens_unprocessed is RegexLexer.get_tokens_unprocessed
+        )
+
+        self._token_styles: Dict[object, int] = {}
+        self._style_roots = {}
+        if PYGMENTS_AVAILABLE:
+            for style_id, (name, *_style) in enumerate(TOKEN_STYLES):
+                token_type = PygmentsToken
+                for part in name.split("."):
+                    token_type = getattr(token_type, part)
+                self._style_roots[token_type] = style_id
+
+        # Состояние блока - (стек лексера, индекс незакрытой конструкции или -1)
+        self._states: List[Tuple[Tuple[str, ...], int]] = [(("root",), -1)]
+        self._state_ids: Dict[Tuple[Tuple[str, ...], int], int] = {(("root",), -1): STATE_NORMAL}
+        self._state_lock = threading.Lock()
+        self._cache: Dict[Tuple[str, int], Tuple[List[Token], int]] = {}
+
+    def _style_for(self, token_type):
+        """Стиль для типа токена или None, если тип не подсвечивается"""
+        try:
+            return self._token_styles[token_type]
+        except KeyError:
+            pass
+        style_id = None
+        current = token_type
+        while current is not None:
+            if current in self._style_roots:
+                style_id = self._style_roots[current]
+                break
+            current = current.parent
+        self._token_styles[token_type] = style_id
+        return style_id
+
+    def _state_for(self, stack: List[str], region: int = -1) -> int:
+        key = (tuple(stack), region)
+        state = self._state_ids.get(key)
+        if state is not None:
+            return state
+        with self._state_lock:
+            state = self._state_ids.get(key)
+            if state is None:
+                if len(self._states) > MAX_BLOCK_STATE:
+                    return STATE_NORMAL
+                state = len(self._states)
+                self._states.append(key)
+                self._state_ids[key] = state
+        return state
+
+    def _lex(self, text: str, statestack: List[str]):
+        """Разбор строки с заданного стека; возвращает токены Pygments и итоговый стек"""
+        lexer = self._lexer
+        if not self._stateful:
+            return list(lexer.get_tokens_unprocessed(text)), ["root"]
+
+        tokens = []
+        pos = 0
+        tokendefs = lexer._tokens
+        statestack = list(statestack)
+        statetokens = tokendefs[statestack[-1]]
+        length = len(text)
+        while pos < length:
+            for rexmatch, action, new_state in statetokens:
+                m = rexmatch(text, pos)
+                if m:
+                    if action is not None:
+                        if type(action) is _TokenType:
+                            tokens.append((pos, action, m.group()))
+                        else:
+                            tokens.extend(action(lexer, m))
+                    pos = m.end()
+                    if new_state is not None:
+                        if isinstance(new_state, tuple):
+                            for new in new_state:
+                                if new == "#pop":
+                                    if len(statestack) > 1:
+                                        statestack.pop()
+                                elif new == "#push":
+                                    statestack.append(statestack[-1])
+                                else:
+                                    statestack.append(new)
+                        elif isinstance(new_state, int):
+                            if abs(new_state) >= len(statestack):
+                                del statestack[1:]
+                            else:
+                                del statestack[new_state:]
+                        elif new_state == "#push":
+                            statestack.append(statestack[-1])
+                        statetokens = tokendefs[statestack[-1]]
+                    break
+            else:
+                if text[pos] == "\n":
+                    statestack = ["root"]
+                    statetokens = tokendefs["root"]
+                else:
+                    tokens.append((pos, Error, text[pos]))
+                pos += 1
+        return tokens, statestack
+
+    def _open_region(self, text: str, start: int):
+        """Индекс конструкции, которая начинается в start и не закрывается в этой строке"""
+        for index, rule in enumerate(self.region_rules):
+            if text.startswith(rule.start, start) and text.find(rule.end, start + len(rule.start)) < 0:
+                return index
+        return -1
+
+    def tokenize(self, text: str, state: int = STATE_NORMAL) -> Tuple[List[Token], int]:
+        """Разбор блока: возвращает токены (start, length, style_id) и выходное состояние"""
+        if self._lexer is None:
+            return [], STATE_NORMAL
+
+        key = (text, state)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        stack, region = self._states[state] if state < len(self._states) else self._states[STATE_NORMAL]
+        tokens = []
+        length = len(text)
+        pos = 0
+
+        if region >= 0:
+            end = self.region_rules[region].end
+            found = text.find(end)
+            if found < 0:
+                tokens.append((0, length, self._region_styles[region]))
+                result = (tokens, state)
+                self._store(key, result)
+                return result
+            pos = found + len(end)
+            tokens.append((0, pos, self._region_styles[region]))
+
+        # Лексеры Pygments рассчитаны на строки с переводом строки в конце
+        raw_tokens, exit_stack = self._lex(text[pos:] + "\n", stack)
+        exit_region = -1
+        for start, token_type, value in raw_tokens:
+            start += pos
+            if start >= length:
+                break
+            if self.region_rules:
+                exit_region = self._open_region(text, start)
+                if exit_region >= 0:
+                    tokens.append((start, length - start, self._region_styles[exit_region]))
+                    exit_stack = stack
+                    break
+            style_id = self._style_for(token_type)
+            if style_id is not None and value:
+                tokens.append((start, min(len(value), length - start), style_id))
+
+        result = (tokens, self._state_for(exit_stack, exit_region))
+        self._store(key, result)
+        return result
+
+    def _store(self, key, result):
+        if len(self._cache) >= BLOCK_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = result
+
+    def tokenize_flat(self, text: str, state: int = STATE_NORMAL) -> Tuple[array, int]:
+        """То же, что tokenize, но токены упакованы в плоский array: start, length, style_id, ..."""
+        tokens, exit_state = self.tokenize(text, state)
+        return array("i", [value for token in tokens for value in token]), exit_state
@@ -0,0 +1,380 @@
+import ast
+import hashlib
+import multiprocessing
+import os
+import re
+import sqlite3
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.AppPaths import app_data_dir
+from utils.CompletionIndex import CompletionIndex
+
+
+SCHEMA_VERSION = 1
+
+# Определения в языках без разбора через ast
+_DEFINITION_PATTERNS = [
+    (re.compile(r'^[ \t]*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)', re.M), "function"),
+    (re.compile(r'^[ \t]*(?:export\s+)?(?:public\s+|private\s+|abstract\s+|final\s+|static\s+)*class\s+(\w+)', re.M), "class"),
+    (re.compile(r'^[ \t]*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=', re.M), "variable"),
+    (re.compile(r'^func\s+(?:\([^)]*\)\s*)?(\w+)', re.M), "function"),
+    (re.compile(r'^[ \t]*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?fn\s+(\w+)', re.M), "function"),
+    (re.compile(r'^[ \t]*(?:pub\s+)?(?:struct|enum|trait|interface|type)\s+(\w+)', re.M), "class"),
+    (re.compile(r'^[ \t]*def\s+(?:self\.)?(\w+[?!]?)', re.M), "function"),
+    (re.compile(r'^[ \t]*(?:module)\s+(\w+)', re.M), "class"),
+]
+
+Definition = Tuple[str, str, int, int]
+
+
+@dataclass
+class Symbol:
+    name: str
+    kind: str
+    path: str
+    line: int
+    column: int
+
+
+def _python_definitions(source: str) -> List[Definition]:
+    tree = ast.parse(source)
+    definitions = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            definitions.append((node.name, "function", node.lineno, node.col_offset))
+        elif isinstance(node, ast.ClassDef):
+            definitions.append((node.name, "class", node.lineno, node.col_offset))
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                name = alias.asname or alias.name.split(".")[0]
+                if name != "*":
+                    definitions.append((name, "import", node.lineno, node.col_offset))
+
+    # Присваивания учитываются только на уровне модуля
+    for node in tree.body:
+        targets = []
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+            targets = [node.target]
+        for target in targets:
+            for name_node in ast.walk(target):
+                if isinstance(name_node, ast.Name):
+                    definitions.append((name_node.id, "variable", name_node.lineno, name_node.col_offset))
+    return definitions
+
+
+def _regex_definitions(source: str) -> List[Definition]:
+    line_starts = [0]
+    line_starts.extend(match.end() for match in re.finditer("\n", source))
+    definitions = []
+    for pattern, kind in _DEFINITION_PATTERNS:
+        for match in pattern.finditer(source):
+            offset = match.start(1)
+            line = bisect_right(line_starts, offset)
+            definitions.append((match.group(1), kind, line, offset - line_starts[line - 1]))
+    return definitions
+
+
+def extract_definitions(path: str) -> Tuple[str, float, int, str, Optional[List[Definition]]]:
+    """Определения файла: (путь, mtime, размер, хэш, [(имя, вид, строка, колонка)])
+
+    Выполняется в рабочем процессе. Строки нумеруются с 1, колонки с 0.
+    """
+    try:
+        stat = os.stat(path)
+        data = Path(path).read_bytes()
+    except OSError:
+        return path, 0.0, 0, "", None
+
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    source = data.decode("utf-8", errors="replace")
+    if path.endswith((".py", ".pyw")):
+        try:
+            definitions = _python_definitions(source)
+        except (SyntaxError, ValueError):
+            definitions = _regex_definitions(source)
+    else:
+        definitions = _regex_definitions(source)
+    return path, stat.st_mtime, stat.st_size, digest, definitions
+
+
+class ProjectSymbolIndex(QObject):
+    """Постоянный индекс определений проекта
+
+    Хранится в SQLite в каталоге данных пользователя (app_data_dir), по
+    файлу на корень проекта - в дереве проекта ничего не создается: таблица
+    файлов с mtime, размером и хэшем содержимого и таблица символов с
+    позициями. При открытии проекта заново разбираются только файлы,
+    у которых изменились mtime/размер и хэш; удаленные файлы вычищаются.
+    Обновление идет в фоновом потоке (при большом числе файлов разбор -
+    в пуле процессов), запросы из GUI-потока читают базу через свое
+    соединение (режим WAL).
+
+    completion_index - имена проекта для автодополнения; после обновления
+    в него вносятся только изменения, а при большом числе изменений
+    новый индекс строится в фоне и подменяет старый.
+    """
+
+    indexUpdated = pyqtSignal(int)
+    # Внутренние: доставка изменений имен в GUI-поток
+    _namesChanged = pyqtSignal(object, object, object)
+    _namesReplaced = pyqtSignal(object, object)
+
+    DB_DIR = "symbols"
+    PROCESS_POOL_THRESHOLD = 64
+    # При стольких изменениях имен индекс дополнения строится заново
+    COMPLETION_REBUILD_THRESHOLD = 1000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root_path: Optional[Path] = None
+        self.db_path: Optional[Path] = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._read_connection: Optional[sqlite3.Connection] = None
+        self.completion_index = CompletionIndex()
+        # Имена, уже переданные в completion_index; только фоновый поток
+        self._loaded_names: Set[str] = set()
+        self._namesChanged.connect(self._on_names_changed)
+        self._namesReplaced.connect(self._on_names_replaced)
+
+    def open_project(self, root_path: str, files: Union[Iterable[str], Callable[[], Iterable[str]]]):
+        """Подключение индекса проекта и фоновое обновление по списку файлов
+
+        files может быть функцией: обход дерева проекта тогда тоже
+        выполняется в фоновом потоке.
+        """
+        self.close_project()
+        self.root_path = Path(root_path)
+        try:
+            self.db_path = self.database_path(self.root_path)
+            connection = self._connect()
+            self._ensure_schema(connection)
+            connection.close()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Symbol index unavailable: {e}")
+            self.db_path = None
+            return
+        self._executor.submit(self._update, self.db_path, files, True)
+
+    @classmethod
+    def database_path(cls, root_path: Path) -> Path:
+        """База индекса проекта: имя каталога и хэш его полного пути"""
+        root = str(root_path.resolve())
+        digest = hashlib.sha1(root.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        return app_data_dir(cls.DB_DIR) / f"{Path(root).name or 'root'}-{digest}.db"
+
+    def close_project(self):
+        if self._read_connection is not None:
+            self._read_connection.close()
+            self._read_connection = None
+        self.root_path = None
+        self.db_path = None
+        self.completion_index = CompletionIndex()
+        self._executor.submit(self._loaded_names.clear)
+
+    def update_files(self, paths: Iterable[str]):
+        """Переиндексация отдельных файлов (например, после сохранения)"""
+        if self.db_path is None:
+            return
+        paths = [str(path) for path in paths if self.contains(path)]
+        if paths:
+            self._executor.submit(self._update, self.db_path, paths, False)
+
+    def contains(self, path: str) -> bool:
+        if self.root_path is None:
+            return False
+        try:
+            Path(path).resolve().relative_to(self.root_path.resolve())
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def find_definitions(self, name: str) -> List[Symbol]:
+        """Все определения имени в проекте"""
+        connection = self._reader()
+        if connection is None:
+            return []
+        rows = connection.execute(
+            "SELECT s.name, s.kind, f.path, s.line, s.col FROM symbols s JOIN files f ON f.id = s.file_id "
+            "WHERE s.name = ? ORDER BY s.kind = 'import', f.path, s.line",
+            (name,)
+        ).fetchall()
+        return [Symbol(*row) for row in rows]
+
+    def complete(self, prefix: str, limit: int = 50) -> List[str]:
+        """Имена проекта, начинающиеся с prefix (поиск по индексу, без сканирования)"""
+        connection = self._reader()
+        if connection is None or not prefix:
+            return []
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        rows = connection.execute(
+            "SELECT DISTINCT name FROM symbols WHERE name >= ? AND name < ? ORDER BY name LIMIT ?",
+            (prefix, upper, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self.db_path), timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self) -> Optional[sqlite3.Connection]:
+        if self.db_path is None:
+            return None
+        if self._read_connection is None:
+            try:
+                self._read_connection = self._connect()
+            except sqlite3.Error:
+                return None
+        return self._read_connection
+
+    @staticmethod
+    def _ensure_schema(connection: sqlite3.Connection):
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return
+        connection.executescript("""
+            DROP TABLE IF EXISTS symbols;
+            DROP TABLE IF EXISTS files;
+            CREATE TABLE files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            );
+            CREATE TABLE symbols (
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+                line INTEGER NOT NULL,
+                col INTEGER NOT NULL
+            );
+            CREATE INDEX symbols_name ON symbols(name);
+            CREATE INDEX symbols_file ON symbols(file_id);
+        """)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.commit()
+
+    def _update(self, db_path: Path, paths, full: bool):
+        """Выполняется в фоновом потоке"""
+        try:
+            if callable(paths):
+                paths = paths()
+            paths = [str(path) for path in paths]
+            # Однопоточный исполнитель: обновления не пересекаются
+            changed = self._apply_update(db_path, paths, full)
+            if changed or not self._loaded_names:
+                self._publish_names(db_path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Symbol index update error: {e}")
+            return
+        except RuntimeError:
+            # Приложение уже закрывается
+            return
+        try:
+            self.indexUpdated.emit(changed)
+        except RuntimeError:
+            pass
+
+    def _publish_names(self, db_path: Path):
+        """Передача изменившихся имен в индекс дополнения (фоновый поток)"""
+        connection = sqlite3.connect(str(db_path), timeout=10)
+        try:
+            names = {row[0] for row in connection.execute("SELECT DISTINCT name FROM symbols")}
+        finally:
+            connection.close()
+        added = names - self._loaded_names
+        removed = self._loaded_names - names
+        self._loaded_names = names
+        if len(added) + len(removed) >= self.COMPLETION_REBUILD_THRESHOLD:
+            self._namesReplaced.emit(db_path, CompletionIndex(names))
+        elif added or removed:
+            self._namesChanged.emit(db_path, added, removed)
+
+    def _on_names_changed(self, db_path, added, removed):
+        if db_path == self.db_path:
+            self.completion_index.remove(removed)
+            self.completion_index.add(added)
+
+    def _on_names_replaced(self, db_path, index):
+        if db_path == self.db_path:
+            self.completion_index = index
+
+    def _apply_update(self, db_path: Path, paths: List[str], full: bool) -> int:
+        connection = sqlite3.connect(str(db_path), timeout=10)
+        try:
+            known: Dict[str, Tuple[int, float, int, str]] = {
+                row[0]: row[1:] for row in connection.execute("SELECT path, id, mtime, size, hash FROM files")
+            }
+
+            candidates = []
+            for path in paths:
+                row = known.get(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if row is None or row[1] != stat.st_mtime or row[2] != stat.st_size:
+                    candidates.append(path)
+
+            results = self._extract(candidates)
+
+            changed = 0
+            with connection:
+                for path, mtime, size, digest, definitions in results:
+                    if definitions is None:
+                        continue
+                    row = known.get(path)
+                    if row is not None and row[3] == digest:
+                        # Содержимое не изменилось - только время
+                        connection.execute("UPDATE files SET mtime = ?, size = ? WHERE id = ?", (mtime, size, row[0]))
+                        continue
+                    if row is not None:
+                        connection.execute("DELETE FROM symbols WHERE file_id = ?", (row[0],))
+                        connection.execute("UPDATE files SET mtime = ?, size = ?, hash = ? WHERE id = ?",
+                                           (mtime, size, digest, row[0]))
+                        file_id = row[0]
+                    else:
+                        file_id = connection.execute(
+                            "INSERT INTO files (path, mtime, size, hash) VALUES (?, ?, ?, ?)",
+                            (path, mtime, size, digest)
+                        ).lastrowid
+                    connection.executemany(
+                        "INSERT INTO symbols (name, kind, file_id, line, col) VALUES (?, ?, ?, ?, ?)",
+                        [(name, kind, file_id, line, col) for name, kind, line, col in definitions]
+                    )
+                    changed += 1
+
+                if full:
+                    # Файлы, которых больше нет в проекте
+                    current = set(paths)
+                    removed = [(row[0],) for path, row in known.items() if path not in current]
+                    connection.executemany("DELETE FROM symbols WHERE file_id = ?", removed)
+                    connection.executemany("DELETE FROM files WHERE id = ?", removed)
+                    changed += len(removed)
+            return changed
+        finally:
+            connection.close()
+
+    def _extract(self, paths: List[str]):
+        if len(paths) < self.PROCESS_POOL_THRESHOLD:
+            return [extract_definitions(path) for path in paths]
+        try:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(mp_context=context) as pool:
+                return list(pool.map(extract_definitions, paths, chunksize=32))
+        except (OSError, RuntimeError, ValueError):
+            return [extract_definitions(path) for path in paths]
+
+
+# Глобальный экземпляр
+symbol_index = ProjectSymbolIndex()
@@ -0,0 +1,197 @@
+import re
+from array import array
+from typing import Dict, List, Tuple
+
+
+# Состояние блока: 0 - обычный код, N > 0 - внутри многострочного правила N - 1
+STATE_NORMAL = 0
+
+# Наибольшее состояние блока, которое умеют хранить подсветчики
+MAX_BLOCK_STATE = 2047
+
+# Идентификатор: проверяется по словарю ключевых слов за O(1)
+IDENTIFIER_PATTERN = r"[^\W\d]\w*"
+
+# Правило вида \b(foo|bar)\b - это просто список слов
+_WORD_LIST_RE = re.compile(r"^\\b\((\w+(?:\|\w+)*)\)\\b$")
+
+Token = Tuple[int, int, int]
+
+
+class HighlightEngine:
+    """Однопроходный движок подсветки.
+
+    Все правила языка объединяются в одно регулярное выражение с
+    именованными группами, поэтому строка сканируется один раз, а не по
+    разу на каждое правило. Пересечения разрешаются так: выигрывает
+    совпадение, начинающееся левее, а при равном начале - правило с
+    большим приоритетом (при равном приоритете - объявленное раньше).
+    Начала многострочных конструкций имеют наивысший приоритет.
+
+    Ключевые слова и правила-списки слов вида \b(foo|bar)\b не попадают в
+    общее выражение: вместо них используется одна альтернатива
+    "идентификатор" и поиск слова в словаре стилей за O(1). Эта
+    альтернатива занимает место самого приоритетного из свернутых правил.
+
+    Движок не зависит от Qt: результатом разбора блока является список
+    токенов (start, length, style_id) и состояние конца блока, с которым
+    должен начинаться следующий блок.
+    """
+
+    def __init__(self, language_config):
+        self.language_config = language_config
+        self.styles: List[Tuple[str, int, bool]] = []
+        self._style_ids: Dict[Tuple[str, int, bool], int] = {}
+
+        self.region_rules = list(language_config.multiline_rules or [])
+        self._region_styles = [
+            self._style_id(rule.color, rule.weight, rule.italic) for rule in self.region_rules
+        ]
+        self._end_res = [
+            re.compile(r"\\.|" + re.escape(rule.end), re.DOTALL) if rule.escape else None
+            for rule in self.region_rules
+        ]
+
+        self.keywords = frozenset(language_config.keywords or ())
+        keyword_style = self._style_id(language_config.keyword_color, language_config.keyword_weight, False)
+        self._word_styles: Dict[str, int] = dict.fromkeys(self.keywords, keyword_style)
+
+        parts = []
+        self._group_styles: Dict[str, int] = {}
+        self._group_regions: Dict[str, int] = {}
+
+        # Длинные разделители первыми, чтобы """ не распознавалась как "
+        region_order = sorted(range(len(self.region_rules)),
+                              key=lambda i: len(self.region_rules[i].start), reverse=True)
+        for index in region_order:
+            name = f"m{index}"
+            parts.append(f"(?P<{name}>{re.escape(self.region_rules[index].start)})")
+            self._group_regions[name] = index
+
+        rules = list(language_config.syntax_rules or [])
+        rule_order = sorted(range(len(rules)), key=lambda i: -rules[i].priority)
+        identifier_slot = None
+        folded_words = {}
+        for index in rule_order:
+            rule = rules[index]
+            style_id = self._style_id(rule.color, rule.weight, rule.italic)
+            word_list = _WORD_LIST_RE.match(rule.pattern)
+            if word_list:
+                for word in word_list.group(1).split("|"):
+                    folded_words.setdefault(word, style_id)
+                if identifier_slot is None:
+                    identifier_slot = len(parts)
+                continue
+            name = f"r{index}"
+            parts.append(f"(?P<{name}>{rule.pattern})")
+            self._group_styles[name] = style_id
+
+        # Правила-списки приоритетнее ключевых слов
+        self._word_styles.update(folded_words)
+        if self._word_styles:
+            if identifier_slot is None:
+                identifier_slot = len(parts)
+            parts.insert(identifier_slot, f"(?P<kw>{IDENTIFIER_PATTERN})")
+
+        self._pattern = re.compile("|".join(parts)) if parts else None
+
+    def _style_id(self, color: str, weight: int, italic: bool) -> int:
+        key = (color, weight, italic)
+        style_id = self._style_ids.get(key)
+        if style_id is None:
+            style_id = len(self.styles)
+            self.styles.append(key)
+            self._style_ids[key] = style_id
+        return style_id
+
+    def _find_region_end(self, text: str, pos: int, index: int) -> int:
+        """Позиция сразу после закрывающего разделителя или -1"""
+        end = self.region_rules[index].end
+        end_re = self._end_res[index]
+        if end_re is None:
+            found = text.find(end, pos)
+            return found + len(end) if found >= 0 else -1
+
+        for match in end_re.finditer(text, pos):
+            if match.group() == end:
+                return match.end()
+        return -1
+
+    def tokenize(self, text: str, state: int = STATE_NORMAL) -> Tuple[List[Token], int]:
+        """Разбор блока: возвращает токены (start, length, style_id) и выходное состояние"""
+        tokens = []
+        length = len(text)
+        pos = 0
+
+        if state > STATE_NORMAL:
+            index = state - 1
+            end = self._find_region_end(text, 0, index)
+            if end < 0:
+                if length:
+                    tokens.append((0, length, self._region_styles[index]))
+                return tokens, state
+            tokens.append((0, end, self._region_styles[index]))
+            pos = end
+
+        if self._pattern is None:
+            return tokens, STATE_NORMAL
+
+        search = self._pattern.search
+        word_styles = self._word_styles
+        group_styles = self._group_styles
+
+        while pos < length:
+            match = search(text, pos)
+            if match is None:
+                break
+
+            start, end = match.span()
+            if end == start:
+                pos = start + 1
+                continue
+
+            name = match.lastgroup
+            if name == "kw":
+                style_id = word_styles.get(match.group())
+                if style_id is not None:
+                    tokens.append((start, end - start, style_id))
+            elif name in group_styles:
+                tokens.append((start, end - start, group_styles[name]))
+            else:
+                index = self._group_regions[name]
+                region_end = self._find_region_end(text, end, index)
+                if region_end < 0:
+                    tokens.append((start, length - start, self._region_styles[index]))
+                    return tokens, index + 1
+                tokens.append((start, region_end - start, self._region_styles[index]))
+                end = region_end
+            pos = end
+
+        return tokens, STATE_NORMAL
+
+    def tokenize_flat(self, text: str, state: int = STATE_NORMAL) -> Tuple[array, int]:
+        """То же, что tokenize, но токены упакованы в плоский array: start, length, style_id, ..."""
+        tokens, exit_state = self.tokenize(text, state)
+        return array("i", [value for token in tokens for value in token]), exit_state
+
+
+# Движки по конфигурации языка: конфигурации неизменяемы, поэтому
+# скомпилированные выражения и кэш блоков делят все вкладки языка
+_engine_cache: Dict[object, object] = {}
+
+
+def create_highlight_engine(language_config):
+    """Движок подсветки для конфигурации языка (один на конфигурацию)
+
+    Языки, описанные лексером Pygments, разбирает PygmentsHighlightEngine;
+    модуль импортируется только при первом таком языке.
+    """
+    engine = _engine_cache.get(language_config)
+    if engine is None:
+        if getattr(language_config, "pygments_lexer", None):
+            from utils.PygmentsEngine import PygmentsHighlightEngine
+            engine = PygmentsHighlightEngine(language_config)
+        else:
+            engine = HighlightEngine(language_config)
+        _engine_cache[language_config] = engine
+    return engine
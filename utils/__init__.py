@@ -16,4 +16,12 @@ class EditorSettings:
         self.auto_save_interval = 30
         self.show_line_numbers = True
         self.syntax_highlighting = True
-        self.word_wrap = False
\ No newline at end of file
+        self.word_wrap = False
+        
+        # Подсветка больших файлов
+        self.lazy_highlight_threshold = 20000
+        self.highlight_slice_ms = 8
+        self.large_file_threshold_mb = 20
+        
+        # Терминал
+        self.terminal_scrollback_lines = 10000
@@ -1,14 +1,22 @@
 # widgets/ConsoleWidget.py
+import os
+
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTabWidget, 
-                            QTextEdit, QListWidget, QListWidgetItem, QPushButton,
+                            QListWidget, QListWidgetItem, QPushButton,
                             QLabel, QSplitter)
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
-from .TerminalWidget import TerminalWidget
+from .TerminalOutput import DEFAULT_SCROLLBACK_LINES, DiagnosticOutputView
+from .TerminalWidget import TerminalWidget, resolve_diagnostic_path
+from .ProjectSearchPanel import ProjectSearchPanel
 
 class ConsoleWidget(QWidget):
-    def __init__(self, parent=None):
+    # Переход к месту ошибки: путь, строка с 1, колонка с 0 (как у openRequested поиска)
+    diagnosticActivated = pyqtSignal(str, int, int)
+    
+    def __init__(self, parent=None, scrollback_lines=DEFAULT_SCROLLBACK_LINES):
         super().__init__(parent)
+        self.scrollback_lines = scrollback_lines
         self.setup_ui()
         
     def setup_ui(self):
@@ -56,9 +64,14 @@ class ConsoleWidget(QWidget):
         self.tab_widget.addTab(self.output_widget, "Output")
         
         # Вкладка Terminal
-        self.terminal_widget = TerminalWidget(self)
+        self.terminal_widget = TerminalWidget(self, self.scrollback_lines)
+        self.terminal_widget.diagnosticActivated.connect(self.open_diagnostic)
         self.tab_widget.addTab(self.terminal_widget, "Terminal")
         
+        # Вкладка Search (поиск по проекту)
+        self.search_widget = ProjectSearchPanel(self)
+        self.tab_widget.addTab(self.search_widget, "Search")
+        
         layout.addWidget(self.tab_widget)
     
     def create_problems_tab(self):
@@ -150,10 +163,10 @@ class ConsoleWidget(QWidget):
         toolbar.addWidget(self.clear_output_btn)
         
         # Текстовое поле для вывода
-        self.output_text = QTextEdit()
-        self.output_text.setReadOnly(True)
+        self.output_text = DiagnosticOutputView(scrollback_lines=self.scrollback_lines)
+        self.output_text.diagnosticActivated.connect(self.open_output_diagnostic)
         self.output_text.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1E1E1E;
                 color: #CCCCCC;
                 border: none;
@@ -185,17 +198,17 @@ class ConsoleWidget(QWidget):
     
     def append_output(self, text, is_error=False):
         """Добавляет текст в вывод"""
-        cursor = self.output_text.textCursor()
-        cursor.movePosition(cursor.End)
-        
-        if is_error:
-            self.output_text.setTextColor(QColor("#F44747"))
-        else:
-            self.output_text.setTextColor(QColor("#CCCCCC"))
-            
-        cursor.insertText(text)
-        self.output_text.setTextCursor(cursor)
-        self.output_text.ensureCursorVisible()
+        self.output_text.append_output(text, "#F44747" if is_error else "#CCCCCC")
+    
+    def open_output_diagnostic(self, file_path, line, column):
+        """Переход по диагностике из вывода сборки"""
+        file_path = resolve_diagnostic_path(file_path, 0, os.getcwd())
+        if file_path:
+            self.open_diagnostic(file_path, line, column)
+    
+    def open_diagnostic(self, file_path, line, column):
+        # Компиляторы считают колонки с 1, редактор - с 0
+        self.diagnosticActivated.emit(file_path, line, max(column - 1, 0))
     
     def clear_problems(self):
         """Очищает список проблем"""
@@ -209,9 +222,13 @@ class ConsoleWidget(QWidget):
         """Возвращает терминал для внешнего использования"""
         return self.terminal_widget
     
+    def get_project_search(self):
+        """Возвращает панель поиска по проекту"""
+        return self.search_widget
+    
     def set_current_tab(self, tab_name):
         """Устанавливает текущую вкладку по имени"""
-        tab_names = ["Problems", "Output", "Terminal"]
+        tab_names = ["Problems", "Output", "Terminal", "Search"]
         if tab_name in tab_names:
             index = tab_names.index(tab_name)
             self.tab_widget.setCurrentIndex(index)
\ No newline at end of file
@@ -0,0 +1,337 @@
+# widgets/FindReplacePanel.py
+import re
+from typing import Optional, Tuple
+
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QKeyEvent, QTextCursor
+from PyQt5.QtWidgets import QGridLayout, QLabel, QLineEdit, QToolButton, QWidget
+
+from utils.FindEngine import FindWorker, MatchIndex, SearchQuery, compile_query, match_at, plan_replacements
+
+
+class FindReplacePanel(QWidget):
+    """Панель поиска и замены для CodeEditor
+
+    Документ просматривается целиком один раз - в фоне (FindWorker) при
+    изменении запроса. Дальше индекс совпадений (MatchIndex) обновляется по
+    contentsChange: перепроверяются только затронутые правкой строки, поэтому
+    счетчик совпадений меняется вместе с вводом. Редактор подсвечивает лишь
+    видимые совпадения, текущее - обычное выделение редактора. Замена всех
+    совпадений выполняется одним beginEditBlock (одно действие отмены).
+    """
+
+    closed = pyqtSignal()
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.index = MatchIndex()
+        self.worker = FindWorker(self)
+        self.worker.finished.connect(self._on_search_finished)
+        # Ревизия документа, по снимку которой идет поиск (None - поиск не идет)
+        self._search_revision: Optional[int] = None
+        self._search_pattern = None
+        # Снимок текста документа и его ревизия: при вводе запроса документ не копируется заново
+        self._snapshot: Tuple[int, str] = (-1, "")
+        self._revision = editor.document().revision()
+        # Перейти к совпадению, когда придет результат поиска
+        self._jump_on_result = False
+        editor.document().contentsChange.connect(self._on_contents_change)
+
+        self._setup_ui()
+        self.hide()
+
+    def _setup_ui(self):
+        # Иначе фон из таблицы стилей у простого QWidget не рисуется
+        self.setAttribute(Qt.WA_StyledBackground, True)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #252526;
+                color: #cccccc;
+            }
+            QLineEdit {
+                background-color: #1e1e1e;
+                color: #ffffff;
+                border: 1px solid #3c3c3c;
+                border-radius: 3px;
+                padding: 2px 6px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #007acc;
+            }
+            QToolButton {
+                background-color: transparent;
+                border: 1px solid transparent;
+                border-radius: 3px;
+                padding: 2px 6px;
+                color: #cccccc;
+            }
+            QToolButton:hover {
+                background-color: #3e3e42;
+            }
+            QToolButton:checked {
+                background-color: #094771;
+                border: 1px solid #007acc;
+            }
+        """)
+
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Find")
+        self.find_input.textChanged.connect(self._on_query_changed)
+        self.find_input.returnPressed.connect(self.find_next)
+
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("Replace")
+        self.replace_input.returnPressed.connect(self.replace_current)
+
+        self.case_button = self._make_button("Aa", "Match case", self._on_query_changed, checkable=True)
+        self.word_button = self._make_button("ab", "Match whole word", self._on_query_changed, checkable=True)
+        self.regex_button = self._make_button(".*", "Use regular expression", self._on_query_changed, checkable=True)
+
+        self.count_label = QLabel("")
+        self.count_label.setMinimumWidth(90)
+
+        self.previous_button = self._make_button("↑", "Previous match (Shift+F3)", self.find_previous)
+        self.next_button = self._make_button("↓", "Next match (F3)", self.find_next)
+        self.close_button = self._make_button("✕", "Close (Escape)", self.close_panel)
+        self.replace_button = self._make_button("Replace", "Replace", self.replace_current)
+        self.replace_all_button = self._make_button("All", "Replace all", self.replace_all)
+
+        layout = QGridLayout(self)
+        layout.setContentsMargins(6, 4, 6, 4)
+        layout.setHorizontalSpacing(4)
+        layout.setVerticalSpacing(4)
+        layout.addWidget(self.find_input, 0, 0)
+        layout.addWidget(self.case_button, 0, 1)
+        layout.addWidget(self.word_button, 0, 2)
+        layout.addWidget(self.regex_button, 0, 3)
+        layout.addWidget(self.count_label, 0, 4)
+        layout.addWidget(self.previous_button, 0, 5)
+        layout.addWidget(self.next_button, 0, 6)
+        layout.addWidget(self.close_button, 0, 7)
+        layout.addWidget(self.replace_input, 1, 0)
+        layout.addWidget(self.replace_button, 1, 1, 1, 3)
+        layout.addWidget(self.replace_all_button, 1, 4)
+        layout.setColumnStretch(0, 1)
+
+    def _make_button(self, text: str, tooltip: str, callback, checkable: bool = False) -> QToolButton:
+        button = QToolButton()
+        button.setText(text)
+        button.setToolTip(tooltip)
+        button.setCheckable(checkable)
+        button.setFocusPolicy(Qt.NoFocus)
+        if checkable:
+            button.toggled.connect(callback)
+        else:
+            button.clicked.connect(callback)
+        return button
+
+    def _set_replace_visible(self, visible: bool):
+        for widget in (self.replace_input, self.replace_button, self.replace_all_button):
+            widget.setVisible(visible)
+
+    def query(self) -> SearchQuery:
+        return SearchQuery(self.find_input.text(), self.case_button.isChecked(),
+                           self.word_button.isChecked(), self.regex_button.isChecked())
+
+    # Показ и скрытие
+
+    def show_find(self, replace: bool = False):
+        """Показать панель; однострочное выделение редактора становится запросом"""
+        self._set_replace_visible(replace)
+        selected = self.editor.textCursor().selectedText()
+        was_visible = self.isVisible()
+        self.show()
+        if selected and '\u2029' not in selected and selected != self.find_input.text():
+            # textChanged запустит поиск
+            self.find_input.setText(selected)
+        elif not was_visible:
+            self.search()
+        field = self.replace_input if replace and self.find_input.text() else self.find_input
+        field.setFocus()
+        field.selectAll()
+
+    def close_panel(self):
+        self.hide()
+        self.worker.cancel()
+        self._search_revision = None
+        self._snapshot = (-1, "")
+        self.index.clear()
+        self.editor.find_matches = None
+        self.editor.apply_extra_selections()
+        self.editor.setFocus()
+        self.closed.emit()
+
+    def keyPressEvent(self, event: QKeyEvent):
+        if event.key() == Qt.Key_Escape:
+            self.close_panel()
+            return
+        super().keyPressEvent(event)
+
+    # Поиск
+
+    def _on_query_changed(self, *args):
+        self._jump_on_result = True
+        self.search()
+
+    def search(self):
+        """Запустить полный поиск по снимку документа в фоне"""
+        pattern = compile_query(self.query())
+        if pattern is None:
+            self.worker.cancel()
+            self._search_revision = None
+            self.index.clear()
+            self._show_matches()
+            return
+        self._search_revision = self.editor.document().revision()
+        self._search_pattern = pattern
+        self.worker.search(pattern, self._document_text())
+
+    def _document_text(self) -> str:
+        document = self.editor.document()
+        if self._snapshot[0] != document.revision():
+            self._snapshot = (document.revision(), document.toRawText())
+        return self._snapshot[1]
+
+    def _on_search_finished(self, generation: int, result):
+        if generation != self.worker.generation or self._search_revision is None:
+            return
+        if self.editor.document().revision() != self._search_revision:
+            # Документ изменился, пока шел поиск по снимку
+            self.search()
+            return
+        self._search_revision = None
+        starts, lengths = result
+        self.index.reset(self._search_pattern, starts, lengths)
+        if self._jump_on_result:
+            self._jump_on_result = False
+            self._select_from(self.editor.textCursor().selectionStart())
+        self._show_matches()
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        document = self.editor.document()
+        # Перерисовка подсветки (markContentsDirty) текст не меняет и ревизию не увеличивает;
+        # setPlainText сообщает удаление и вставку с одной ревизией
+        if removed == added and document.revision() == self._revision:
+            return
+        self._revision = document.revision()
+        # Ревизия могла не измениться (вставка после удаления в setPlainText) - снимок устарел
+        self._snapshot = (-1, "")
+        if not self.isVisible() or (self.index.pattern is None and self._search_revision is None):
+            return
+        if self._search_revision is not None:
+            # Результат поиска по старому снимку будет отброшен
+            self.search()
+            return
+        if not self.index.update(document, position, removed, added):
+            self.search()
+            return
+        self._show_matches()
+
+    def _show_matches(self):
+        """Обновить подсветку видимых совпадений и счетчик"""
+        self.editor.find_matches = self.index if self.index.pattern is not None else None
+        self.editor.apply_extra_selections()
+        self._update_count()
+
+    def _current_match(self) -> int:
+        """Номер совпадения, выделенного в редакторе (-1 - такого нет)"""
+        cursor = self.editor.textCursor()
+        number = self.index.index_after(cursor.selectionStart())
+        if number < len(self.index) and self.index.match_at(number) == (cursor.selectionStart(), cursor.selectionEnd()):
+            return number
+        return -1
+
+    def _update_count(self):
+        if not self.find_input.text():
+            self.count_label.setText("")
+        elif compile_query(self.query()) is None:
+            self.count_label.setText("Invalid pattern")
+        elif not self.index:
+            self.count_label.setText("No results")
+        else:
+            current = self._current_match()
+            total = len(self.index)
+            self.count_label.setText(f"{current + 1} of {total}" if current >= 0 else f"{total} results")
+
+    def _select(self, number: int):
+        start, end = self.index.match_at(number)
+        cursor = self.editor.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.editor.centerCursor()
+        self._update_count()
+
+    def _select_from(self, position: int):
+        """Выделить первое совпадение не раньше position (с переходом в начало)"""
+        if self.index:
+            self._select(self.index.index_after(position) % len(self.index))
+
+    def find_next(self):
+        if not self.isVisible() or not self.index:
+            return
+        cursor = self.editor.textCursor()
+        self._select_from(cursor.selectionEnd() if cursor.hasSelection() else cursor.position())
+
+    def find_previous(self):
+        if not self.isVisible() or not self.index:
+            return
+        number = self.index.index_after(self.editor.textCursor().selectionStart()) - 1
+        self._select(number % len(self.index))
+
+    # Замена
+
+    def _replacement(self, match) -> str:
+        template = self.replace_input.text()
+        # expand разбирает шаблон при каждом вызове - только если в нем есть ссылки на группы
+        return match.expand(template) if self.regex_button.isChecked() and '\\' in template else template
+
+    def replace_current(self):
+        """Заменить выделенное совпадение и перейти к следующему"""
+        if not self.isVisible() or not self.index:
+            return
+        number = self._current_match()
+        if number < 0:
+            self.find_next()
+            return
+        cursor = self.editor.textCursor()
+        # Выражение проверяется по всему документу: просмотру вперед/назад и якорям нужно окружение
+        match = match_at(self.index.pattern, self._document_text(), cursor.selectionStart(), cursor.selectionEnd())
+        if match is None:
+            # Индекс не успел за правкой - без совпадения шаблон не раскрыть
+            self.search()
+            return
+        try:
+            replacement = self._replacement(match)
+        except (re.error, IndexError):
+            self.count_label.setText("Invalid replacement")
+            return
+        cursor.insertText(replacement)
+        self.editor.setTextCursor(cursor)
+        self._select_from(cursor.position())
+
+    def replace_all(self) -> int:
+        """Заменить все совпадения одним действием отмены; возвращает их число"""
+        pattern = compile_query(self.query())
+        if pattern is None:
+            return 0
+        # Замена с группами (\1) требует объектов совпадений, поэтому один проход по тексту
+        try:
+            edits, count = plan_replacements(pattern, self._document_text(), self._replacement)
+        except (re.error, IndexError):
+            self.count_label.setText("Invalid replacement")
+            return 0
+        if not edits:
+            return 0
+
+        # Курсоры показанных выделений документ сдвигал бы при каждой правке
+        self.editor.setExtraSelections([])
+        cursor = QTextCursor(self.editor.document())
+        cursor.beginEditBlock()
+        for start, end, text in reversed(edits):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        cursor.endEditBlock()
+        return count
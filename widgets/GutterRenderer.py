@@ -0,0 +1,215 @@
+# widgets/GutterRenderer.py
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from PyQt5.QtCore import Qt, QPointF, QRect, QRectF
+from PyQt5.QtGui import QBrush, QColor, QFont, QFontMetrics, QLinearGradient, QPainter, QPixmap, QPolygonF
+
+
+# Отметки на полях; у строки может быть несколько - битовая маска
+MARKER_BREAKPOINT = 1
+MARKER_ERROR = 2
+MARKER_WARNING = 4
+MARKER_FOLD_OPEN = 8
+MARKER_FOLD_CLOSED = 16
+
+# Рисуется одна отметка - первая из маски в этом порядке
+MARKER_PRIORITY = (MARKER_BREAKPOINT, MARKER_ERROR, MARKER_WARNING, MARKER_FOLD_CLOSED, MARKER_FOLD_OPEN)
+
+# Готовых картинок номеров строк в кеше
+NUMBER_CACHE_SIZE = 1024
+
+MARKER_COLORS = {
+    MARKER_BREAKPOINT: "#E51400",
+    MARKER_ERROR: "#F14C4C",
+    MARKER_WARNING: "#CCA700",
+    MARKER_FOLD_OPEN: "#6E7681",
+    MARKER_FOLD_CLOSED: "#C5C5C5",
+}
+
+
+class GutterRenderer:
+    """Отрисовка полей редактора: номера строк и отметки
+
+    Все, что не меняется между кадрами, готовится один раз при смене шрифта
+    или плотности пикселей экрана: цифры 0-9 обычным и выделенным шрифтом
+    растеризуются в полосы-картинки, отметки - в картинки, кисть разделителя
+    создается заранее. Картинка номера строки собирается копированием цифр
+    из полосы и хранится в кеше, так что перерисовка строки - одно
+    копирование картинки, без создания шрифтов, кистей и раскладки текста.
+    Номер прижат к правому краю (отступ RIGHT_PADDING), отметки занимают
+    левое поле шириной LEFT_PADDING.
+    """
+
+    LEFT_PADDING = 12
+    RIGHT_PADDING = 8
+
+    def __init__(self, background: str = "#1E1E1E", foreground: str = "#6E7681",
+                 current_foreground: str = "#FFFFFF", separator: str = "#2D3139"):
+        self.background = QColor(background)
+        self.foreground = QColor(foreground)
+        self.current_foreground = QColor(current_foreground)
+        self.separator = QColor(separator)
+        # Номер блока -> маска отметок (при правках сдвигается move_markers)
+        self.markers: Dict[int, int] = {}
+
+        self._key: Optional[Tuple[str, float]] = None
+        self._line_height = 0
+        # (полоса цифр, ширина цифры, ширина цифры в пикселях полосы) - обычная и текущая строка
+        self._strips: Tuple[Tuple[QPixmap, int, float], ...] = ()
+        # (номер, текущая строка) -> (картинка номера, ее ширина)
+        self._numbers: "OrderedDict[Tuple[int, bool], Tuple[QPixmap, int]]" = OrderedDict()
+        self._marker_icons: Dict[int, QPixmap] = {}
+        self._separator_brush: Optional[QBrush] = None
+        self._separator_width = -1
+
+    def invalidate(self):
+        """Сбросить подготовленные картинки (шрифт редактора изменился)"""
+        self._key = None
+
+    def prepare(self, font: QFont, ratio: float):
+        """Подготовить картинки для шрифта и плотности пикселей, если они изменились"""
+        key = (font.key(), ratio)
+        if key == self._key:
+            return
+        self._key = key
+        self._numbers.clear()
+        metrics = QFontMetrics(font)
+        self._line_height = metrics.height()
+        current_font = QFont("Cascadia Code", font.pointSize(), QFont.Bold)
+        self._strips = (
+            self._render_strip(font, self.foreground, ratio),
+            self._render_strip(current_font, self.current_foreground, ratio),
+        )
+        icon_size = max(4, min(self.LEFT_PADDING - 2, self._line_height - 4))
+        self._marker_icons = {kind: self._render_marker(kind, icon_size, ratio) for kind in MARKER_PRIORITY}
+
+    def width(self, font: QFont, line_count: int) -> int:
+        digits = len(str(max(1, line_count)))
+        return self.LEFT_PADDING + self.RIGHT_PADDING + QFontMetrics(font).width('9') * digits
+
+    def _render_strip(self, font: QFont, color: QColor, ratio: float) -> Tuple[QPixmap, int, float]:
+        metrics = QFontMetrics(font)
+        digit_width = max(metrics.width(digit) for digit in "0123456789")
+        height = max(metrics.height(), self._line_height)
+        strip = QPixmap(int(digit_width * 10 * ratio + 0.5), int(height * ratio + 0.5))
+        strip.setDevicePixelRatio(ratio)
+        strip.fill(Qt.transparent)
+        painter = QPainter(strip)
+        painter.setFont(font)
+        painter.setPen(color)
+        for digit in range(10):
+            painter.drawText(QRect(digit * digit_width, 0, digit_width, height),
+                             Qt.AlignHCenter | Qt.AlignTop, str(digit))
+        painter.end()
+        return strip, digit_width, digit_width * ratio
+
+    @staticmethod
+    def _render_marker(kind: int, size: int, ratio: float) -> QPixmap:
+        icon = QPixmap(int(size * ratio + 0.5), int(size * ratio + 0.5))
+        icon.setDevicePixelRatio(ratio)
+        icon.fill(Qt.transparent)
+        painter = QPainter(icon)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(MARKER_COLORS[kind]))
+        if kind == MARKER_FOLD_OPEN:
+            painter.drawPolygon(QPolygonF([QPointF(1, size * 0.3), QPointF(size - 1, size * 0.3),
+                                           QPointF(size / 2, size * 0.8)]))
+        elif kind == MARKER_FOLD_CLOSED:
+            painter.drawPolygon(QPolygonF([QPointF(size * 0.3, 1), QPointF(size * 0.8, size / 2),
+                                           QPointF(size * 0.3, size - 1)]))
+        elif kind == MARKER_WARNING:
+            painter.drawPolygon(QPolygonF([QPointF(size / 2, 0.5), QPointF(size - 0.5, size - 0.5),
+                                           QPointF(0.5, size - 0.5)]))
+        else:
+            painter.drawEllipse(QRectF(0.5, 0.5, size - 1, size - 1))
+        painter.end()
+        return icon
+
+    def _render_number(self, number: int, current: bool) -> Tuple[QPixmap, int]:
+        """Собрать картинку номера из полосы цифр"""
+        strip, digit_width, source_width = self._strips[current]
+        digits = str(number)
+        image = QPixmap(int(source_width * len(digits) + 0.5), strip.height())
+        image.setDevicePixelRatio(strip.devicePixelRatio())
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        for index, digit in enumerate(digits):
+            painter.drawPixmap(index * digit_width, 0, strip, int(int(digit) * source_width), 0,
+                               int(source_width), strip.height())
+        painter.end()
+
+        cached = self._numbers[number, current] = (image, digit_width * len(digits))
+        if len(self._numbers) > NUMBER_CACHE_SIZE:
+            self._numbers.popitem(last=False)
+        return cached
+
+    def paint_background(self, painter: QPainter, rect: QRect, width: int):
+        """Фон и разделитель в пределах перерисовываемой полосы rect"""
+        painter.fillRect(rect, self.background)
+        if width != self._separator_width:
+            gradient = QLinearGradient(0, 0, width, 0)
+            gradient.setColorAt(0, self.background)
+            gradient.setColorAt(1, self.separator)
+            self._separator_brush = QBrush(gradient)
+            self._separator_width = width
+        painter.fillRect(QRect(width - 2, rect.top(), 2, rect.height()), self._separator_brush)
+
+    def paint_line(self, painter: QPainter, block_number: int, top: int, width: int, current: bool):
+        """Номер строки block_number + 1 и ее отметка; top - верх строки"""
+        key = (block_number + 1, current)
+        cached = self._numbers.get(key)
+        if cached is None:
+            cached = self._render_number(*key)
+        else:
+            self._numbers.move_to_end(key)
+        image, image_width = cached
+        painter.drawPixmap(width - self.RIGHT_PADDING - image_width, top, image)
+
+        mask = self.markers.get(block_number)
+        if mask:
+            for kind in MARKER_PRIORITY:
+                if mask & kind:
+                    icon = self._marker_icons[kind]
+                    size = int(icon.width() / icon.devicePixelRatio())
+                    painter.drawPixmap((self.LEFT_PADDING - size) // 2, top + (self._line_height - size) // 2, icon)
+                    break
+
+    def set_marker(self, block_number: int, kind: int, enabled: bool = True) -> bool:
+        """Поставить или снять отметку; True - если отметки строки изменились"""
+        mask = self.markers.get(block_number, 0)
+        new_mask = mask | kind if enabled else mask & ~kind
+        if new_mask == mask:
+            return False
+        if new_mask:
+            self.markers[block_number] = new_mask
+        else:
+            del self.markers[block_number]
+        return True
+
+    def move_markers(self, first: int, delta: int) -> bool:
+        """Сдвинуть отметки строк после first на delta строк (правка добавила или удалила строки)
+
+        При удалении строк (delta < 0) отметки строк first + 1 ... first - delta
+        снимаются вместе со строками. True - если отметки изменились.
+        """
+        if not delta or not self.markers or max(self.markers) <= first:
+            return False
+        markers = {}
+        for block_number, mask in self.markers.items():
+            if block_number > first:
+                if block_number <= first - delta:
+                    continue
+                block_number += delta
+            markers[block_number] = mask
+        self.markers = markers
+        return True
+
+    def clear_markers(self, kind: Optional[int] = None):
+        """Снять отметки вида kind (или все)"""
+        if kind is None:
+            self.markers.clear()
+            return
+        for block_number in list(self.markers):
+            self.set_marker(block_number, kind, False)
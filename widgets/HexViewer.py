@@ -1,76 +1,493 @@
-from PyQt5.QtCore import pyqtSlot
-from PyQt5.QtGui import QKeySequence, QFont
-from PyQt5.QtWidgets import QGridLayout, QLabel, QPlainTextEdit, QWidget, QShortcut
+import mmap
+import re
+from array import array
+from pathlib import Path
+from typing import Optional, Union
 
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, pyqtSlot
+from PyQt5.QtGui import QColor, QFont, QKeySequence, QPainter
+from PyQt5.QtWidgets import (
+    QAbstractScrollArea, QCheckBox, QComboBox, QHBoxLayout, QLabel, QLineEdit,
+    QListView, QPushButton, QShortcut, QSplitter, QVBoxLayout, QWidget
+)
+
+from utils.BinarySearch import UTF16, BinarySearchWorker, StringsIndex, compile_pattern
+
+
+# Байтов в строке дампа
+BYTES_PER_ROW = 16
+# Наибольшее значение полосы прокрутки (int в Qt); для больших файлов шаг полосы - несколько строк
+MAX_SCROLL_VALUE = 2 ** 31 - 1
+
+# Непечатаемые байты отображаются точкой
+_ASCII_TABLE = bytes(byte if 32 <= byte <= 126 else ord(".") for byte in range(256))
+
+
+def format_rows(data: bytes, start: int, address_width: int = 8):
+    """Строки дампа (адрес, байты, ASCII) для данных, начинающихся со смещения start
+
+    Шестнадцатеричное и символьное представление всего блока строится одним
+    вызовом bytes.hex/translate, затем режется на строки.
+    """
+    hex_text = data.hex(" ").upper()
+    ascii_text = data.translate(_ASCII_TABLE).decode("ascii")
+    row_hex = BYTES_PER_ROW * 3
+    rows = []
+    for row, offset in enumerate(range(0, len(data), BYTES_PER_ROW)):
+        hex_row = hex_text[row * row_hex:row * row_hex + row_hex - 1]
+        # Дополнительный пробел между половинами строки
+        half = BYTES_PER_ROW // 2 * 3
+        hex_row = hex_row[:half] + " " + hex_row[half:]
+        rows.append((
+            format(start + offset, f"0{address_width}X"),
+            hex_row,
+            ascii_text[offset:offset + BYTES_PER_ROW],
+        ))
+    return rows
+
+
+class HexViewer(QAbstractScrollArea):
+    """Шестнадцатеричный просмотр файла
+
+    Файл отображается в память (mmap) и не читается целиком: на каждой
+    перерисовке из отображения берутся только байты видимых строк, поэтому
+    открытие многогигабайтного файла не зависит от его размера. Полоса
+    прокрутки охватывает весь файл; если строк больше, чем допускает int
+    полосы, одно деление соответствует нескольким строкам.
+    """
 
-class HexViewer(QWidget):
     def __init__(self, parent=None):
         super(HexViewer, self).__init__(parent)
-        self.layout = QGridLayout(self)
-        self.language = ""
-        self.filename = ""
-        self.fullfilepeth = ""
-        self.welcome = False
-        self.address_widget = QPlainTextEdit(self)
-        self.byte_widget = QPlainTextEdit(self)
-        self.ascii_widget = QPlainTextEdit(self)
-        self.address_widget.setStyleSheet("width: 0px;\n")
-        self.address_widget.setFixedWidth(250)
-        self.address_widget
-        self.byte_widget.setStyleSheet("width: 0px;\n")
-        self.ascii_widget.setStyleSheet("width: 0px;\n")
+        self.file_path: Optional[Path] = None
+        self._file = None
+        self._data = None
+        self.size = 0
+        self.first_row = 0
+        self.selection_start = -1
+        self.selection_length = 0
+        self._rows_per_step = 1
+
         self.fontSize = 14
-        self.setStyleSheet(
-            "background-color:#131313;\n"
-            "color: #ffffff;\n"
-            "letter-spacing:1px;\n"
-        )
-        self.layout.addWidget(QLabel("Адреса"), 0, 0)
-        self.layout.addWidget(QLabel("Байты"), 0, 1)
-        self.layout.addWidget(QLabel("ASCII-расшифровка"), 0, 2)
-        self.layout.addWidget(self.address_widget, 1, 0)
-        self.layout.addWidget(self.byte_widget, 1, 1)
-        self.layout.addWidget(self.ascii_widget, 1, 2)
+        self.setFont(QFont("Courier New", self.fontSize))
+        self.background = QColor("#131313")
+        self.foreground = QColor("#ffffff")
+        self.address_color = QColor("#6E7681")
+        self.selection_color = QColor("#264F78")
+        self.setFrameShape(QAbstractScrollArea.NoFrame)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
         self.shortcutAdd = QShortcut(QKeySequence("Ctrl+Shift+="), self)
         self.shortcutAdd.activated.connect(self.addFontSize)
         self.shortcutPop = QShortcut(QKeySequence("Ctrl+-"), self)
-        self.setFont(QFont("Courier New", self.fontSize))
-        self.ascii_widget.setFont(QFont("Courier New", self.fontSize))
-        self.address_widget.setFont(QFont("Courier New", self.fontSize))
-        self.byte_widget.setFont(QFont("Courier New", self.fontSize))
-        self.address_widget.verticalScrollBar().valueChanged.connect(self.sync_scroll)
-        self.byte_widget.verticalScrollBar().valueChanged.connect(self.sync_scroll)
-        self.ascii_widget.verticalScrollBar().valueChanged.connect(self.sync_scroll)
-
-    def sync_scroll(self, value):
-        self.address_widget.verticalScrollBar().setValue(value)
-        self.byte_widget.verticalScrollBar().setValue(value)
-        self.ascii_widget.verticalScrollBar().setValue(value)
+        self.shortcutPop.activated.connect(self.popFontSize)
+
+    # Файл
+
+    def open_file(self, file_path: str):
+        """Отображение файла в память; содержимое читается по мере отрисовки"""
+        self.close_file()
+        self.file_path = Path(file_path)
+        self._file = open(self.file_path, "rb")
+        self.size = self.file_path.stat().st_size
+        # Пустой файл нельзя отобразить в память
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._reset_view()
+
+    def load_file(self, data: bytes):
+        """Просмотр уже прочитанных данных"""
+        self.close_file()
+        self._data = bytes(data)
+        self.size = len(self._data)
+        self._reset_view()
+
+    def close_file(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.size = 0
+
+    def get_file_path(self) -> Optional[Path]:
+        return self.file_path
+
+    def get_file_name(self) -> str:
+        return self.file_path.name if self.file_path else "Untitled"
+
+    def source(self) -> Union[str, bytes, None]:
+        """Источник для фонового поиска: путь файла или загруженные данные"""
+        if isinstance(self._data, bytes) and self._file is None and self._data:
+            return self._data
+        return str(self.file_path) if self.file_path else None
+
+    def read(self, offset: int, length: int) -> bytes:
+        if self._data is None:
+            return b""
+        return self._data[offset:offset + length]
+
+    # Геометрия
+
+    def row_count(self) -> int:
+        return (self.size + BYTES_PER_ROW - 1) // BYTES_PER_ROW
+
+    def _address_width(self) -> int:
+        return max(8, len(format(max(self.size - 1, 0), "X")))
+
+    def _line_height(self) -> int:
+        return self.fontMetrics().height()
+
+    def _char_width(self) -> int:
+        return max(1, self.fontMetrics().horizontalAdvance("0"))
+
+    def _visible_rows(self) -> int:
+        return max(1, self.viewport().height() // self._line_height())
+
+    def _columns(self):
+        """Начальные колонки (в символах) адреса, байтов и ASCII"""
+        hex_start = self._address_width() + 2
+        ascii_start = hex_start + BYTES_PER_ROW * 3 + 2
+        return 0, hex_start, ascii_start, ascii_start + BYTES_PER_ROW
+
+    def _reset_view(self):
+        self.first_row = 0
+        self.selection_start = -1
+        self.selection_length = 0
+        self._update_scrollbars()
+        self.verticalScrollBar().setValue(0)
+        self.viewport().update()
+
+    def _update_scrollbars(self):
+        max_first = max(0, self.row_count() - self._visible_rows())
+        self._rows_per_step = max(1, -(-max_first // MAX_SCROLL_VALUE))
+        vertical = self.verticalScrollBar()
+        vertical.blockSignals(True)
+        vertical.setRange(0, -(-max_first // self._rows_per_step))
+        vertical.setPageStep(max(1, self._visible_rows() // self._rows_per_step))
+        vertical.setValue(self.first_row // self._rows_per_step)
+        vertical.blockSignals(False)
+
+        width = self._columns()[3] * self._char_width()
+        horizontal = self.horizontalScrollBar()
+        horizontal.setRange(0, max(0, width - self.viewport().width()))
+        horizontal.setPageStep(self.viewport().width())
+
+    def _on_scroll(self, value: int):
+        max_first = max(0, self.row_count() - self._visible_rows())
+        self.first_row = min(value * self._rows_per_step, max_first)
+        self.viewport().update()
+
+    def scroll_to_row(self, row: int):
+        max_first = max(0, self.row_count() - self._visible_rows())
+        self.first_row = max(0, min(row, max_first))
+        vertical = self.verticalScrollBar()
+        vertical.blockSignals(True)
+        vertical.setValue(self.first_row // self._rows_per_step)
+        vertical.blockSignals(False)
+        self.viewport().update()
+
+    def go_to_offset(self, offset: int, length: int = 1):
+        """Выделение length байтов со смещения offset и прокрутка к ним"""
+        self.selection_start = offset
+        self.selection_length = length
+        row = offset // BYTES_PER_ROW
+        if not self.first_row <= row < self.first_row + self._visible_rows():
+            self.scroll_to_row(row - self._visible_rows() // 2)
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    # Отрисовка
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.background)
+        if not self.size:
+            return
+
+        metrics = self.fontMetrics()
+        line_height = self._line_height()
+        char_width = self._char_width()
+        shift = self.horizontalScrollBar().value()
+        _address, hex_start, ascii_start, _end = self._columns()
+
+        start = self.first_row * BYTES_PER_ROW
+        data = self.read(start, (self._visible_rows() + 1) * BYTES_PER_ROW)
+        rows = format_rows(data, start, self._address_width())
+
+        if self.selection_length > 0:
+            self._paint_selection(painter, start, len(data), hex_start, ascii_start, shift)
+
+        for index, (address, hex_row, ascii_row) in enumerate(rows):
+            baseline = index * line_height + metrics.ascent()
+            painter.setPen(self.address_color)
+            painter.drawText(-shift, baseline, address)
+            painter.setPen(self.foreground)
+            painter.drawText(hex_start * char_width - shift, baseline, hex_row)
+            painter.drawText(ascii_start * char_width - shift, baseline, ascii_row)
+
+    def _paint_selection(self, painter: QPainter, start: int, length: int, hex_start: int, ascii_start: int, shift: int):
+        line_height = self._line_height()
+        char_width = self._char_width()
+        first = max(self.selection_start, start)
+        last = min(self.selection_start + self.selection_length, start + length)
+        for offset in range(first, last):
+            row, column = divmod(offset - start, BYTES_PER_ROW)
+            hex_column = hex_start + column * 3 + (1 if column >= BYTES_PER_ROW // 2 else 0)
+            top = row * line_height
+            painter.fillRect(QRect(hex_column * char_width - shift, top, char_width * 2, line_height), self.selection_color)
+            painter.fillRect(QRect((ascii_start + column) * char_width - shift, top, char_width, line_height), self.selection_color)
+
+    # Управление
+
+    def keyPressEvent(self, event):
+        rows = {
+            Qt.Key_Up: self.first_row - 1,
+            Qt.Key_Down: self.first_row + 1,
+            Qt.Key_PageUp: self.first_row - self._visible_rows(),
+            Qt.Key_PageDown: self.first_row + self._visible_rows(),
+            Qt.Key_Home: 0,
+            Qt.Key_End: self.row_count(),
+        }
+        if event.key() in rows:
+            self.scroll_to_row(rows[event.key()])
+        else:
+            super().keyPressEvent(event)
+
+    def wheelEvent(self, event):
+        self.scroll_to_row(self.first_row - round(event.angleDelta().y() / 40))
 
     @pyqtSlot()
     def addFontSize(self):
         self.fontSize += 1
         self.setFont(QFont("Courier New", self.fontSize))
+        self._update_scrollbars()
+        self.viewport().update()
 
     @pyqtSlot()
     def popFontSize(self):
-        self.fontSize -= 1
+        self.fontSize = max(6, self.fontSize - 1)
         self.setFont(QFont("Courier New", self.fontSize))
+        self._update_scrollbars()
+        self.viewport().update()
+
+
+class OffsetListModel(QAbstractListModel):
+    """Список найденных диапазонов файла (совпадения или строки)
+
+    Смещения и длины хранятся в массивах, строки списка форматируются
+    только для видимых элементов.
+    """
+
+    # Наибольшая длина текста строки в списке
+    MAX_PREVIEW = 120
+
+    def __init__(self, viewer: HexViewer, parent=None):
+        super().__init__(parent)
+        self.viewer = viewer
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.strings: Optional[StringsIndex] = None
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.strings) if self.strings is not None else len(self.offsets)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        offset, length = self.span(index.row())
+        if self.strings is not None:
+            kind = self.strings.kinds[index.row()]
+            width = 2 if kind == UTF16 else 1
+            raw = self.viewer.read(offset, min(length, self.MAX_PREVIEW * width))
+            preview = raw.decode("utf-16-le" if kind == UTF16 else "ascii", errors="replace")
+            if length > self.MAX_PREVIEW * width:
+                preview += "..."
+        else:
+            preview = self.viewer.read(offset, min(length, 16)).hex(" ").upper()
+        return f"{offset:0{self.viewer._address_width()}X}  {preview}"
+
+    def span(self, row: int):
+        if self.strings is not None:
+            return self.strings.offsets[row], self.strings.lengths[row]
+        return self.offsets[row], self.lengths[row]
+
+    def clear(self):
+        self.beginResetModel()
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.strings = None
+        self.endResetModel()
+
+    def append_hits(self, hits):
+        first = len(self.offsets)
+        self.beginInsertRows(QModelIndex(), first, first + len(hits) - 1)
+        self.offsets.extend(offset for offset, _length in hits)
+        self.lengths.extend(length for _offset, length in hits)
+        self.endInsertRows()
+
+    def set_strings(self, strings: StringsIndex):
+        self.beginResetModel()
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.strings = strings
+        self.endResetModel()
+
+
+class HexEditor(QWidget):
+    """Вкладка двоичного файла: шестнадцатеричный просмотр с поиском
+
+    Поиск байтов (hex с ?? для любого байта, ASCII, UTF-16, регулярное
+    выражение) и построение индекса строк идут в BinarySearchWorker;
+    результаты добавляются в список по мере нахождения, выбор элемента
+    выделяет диапазон в просмотре.
+    """
+
+    MODES = (("Hex", "hex"), ("ASCII", "ascii"), ("UTF-16", "utf-16"), ("Regex", "regex"))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.viewer = HexViewer(self)
+        self.worker = BinarySearchWorker(self)
+        self._job = 0
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search bytes: DE AD ?? EF")
+        self.mode_combo = QComboBox()
+        for title, _mode in self.MODES:
+            self.mode_combo.addItem(title)
+        self.ignore_case = QCheckBox("Aa")
+        self.ignore_case.setToolTip("Ignore case")
+        self.find_button = QPushButton("Find")
+        self.strings_button = QPushButton("Strings")
+        self.status_label = QLabel()
+
+        toolbar = QHBoxLayout()
+        toolbar.setContentsMargins(6, 4, 6, 4)
+        toolbar.addWidget(self.search_input, 1)
+        toolbar.addWidget(self.mode_combo)
+        toolbar.addWidget(self.ignore_case)
+        toolbar.addWidget(self.find_button)
+        toolbar.addWidget(self.strings_button)
+        toolbar.addWidget(self.status_label)
+
+        self.results_model = OffsetListModel(self.viewer, self)
+        self.results_view = QListView()
+        self.results_view.setModel(self.results_model)
+        self.results_view.setUniformItemSizes(True)
+        self.results_view.setFont(QFont("Courier New", 10))
+
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.viewer)
+        splitter.addWidget(self.results_view)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addLayout(toolbar)
+        layout.addWidget(splitter)
+        self.setStyleSheet(
+            "background-color:#131313;\n"
+            "color: #ffffff;\n"
+        )
+
+        self.search_input.returnPressed.connect(self.start_search)
+        self.find_button.clicked.connect(self.start_search)
+        self.strings_button.clicked.connect(self.build_strings)
+        self.results_view.clicked.connect(self._on_result_activated)
+        self.results_view.activated.connect(self._on_result_activated)
+        self.worker.hitsFound.connect(self._on_hits_found)
+        self.worker.progress.connect(self._on_progress)
+        self.worker.finished.connect(self._on_search_finished)
+        self.worker.stringsReady.connect(self._on_strings_ready)
+        self.shortcutFind = QShortcut(QKeySequence.Find, self)
+        self.shortcutFind.activated.connect(self.search_input.setFocus)
+
+    @property
+    def file_path(self) -> Optional[Path]:
+        return self.viewer.file_path
+
+    def open_file(self, file_path: str):
+        self.worker.cancel()
+        self.results_model.clear()
+        self.status_label.clear()
+        self.viewer.open_file(file_path)
+
+    def load_file(self, data: bytes):
+        self.worker.cancel()
+        self.results_model.clear()
+        self.viewer.load_file(data)
+
+    def close_file(self):
+        """Закрытие вкладки: поток поиска больше не нужен"""
+        self.worker.shutdown()
+        self.results_model.clear()
+        self.viewer.close_file()
+
+    def get_file_path(self) -> Optional[Path]:
+        return self.viewer.get_file_path()
+
+    def get_file_name(self) -> str:
+        return self.viewer.get_file_name()
+
+    def start_search(self):
+        source = self.viewer.source()
+        text = self.search_input.text()
+        if source is None or not text:
+            return
+        mode = self.MODES[self.mode_combo.currentIndex()][1]
+        try:
+            pattern = compile_pattern(text, mode, self.ignore_case.isChecked())
+        except (ValueError, re.error) as e:
+            self.status_label.setText(f"Invalid pattern: {e}")
+            return
+        self.results_model.clear()
+        self._job = self.worker.search(source, pattern)
+        self.status_label.setText("Searching...")
+
+    def build_strings(self):
+        source = self.viewer.source()
+        if source is None:
+            return
+        self.results_model.clear()
+        self._job = self.worker.build_strings(source)
+        self.status_label.setText("Indexing strings...")
+
+    def _on_hits_found(self, job: int, hits):
+        if job == self._job:
+            self.results_model.append_hits(hits)
 
-    def load_file(self, data):
-        self.address_widget.clear()
-        self.byte_widget.clear()
-        self.ascii_widget.clear()
+    def _on_progress(self, job: int, done: int, total: int):
+        if job == self._job:
+            self.status_label.setText(f"{done * 100 // max(total, 1)}%")
 
-        for i, byte in enumerate(data):
-            if i % 8 == 0 or i == 0:
-                self.address_widget.insertPlainText("{:08X}\n".format(i))
-                self.byte_widget.insertPlainText("\n")
-                self.ascii_widget.insertPlainText("\n")
+    def _on_search_finished(self, job: int, count: int):
+        if job != self._job:
+            return
+        limit = " (limit)" if count >= self.worker.MAX_HITS else ""
+        self.status_label.setText(f"{count} matches{limit}")
+        if count:
+            self.results_view.setCurrentIndex(self.results_model.index(0))
+            self._on_result_activated(self.results_model.index(0))
 
-            self.byte_widget.insertPlainText("{:02X} ".format(byte))
+    def _on_strings_ready(self, job: int, strings: StringsIndex):
+        if job != self._job:
+            return
+        self.results_model.set_strings(strings)
+        self.status_label.setText(f"{len(strings)} strings")
 
-            if byte >= 32 and byte <= 126:
-                self.ascii_widget.insertPlainText(chr(byte) + " ")
-            else:
-                self.ascii_widget.insertPlainText(".")
+    def _on_result_activated(self, index: QModelIndex):
+        if not index.isValid():
+            return
+        offset, length = self.results_model.span(index.row())
+        self.viewer.go_to_offset(offset, length)
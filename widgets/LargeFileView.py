@@ -0,0 +1,401 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from PyQt5.QtCore import Qt, QRect, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter, QKeySequence
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication, QLabel, QVBoxLayout, QWidget
+
+from utils.LargeFileBuffer import LargeFileBuffer
+
+
+class LargeFileView(QAbstractScrollArea):
+    """Виртуализированный просмотр большого файла
+
+    Документ не загружается в QTextDocument: на каждой перерисовке из
+    LargeFileBuffer берутся только видимые строки. Индекс строк строится
+    в фоновом потоке, поэтому первые экраны доступны сразу, а полоса
+    прокрутки растет по мере индексации. Правки (ввод, Backspace, Delete,
+    Enter) построчно записываются в таблицу кусков буфера и доступны после
+    завершения индексации.
+    """
+
+    textChanged = pyqtSignal()
+    cursorPositionChanged = pyqtSignal()
+    indexProgress = pyqtSignal(int, int)
+    indexFinished = pyqtSignal(bool)
+
+    TAB_WIDTH = 4
+
+    def __init__(self, settings: dict = None, parent=None):
+        super().__init__(parent)
+        self.settings = settings or {}
+        self.buffer: Optional[LargeFileBuffer] = None
+        self.cursor_line = 0
+        self.cursor_column = 0
+        self._widest = 0
+        self._cancelled = False
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        font = QFont("Cascadia Code", int(self.settings.get("fontsize", 12)))
+        font.setStyleHint(QFont.Monospace)
+        self.setFont(font)
+        self.background = QColor(self.settings.get("second_color", "#1E1E1E"))
+        self.foreground = QColor(self.settings.get("text_color", "#D4D4D4"))
+        self.setFrameShape(QAbstractScrollArea.NoFrame)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.viewport().setCursor(Qt.IBeamCursor)
+
+        self.indexProgress.connect(self._on_index_progress)
+        self.indexFinished.connect(self._on_index_finished)
+
+    # Файл
+
+    def open_file(self, path: str):
+        """Открытие файла: первые строки доступны сразу, индекс строится в фоне"""
+        self.close_file()
+        self.buffer = LargeFileBuffer(path)
+        self.cursor_line = self.cursor_column = 0
+        self._widest = 0
+        self._cancelled = False
+        self._update_scrollbars()
+        self.viewport().update()
+        buffer = self.buffer
+        self._executor.submit(self._build_index, buffer)
+
+    def _build_index(self, buffer: LargeFileBuffer):
+        """Выполняется в фоновом потоке"""
+        try:
+            done = buffer.build_index(
+                progress=lambda position, total: self.indexProgress.emit(position, total),
+                cancelled=lambda: self._cancelled,
+            )
+            self.indexFinished.emit(done)
+        except (RuntimeError, ValueError):
+            # Виджет удален или файл закрыт во время индексации
+            pass
+
+    def close_file(self):
+        if self.buffer is None:
+            return
+        self._cancelled = True
+        # Дожидаемся текущей порции, чтобы не закрыть mmap под фоновым потоком
+        self._executor.submit(lambda: None).result()
+        self.buffer.close()
+        self.buffer = None
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """Потоковое сохранение и повторное открытие файла"""
+        if self.buffer is None or not self.buffer.indexed:
+            return False
+        target = path or str(self.buffer.path)
+        line, column = self.cursor_line, self.cursor_column
+        self.buffer.save(target)
+        self.buffer = None
+        self.open_file(target)
+        self.cursor_line, self.cursor_column = line, column
+        return True
+
+    def is_ready(self) -> bool:
+        return self.buffer is not None and self.buffer.indexed
+
+    def _on_index_progress(self, position: int, total: int):
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def _on_index_finished(self, done: bool):
+        self._update_scrollbars()
+        self.viewport().update()
+        self.cursorPositionChanged.emit()
+
+    # Геометрия
+
+    def line_count(self) -> int:
+        return self.buffer.line_count if self.buffer is not None else 0
+
+    def _line_height(self) -> int:
+        return self.fontMetrics().height()
+
+    def _char_width(self) -> int:
+        return max(1, self.fontMetrics().horizontalAdvance(" "))
+
+    def _gutter_width(self) -> int:
+        digits = len(str(max(1, self.line_count())))
+        return 20 + self._char_width() * digits
+
+    def _visible_lines(self) -> int:
+        return max(1, self.viewport().height() // self._line_height())
+
+    def _display(self, text: str) -> str:
+        return text.expandtabs(self.TAB_WIDTH)
+
+    def _update_scrollbars(self):
+        count = self.line_count()
+        vertical = self.verticalScrollBar()
+        vertical.setRange(0, max(0, count - self._visible_lines()))
+        vertical.setPageStep(self._visible_lines())
+        columns = max(1, (self.viewport().width() - self._gutter_width()) // self._char_width())
+        horizontal = self.horizontalScrollBar()
+        horizontal.setRange(0, max(0, self._widest - columns + 1))
+        horizontal.setPageStep(columns)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.background)
+        if self.buffer is None:
+            return
+
+        metrics = self.fontMetrics()
+        line_height = self._line_height()
+        char_width = self._char_width()
+        gutter = self._gutter_width()
+        first = self.verticalScrollBar().value()
+        shift = self.horizontalScrollBar().value()
+        columns = (self.viewport().width() - gutter) // char_width + 2
+        lines = self.buffer.lines(first, self._visible_lines() + 1)
+
+        painter.fillRect(QRect(0, 0, gutter - 6, self.viewport().height()), QColor("#1E1E1E"))
+        widest = self._widest
+        for offset, text in enumerate(lines):
+            number = first + offset
+            top = offset * line_height
+            if number == self.cursor_line:
+                line_color = QColor("#2D3139")
+                line_color.setAlpha(80)
+                painter.fillRect(QRect(gutter - 6, top, self.viewport().width(), line_height), line_color)
+
+            painter.setPen(QColor("#FFFFFF") if number == self.cursor_line else QColor("#6E7681"))
+            painter.drawText(0, top, gutter - 14, line_height, Qt.AlignRight, str(number + 1))
+
+            display = self._display(text)
+            widest = max(widest, len(display))
+            painter.setPen(self.foreground)
+            painter.drawText(gutter, top + metrics.ascent(), display[shift:shift + columns])
+
+        if first <= self.cursor_line < first + len(lines) and self.hasFocus():
+            text = lines[self.cursor_line - first]
+            column = len(self._display(text[:self.cursor_column])) - shift
+            if column >= 0:
+                x = gutter + column * char_width
+                painter.fillRect(QRect(x, (self.cursor_line - first) * line_height, 2, line_height), self.foreground)
+
+        if widest != self._widest:
+            self._widest = widest
+            self._update_scrollbars()
+
+    # Курсор
+
+    def _current_text(self) -> str:
+        return self.buffer.line(self.cursor_line) if self.buffer is not None else ""
+
+    def set_cursor(self, line: int, column: int):
+        if self.buffer is None:
+            return
+        line = max(0, min(line, self.line_count() - 1))
+        column = max(0, min(column, len(self.buffer.line(line))))
+        self.cursor_line, self.cursor_column = line, column
+        self._ensure_cursor_visible()
+        self.viewport().update()
+        self.cursorPositionChanged.emit()
+
+    def _ensure_cursor_visible(self):
+        vertical = self.verticalScrollBar()
+        visible = self._visible_lines()
+        if self.cursor_line < vertical.value():
+            vertical.setValue(self.cursor_line)
+        elif self.cursor_line >= vertical.value() + visible:
+            vertical.setValue(self.cursor_line - visible + 1)
+
+        horizontal = self.horizontalScrollBar()
+        column = len(self._display(self._current_text()[:self.cursor_column]))
+        columns = max(1, (self.viewport().width() - self._gutter_width()) // self._char_width() - 1)
+        if column > self._widest:
+            self._widest = column
+            self._update_scrollbars()
+        if column < horizontal.value():
+            horizontal.setValue(column)
+        elif column >= horizontal.value() + columns:
+            horizontal.setValue(column - columns + 1)
+
+    def center_cursor(self):
+        self.verticalScrollBar().setValue(max(0, self.cursor_line - self._visible_lines() // 2))
+
+    def mousePressEvent(self, event):
+        if self.buffer is None or event.button() != Qt.LeftButton:
+            return super().mousePressEvent(event)
+        line = self.verticalScrollBar().value() + event.pos().y() // self._line_height()
+        display_column = (event.pos().x() - self._gutter_width()) // self._char_width() + self.horizontalScrollBar().value()
+        text = self.buffer.line(min(line, self.line_count() - 1))
+        column = 0
+        while column < len(text) and len(self._display(text[:column + 1])) <= display_column:
+            column += 1
+        self.set_cursor(line, column)
+
+    # Правка
+
+    def _replace(self, first: int, count: int, lines):
+        self.buffer.replace_lines(first, count, lines)
+        self._update_scrollbars()
+        self.textChanged.emit()
+
+    def keyPressEvent(self, event):
+        if self.buffer is None:
+            return super().keyPressEvent(event)
+        key = event.key()
+        control = bool(event.modifiers() & Qt.ControlModifier)
+        line, column = self.cursor_line, self.cursor_column
+        text = self._current_text()
+
+        navigation = {
+            Qt.Key_Up: lambda: self.set_cursor(line - 1, column),
+            Qt.Key_Down: lambda: self.set_cursor(line + 1, column),
+            Qt.Key_PageUp: lambda: self.set_cursor(line - self._visible_lines(), column),
+            Qt.Key_PageDown: lambda: self.set_cursor(line + self._visible_lines(), column),
+            Qt.Key_Left: lambda: self.set_cursor(line, column - 1) if column else self.set_cursor(line - 1, 1 << 30),
+            Qt.Key_Right: lambda: self.set_cursor(line, column + 1) if column < len(text) else self.set_cursor(line + 1, 0),
+            Qt.Key_Home: lambda: self.set_cursor(0, 0) if control else self.set_cursor(line, 0),
+            Qt.Key_End: lambda: self.set_cursor(self.line_count() - 1, 1 << 30) if control else self.set_cursor(line, len(text)),
+        }
+        if key in navigation:
+            navigation[key]()
+            return
+        if event.matches(QKeySequence.Copy):
+            # Выделения нет - копируется текущая строка
+            QApplication.clipboard().setText(text + "\n")
+            return
+        if not self.buffer.indexed:
+            # Правки доступны после построения индекса строк
+            return
+
+        if key == Qt.Key_Backspace:
+            if column:
+                self._replace(line, 1, [text[:column - 1] + text[column:]])
+                self.set_cursor(line, column - 1)
+            elif line:
+                previous = self.buffer.line(line - 1)
+                self._replace(line - 1, 2, [previous + text])
+                self.set_cursor(line - 1, len(previous))
+        elif key == Qt.Key_Delete:
+            if column < len(text):
+                self._replace(line, 1, [text[:column] + text[column + 1:]])
+            elif line + 1 < self.line_count():
+                self._replace(line, 2, [text + self.buffer.line(line + 1)])
+            self.viewport().update()
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            indent = text[:len(text) - len(text.lstrip())]
+            self._replace(line, 1, [text[:column], indent + text[column:]])
+            self.set_cursor(line + 1, len(indent))
+        elif key == Qt.Key_Tab:
+            self._replace(line, 1, [text[:column] + " " * self.TAB_WIDTH + text[column:]])
+            self.set_cursor(line, column + self.TAB_WIDTH)
+        elif event.text() and event.text().isprintable() and not control:
+            self._replace(line, 1, [text[:column] + event.text() + text[column:]])
+            self.set_cursor(line, column + len(event.text()))
+        else:
+            super().keyPressEvent(event)
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.viewport().update()
+
+    def focusOutEvent(self, event):
+        super().focusOutEvent(event)
+        self.viewport().update()
+
+
+class LargeFileEditor(QWidget):
+    """Вкладка режима больших файлов
+
+    Повторяет файловый интерфейс ModernCodeEditor (file_path, save_file,
+    save_file_as, go_to_position), чтобы главное окно работало с ней так же,
+    как с обычным редактором.
+    """
+
+    def __init__(self, parent=None, settings: dict = None):
+        super().__init__(parent)
+        self.settings = settings or {}
+        self.file_path: Optional[Path] = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        self.editor = LargeFileView(self.settings, self)
+        layout.addWidget(self.editor)
+
+        self.status_bar = QLabel()
+        self.status_bar.setStyleSheet("""
+            QLabel {
+                background-color: #1E1E1E;
+                color: #D4D4D4;
+                padding: 4px 8px;
+                border-top: 1px solid #3C3C3C;
+                font-family: 'Segoe UI', sans-serif;
+                font-size: 10pt;
+            }
+        """)
+        layout.addWidget(self.status_bar)
+
+        self._progress = 0
+        self.editor.cursorPositionChanged.connect(self.update_status_bar)
+        self.editor.textChanged.connect(self.update_status_bar)
+        self.editor.indexProgress.connect(self._on_index_progress)
+
+    def open_file(self, file_path: str):
+        self.file_path = Path(file_path)
+        self.editor.open_file(file_path)
+        self.update_status_bar()
+
+    def set_file_path(self, file_path: str):
+        self.file_path = Path(file_path)
+
+    def get_file_path(self) -> Optional[Path]:
+        return self.file_path
+
+    def get_file_name(self) -> str:
+        return self.file_path.name if self.file_path else "Untitled"
+
+    def save_file(self) -> bool:
+        try:
+            if self.file_path:
+                return self.editor.save(str(self.file_path))
+            return False
+        except Exception as e:
+            print(f"Save error: {e}")
+            return False
+
+    def save_file_as(self, file_path: str) -> bool:
+        old_path = self.file_path
+        self.set_file_path(file_path)
+        if self.save_file():
+            return True
+        # Файл не записан - вкладка остается привязанной к прежнему
+        self.file_path = old_path
+        return False
+
+    def go_to_position(self, line: int, column: int = 0):
+        """Перемещение курсора на строку (с 1) и колонку (с 0)"""
+        self.editor.set_cursor(line - 1, column)
+        self.editor.center_cursor()
+        self.editor.setFocus()
+
+    def _on_index_progress(self, position: int, total: int):
+        self._progress = position * 100 // max(total, 1)
+        self.update_status_bar()
+
+    def update_status_bar(self):
+        line = self.editor.cursor_line + 1
+        column = self.editor.cursor_column + 1
+        lines = self.editor.line_count()
+        if self.editor.is_ready():
+            mode = "Large file"
+        else:
+            mode = f"Large file, indexing {self._progress}% (read-only)"
+        self.status_bar.setText(f"Ln {line}, Col {column} | Lines: {lines} | Mode: {mode}")
+
+    def close_file(self):
+        """Освобождение отображения файла (при закрытии вкладки)"""
+        self.editor.close_file()
@@ -0,0 +1,233 @@
+# widgets/MultiCursor.py
+from bisect import bisect_left, insort
+from typing import List, Optional, Tuple
+
+from PyQt5.QtGui import QColor, QTextCharFormat, QTextCursor, QTextDocument
+from PyQt5.QtWidgets import QTextEdit
+
+
+# Правок кареток, которые можно отменить с возвратом кареток на места
+HISTORY_SIZE = 100
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def qt_length(text: str) -> int:
+    """Длина строки в позициях документа (UTF-16), а не в символах Python"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+class MultiCursor:
+    """Несколько кареток (с выделениями) в одном документе
+
+    Каретки хранятся отсортированным списком диапазонов (start, end) -
+    позиций в документе, каретка стоит в end; QTextCursor на каждую не
+    создается, иначе документ сдвигал бы каждый из них при каждой правке.
+    Ввод применяется ко всем кареткам одним курсором внутри одного
+    beginEditBlock (одно действие отмены), снизу вверх, а новые позиции
+    вычисляются одним проходом по списку с накопленным сдвигом.
+    Посторонние правки (отмена, другие виды документа) сдвигают каретки
+    через contentsChange; если правка задела каретку, набор сбрасывается.
+    """
+
+    def __init__(self, document: QTextDocument, background: str = "#264F78"):
+        self.document = document
+        self.format = QTextCharFormat()
+        self.format.setBackground(QColor(background))
+        self.carets: List[Tuple[int, int]] = []
+        # Каретки до каждой правки - для отмены
+        self._history: List[List[Tuple[int, int]]] = []
+        self._editing = False
+        self._revision = document.revision()
+        document.contentsChange.connect(self._on_contents_change)
+
+    def is_active(self) -> bool:
+        return bool(self.carets)
+
+    def clear(self):
+        self.carets = []
+        self._history = []
+
+    def add(self, start: int, end: Optional[int] = None) -> bool:
+        """Добавить каретку (с выделением [start, end)); False - если такая уже есть"""
+        caret = (start, start if end is None else end)
+        index = bisect_left(self.carets, caret)
+        if index < len(self.carets) and self.carets[index] == caret:
+            return False
+        insort(self.carets, caret)
+        return True
+
+    def _occurrences(self, text: str, position: int, whole_words: bool):
+        """Вхождения text начиная с position; whole_words - только целые
+        идентификаторы (подчеркивание - часть слова, в отличие от FindWholeWords)"""
+        found = self.document.find(text, position, QTextDocument.FindCaseSensitively)
+        while not found.isNull():
+            start, end = found.selectionStart(), found.selectionEnd()
+            if not whole_words or not (_is_word_char(self.document.characterAt(start - 1))
+                                       or _is_word_char(self.document.characterAt(end))):
+                yield start, end
+            found = self.document.find(text, end, QTextDocument.FindCaseSensitively)
+
+    def find_next(self, text: str, after: int, whole_words: bool = False) -> Optional[Tuple[int, int]]:
+        """Следующее вхождение text после позиции after (с переходом в начало),
+        еще не занятое кареткой"""
+        for position in (after, 0):
+            for caret in self._occurrences(text, position, whole_words):
+                index = bisect_left(self.carets, caret)
+                if index == len(self.carets) or self.carets[index] != caret:
+                    return caret
+        return None
+
+    def add_all(self, text: str, whole_words: bool = False) -> int:
+        """Каретки на всех вхождениях text; возвращает их число"""
+        self.carets = list(self._occurrences(text, 0, whole_words))
+        self._history = []
+        return len(self.carets)
+
+    def visible(self, first_position: int, last_position: int) -> List[Tuple[int, int]]:
+        """Каретки, попадающие в диапазон позиций"""
+        index = max(0, bisect_left(self.carets, (first_position, first_position)) - 1)
+        result = []
+        for caret in self.carets[index:]:
+            if caret[0] > last_position:
+                break
+            if caret[1] >= first_position:
+                result.append(caret)
+        return result
+
+    def selections(self, first_position: int, last_position: int) -> List[QTextEdit.ExtraSelection]:
+        """Выделения видимых кареток (для setExtraSelections)"""
+        selections = []
+        for start, end in self.visible(first_position, last_position):
+            if start == end:
+                continue
+            cursor = QTextCursor(self.document)
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = cursor
+            selection.format = self.format
+            selections.append(selection)
+        return selections
+
+    def text(self) -> str:
+        """Выделенный текст всех кареток, построчно"""
+        cursor = QTextCursor(self.document)
+        parts = []
+        for start, end in self.carets:
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            parts.append(cursor.selectedText().replace('\u2029', '\n'))
+        return "\n".join(parts)
+
+    def replace(self, text: str):
+        """Заменить выделение каждой каретки текстом (ввод)"""
+        self._edit([(start, end, text) for start, end in self.carets])
+
+    def paste(self, text: str):
+        """Вставка из буфера: если строк в text (без завершающего перевода строки)
+        столько же, сколько кареток, каждая получает свою строку, иначе - весь текст"""
+        lines = text[:-1].split('\n') if text.endswith('\n') else text.split('\n')
+        if len(lines) == len(self.carets) > 1:
+            self._edit([(start, end, line) for (start, end), line in zip(self.carets, lines)])
+        else:
+            self.replace(text)
+
+    def delete(self, backward: bool = True):
+        """Удалить выделения; у кареток без выделения - символ перед (backward) или после них"""
+        end_of_document = self.document.characterCount() - 1
+        changes = []
+        for start, end in self.carets:
+            if start == end:
+                if backward:
+                    start = max(0, start - 1)
+                else:
+                    end = min(end_of_document, end + 1)
+            changes.append((start, end, ""))
+        self._edit(changes)
+
+    def move(self, operation: QTextCursor.MoveOperation):
+        """Переместить все каретки (выделения снимаются)"""
+        cursor = QTextCursor(self.document)
+        carets = []
+        for _, end in self.carets:
+            cursor.setPosition(end)
+            cursor.movePosition(operation)
+            carets.append((cursor.position(), cursor.position()))
+        self.carets = sorted(set(carets))
+
+    def _edit(self, changes: List[Tuple[int, int, str]]):
+        """Применить правки [start, end) -> text одной операцией документа;
+        после нее каретки стоят за вставленным текстом"""
+        merged = []
+        for start, end, text in changes:
+            if merged and start < merged[-1][1]:
+                # Перекрывающиеся диапазоны (Backspace у соседних кареток) сливаются
+                previous_start, previous_end, previous_text = merged[-1]
+                merged[-1] = (previous_start, max(end, previous_end), previous_text)
+                continue
+            merged.append((start, end, text))
+
+        self._history.append(self.carets)
+        del self._history[:-HISTORY_SIZE]
+        self._editing = True
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        try:
+            for start, end, text in reversed(merged):
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                cursor.insertText(text)
+        finally:
+            cursor.endEditBlock()
+            self._editing = False
+            self._revision = self.document.revision()
+
+        shift = 0
+        carets = []
+        for start, end, text in merged:
+            position = start + shift + qt_length(text)
+            if not carets or carets[-1][1] != position:
+                carets.append((position, position))
+            shift += qt_length(text) - (end - start)
+        self.carets = carets
+
+    def undo(self) -> bool:
+        """Отменить последний ввод кареток и вернуть их на места до него;
+        False - отменять нечего"""
+        if not self._history:
+            return False
+        carets = self._history.pop()
+        self._editing = True
+        try:
+            self.document.undo()
+        finally:
+            self._editing = False
+            self._revision = self.document.revision()
+        self.carets = carets
+        return True
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        # Перерисовка подсветки (markContentsDirty) текст не меняет и ревизию не увеличивает
+        if self._editing or self.document.revision() == self._revision:
+            return
+        self._revision = self.document.revision()
+        if not self.carets:
+            return
+        end = position + removed
+        shift = added - removed
+        carets = []
+        for start, caret_end in self.carets:
+            if caret_end <= position:
+                carets.append((start, caret_end))
+            elif start >= end:
+                carets.append((start + shift, caret_end + shift))
+            else:
+                # Правка задела каретку - ее положение больше не определено
+                self.clear()
+                return
+        self.carets = carets
+        # Позиции, сохраненные для отмены, относятся к тексту до этой правки
+        self._history = []
@@ -0,0 +1,287 @@
+from bisect import bisect_right
+from typing import List
+
+from PyQt5.QtCore import QRect, QRectF, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QAbstractScrollArea
+
+from utils.PDFRenderer import TILE_SIZE, PDFRenderWorker, PageImageCache
+from utils.PDFTextIndex import map_rect
+
+
+class PDFPageView(QAbstractScrollArea):
+    """Непрерывная прокрутка страниц PDF с отрисовкой плитками
+
+    Страницы располагаются столбцом, их размеры берутся из документа
+    один раз при открытии. На каждой перерисовке вычисляются видимые
+    страницы (bisect по началам страниц) и пересекающие область просмотра
+    плитки TILE_SIZE x TILE_SIZE пикселей устройства: готовые берутся из
+    кеша, недостающие запрашиваются у PDFRenderWorker. Поэтому даже при
+    400% память занимают только плитки около области просмотра. Пока
+    плитка не готова, на ее месте показывается уменьшенная копия страницы
+    (миниатюра рисуется быстро и запрашивается первой) или белый фон.
+    """
+
+    currentPageChanged = pyqtSignal(int)
+
+    PAGE_GAP = 12
+    # Масштаб миниатюр-заместителей
+    THUMBNAIL_ZOOM = 20
+    # Плитки запрашиваются заранее на столько высот области просмотра ниже и выше
+    PREFETCH_SCREENS = 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.zoom_level = 100
+        self.rotation = 0
+        self.current_page = 0
+        self._page_sizes: List[tuple] = []
+        self._tops: List[int] = []
+        self._content_width = 0
+        self._content_height = 0
+        # Подсветка поиска: страница -> прямоугольники в координатах страницы
+        self.highlights = {}
+        self.current_hit = None
+
+        self.tile_cache = PageImageCache()
+        self.render_worker = PDFRenderWorker(self)
+        self.render_worker.pageRendered.connect(self._on_tile_rendered)
+
+        self.background = QColor("#1e1e1e")
+        self.placeholder = QColor("#ffffff")
+        self.setFrameShape(QAbstractScrollArea.NoFrame)
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
+    # Документ
+
+    def set_document(self, path: str, document):
+        """Размеры страниц берутся из уже открытого документа, отрисовка - в своем потоке"""
+        self._page_sizes = [(page.rect.width, page.rect.height) for page in document]
+        self.tile_cache.clear()
+        self.render_worker.open_document(path)
+        self.current_page = 0
+        self._layout()
+        self.verticalScrollBar().setValue(0)
+
+    def close_document(self):
+        self.render_worker.close_document()
+        self.tile_cache.clear()
+        self._page_sizes = []
+        self._layout()
+
+    def set_view(self, zoom: int, rotation: int):
+        """Смена масштаба или поворота с сохранением положения в текущей странице"""
+        if (zoom, rotation) == (self.zoom_level, self.rotation):
+            return
+        anchor = self._page_fraction()
+        self.zoom_level = zoom
+        self.rotation = rotation
+        self._layout()
+        self._scroll_to(*anchor)
+
+    def set_highlights(self, highlights, current_hit):
+        """Прямоугольники совпадений по страницам и текущее совпадение (страница, прямоугольники)"""
+        self.highlights = highlights
+        self.current_hit = current_hit
+        self.viewport().update()
+
+    def ensure_visible(self, page: int, rect):
+        """Прокрутка к прямоугольнику страницы, если он вне области просмотра"""
+        x0, y0, x1, y1 = map_rect(rect, self._page_sizes[page], self.zoom_level, self.rotation)
+        top = self._tops[page] + int(y0)
+        bottom = self._tops[page] + int(y1)
+        vertical = self.verticalScrollBar()
+        if top < vertical.value() or bottom > vertical.value() + self.viewport().height():
+            vertical.setValue(top - self.viewport().height() // 3)
+        horizontal = self.horizontalScrollBar()
+        left = self._page_left(page) + int(x0)
+        if left < horizontal.value() or left > horizontal.value() + self.viewport().width():
+            horizontal.setValue(left - self.viewport().width() // 3)
+
+    def go_to_page(self, page: int):
+        if 0 <= page < len(self._tops):
+            self._scroll_to(page, 0.0)
+
+    # Геометрия
+
+    def _ratio(self) -> float:
+        return self.devicePixelRatioF()
+
+    def _page_size(self, page: int):
+        """Размер страницы на экране в логических пикселях"""
+        width, height = self._page_sizes[page]
+        if self.rotation % 180:
+            width, height = height, width
+        scale = self.zoom_level / 100
+        return width * scale, height * scale
+
+    def _layout(self):
+        self._tops = []
+        top = self.PAGE_GAP
+        width = 0
+        for page in range(len(self._page_sizes)):
+            page_width, page_height = self._page_size(page)
+            self._tops.append(top)
+            top += int(page_height) + self.PAGE_GAP
+            width = max(width, page_width)
+        self._content_height = top
+        self._content_width = int(width) + 2 * self.PAGE_GAP
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def _update_scrollbars(self):
+        viewport = self.viewport()
+        vertical = self.verticalScrollBar()
+        vertical.setRange(0, max(0, self._content_height - viewport.height()))
+        vertical.setPageStep(viewport.height())
+        vertical.setSingleStep(40)
+        horizontal = self.horizontalScrollBar()
+        horizontal.setRange(0, max(0, self._content_width - viewport.width()))
+        horizontal.setPageStep(viewport.width())
+
+    def _page_left(self, page: int) -> int:
+        """Страницы по центру, если помещаются по ширине"""
+        width = self._page_size(page)[0]
+        return max(self.PAGE_GAP, (max(self._content_width, self.viewport().width()) - int(width)) // 2)
+
+    def _page_at(self, y: int) -> int:
+        return max(0, bisect_right(self._tops, y) - 1)
+
+    def _page_fraction(self):
+        """(страница, доля ее высоты) у верхнего края области просмотра"""
+        if not self._tops:
+            return 0, 0.0
+        y = self.verticalScrollBar().value()
+        page = self._page_at(y)
+        height = self._page_size(page)[1]
+        return page, max(0.0, (y - self._tops[page]) / height) if height else 0.0
+
+    def _scroll_to(self, page: int, fraction: float):
+        if not self._tops:
+            return
+        page = min(page, len(self._tops) - 1)
+        y = self._tops[page] + int(fraction * self._page_size(page)[1]) - (self.PAGE_GAP if not fraction else 0)
+        self.verticalScrollBar().setValue(y)
+        self._on_scroll(self.verticalScrollBar().value())
+
+    def _on_scroll(self, value: int):
+        if self._tops:
+            page = self._page_at(value + self.viewport().height() // 2)
+            if page != self.current_page:
+                self.current_page = page
+                self.currentPageChanged.emit(page)
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    # Отрисовка
+
+    def _tile_keys(self, page: int, area: QRect, origin_x: int, origin_y: int):
+        """Ключи плиток страницы, пересекающих area (координаты содержимого)"""
+        ratio = self._ratio()
+        width, height = self._page_size(page)
+        device_width, device_height = width * ratio, height * ratio
+        left = max(0, (area.left() - origin_x) * ratio)
+        right = min(device_width, (area.right() + 1 - origin_x) * ratio)
+        top = max(0, (area.top() - origin_y) * ratio)
+        bottom = min(device_height, (area.bottom() + 1 - origin_y) * ratio)
+        if left >= right or top >= bottom:
+            return []
+        return [
+            (page, self.zoom_level, self.rotation, column, row)
+            for row in range(int(top // TILE_SIZE), int((bottom - 1) // TILE_SIZE) + 1)
+            for column in range(int(left // TILE_SIZE), int((right - 1) // TILE_SIZE) + 1)
+        ]
+
+    def _visible_pages(self, top: int, bottom: int):
+        if not self._tops:
+            return range(0)
+        return range(self._page_at(top), min(len(self._tops), self._page_at(bottom) + 1))
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.background)
+        if not self._tops:
+            return
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+
+        scroll_x = self.horizontalScrollBar().value()
+        scroll_y = self.verticalScrollBar().value()
+        viewport = self.viewport().rect()
+        visible = viewport.translated(scroll_x, scroll_y)
+        ratio = self._ratio()
+
+        thumbnails = []
+        tiles = []
+        for page in self._visible_pages(visible.top(), visible.bottom()):
+            origin_x, origin_y = self._page_left(page), self._tops[page]
+            width, height = self._page_size(page)
+            page_rect = QRectF(origin_x - scroll_x, origin_y - scroll_y, width, height)
+
+            # Заместитель: миниатюра страницы или белый фон
+            thumbnail_key = (page, self.THUMBNAIL_ZOOM, self.rotation)
+            thumbnail = self.tile_cache.get(thumbnail_key)
+            if thumbnail is None:
+                thumbnails.append(thumbnail_key)
+
+            for key in self._tile_keys(page, visible, origin_x, origin_y):
+                column, row = key[3:]
+                tile_rect = QRectF(
+                    page_rect.left() + column * TILE_SIZE / ratio,
+                    page_rect.top() + row * TILE_SIZE / ratio,
+                    TILE_SIZE / ratio, TILE_SIZE / ratio
+                ).intersected(page_rect)
+                image = self.tile_cache.get(key)
+                if image is not None:
+                    scale = image.devicePixelRatio()
+                    painter.drawImage(QRectF(tile_rect.left(), tile_rect.top(), image.width() / scale, image.height() / scale), image)
+                    continue
+                tiles.append(key)
+                if thumbnail is not None:
+                    # Соответствующая часть миниатюры
+                    scale_x = thumbnail.width() / width
+                    scale_y = thumbnail.height() / height
+                    source = QRectF(
+                        (tile_rect.left() - page_rect.left()) * scale_x, (tile_rect.top() - page_rect.top()) * scale_y,
+                        tile_rect.width() * scale_x, tile_rect.height() * scale_y
+                    )
+                    painter.drawImage(tile_rect, thumbnail, source)
+                else:
+                    painter.fillRect(tile_rect, self.placeholder)
+
+            self._paint_highlights(painter, page, page_rect)
+
+        self._request(thumbnails, tiles, visible)
+
+    def _paint_highlights(self, painter: QPainter, page: int, page_rect: QRectF):
+        rects = self.highlights.get(page)
+        if not rects:
+            return
+        current = self.current_hit[1] if self.current_hit and self.current_hit[0] == page else []
+        for rect in rects:
+            x0, y0, x1, y1 = map_rect(rect, self._page_sizes[page], self.zoom_level, self.rotation)
+            color = QColor(255, 140, 0, 110) if rect in current else QColor(255, 230, 0, 90)
+            painter.fillRect(QRectF(page_rect.left() + x0, page_rect.top() + y0, x1 - x0, y1 - y0), color)
+
+    def _request(self, thumbnails, tiles, visible: QRect):
+        """Очередь отрисовки: миниатюры и плитки видимой области, затем соседние плитки"""
+        margin = visible.height() * self.PREFETCH_SCREENS
+        around = visible.adjusted(0, -margin, 0, margin)
+        prefetch = []
+        for page in self._visible_pages(around.top(), around.bottom()):
+            prefetch.extend(
+                key for key in self._tile_keys(page, around, self._page_left(page), self._tops[page])
+                if key not in self.tile_cache
+            )
+        self.render_worker.device_pixel_ratio = self._ratio()
+        self.render_worker.request(thumbnails + tiles + prefetch)
+
+    def _on_tile_rendered(self, generation: int, key, image):
+        if generation != self.render_worker.generation:
+            return
+        self.tile_cache.put(key, image)
+        if key[1] in (self.zoom_level, self.THUMBNAIL_ZOOM) and key[2] == self.rotation:
+            self.viewport().update()
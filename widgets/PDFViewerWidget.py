@@ -10,9 +10,13 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QIcon, QPalette, QColor
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QSlider, QComboBox, QProgressBar,
-                            QMessageBox, QFileDialog, QToolBar, QAction)
+                            QMessageBox, QFileDialog, QToolBar, QAction, QScrollArea,
+                            QLineEdit, QShortcut)
 
 from widgets.Dialog import CustomDialog
+from utils.PDFRenderer import PDFRenderWorker, PageImageCache
+from utils.PDFTextIndex import PDFTextIndexer, map_rect
+from widgets.PDFPageView import PDFPageView
 
 
 class PDFViewerWidget(QWidget):
@@ -22,16 +26,44 @@ class PDFViewerWidget(QWidget):
     document_loaded = pyqtSignal(str)
     document_closed = pyqtSignal()
     
+    # Страницы, отрисовываемые заранее: (назад, вперед)
+    PREFETCH_PAGES = (1, 2)
+    # Задержка отрисовки в полном качестве после изменения масштаба, мс
+    ZOOM_DEBOUNCE_MS = 150
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_file_path = None
         self.current_page = 0
         self.total_pages = 0
         self.zoom_level = 300
+        self.rotation = 0
+        self.continuous = False
         self.pdf_document = None
         self.use_fitz = False
         self.use_pdf2image = False
         
+        self.page_cache = PageImageCache()
+        self.render_worker = PDFRenderWorker(self)
+        self.render_worker.pageRendered.connect(self.on_page_rendered)
+        self.render_worker.renderFailed.connect(self.on_render_failed)
+        self.current_image = None
+        
+        # Полнотекстовый поиск: индекс строится в фоне при первом поиске
+        self.text_indexer = PDFTextIndexer(parent=self)
+        self.text_indexer.progress.connect(self.on_index_progress)
+        self.text_indexer.ready.connect(self.on_index_ready)
+        self.text_indexer.failed.connect(self.on_index_failed)
+        self.text_index = None
+        self.indexing = False
+        self.search_hits = []
+        self.hit_index = -1
+        
+        self.zoom_timer = QtCore.QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(self.ZOOM_DEBOUNCE_MS)
+        self.zoom_timer.timeout.connect(self.update_page_display_method)
+        
         self.setup_ui()
         self.setup_connections()
         self.check_dependencies()
@@ -102,6 +134,13 @@ class PDFViewerWidget(QWidget):
         self.actions['zoom_in'] = QAction("🔍+ Zoom In", self)
         self.actions['zoom_out'] = QAction("🔍- Zoom Out", self)
         self.actions['zoom_fit'] = QAction("📐 Fit Width", self)
+        self.actions['rotate'] = QAction("⟳ Rotate", self)
+        self.actions['continuous'] = QAction("📜 Continuous", self)
+        self.actions['continuous'].setCheckable(True)
+        self.actions['find_prev'] = QAction("▲", self)
+        self.actions['find_prev'].setShortcut("Shift+F3")
+        self.actions['find_next'] = QAction("▼", self)
+        self.actions['find_next'].setShortcut("F3")
         
         # Добавление действий на панель
         self.toolbar.addAction(self.actions['open'])
@@ -138,7 +177,7 @@ class PDFViewerWidget(QWidget):
         # Слайдер масштаба
         self.zoom_slider = QSlider(Qt.Horizontal)
         self.zoom_slider.setRange(25, 400)
-        self.zoom_slider.setValue(100)
+        self.zoom_slider.setValue(self.zoom_level)
         self.zoom_slider.setFixedWidth(100)
         self.zoom_slider.setStyleSheet("""
             QSlider::groove:horizontal {
@@ -167,6 +206,30 @@ class PDFViewerWidget(QWidget):
         self.toolbar.addAction(self.actions['zoom_in'])
         self.toolbar.addWidget(self.zoom_label)
         self.toolbar.addAction(self.actions['zoom_fit'])
+        self.toolbar.addAction(self.actions['rotate'])
+        self.toolbar.addSeparator()
+        self.toolbar.addAction(self.actions['continuous'])
+        self.toolbar.addSeparator()
+        
+        # Поиск по тексту
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Find in PDF")
+        self.search_input.setFixedWidth(180)
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #1e1e1e;
+                color: #ffffff;
+                border: 1px solid #3c3c3c;
+                border-radius: 3px;
+                padding: 2px 6px;
+            }
+        """)
+        self.search_label = QLabel("")
+        self.search_label.setStyleSheet("color: #cccccc;")
+        self.toolbar.addWidget(self.search_input)
+        self.toolbar.addAction(self.actions['find_prev'])
+        self.toolbar.addAction(self.actions['find_next'])
+        self.toolbar.addWidget(self.search_label)
         
     def setup_viewer_area(self):
         """Настройка области просмотра"""
@@ -188,7 +251,17 @@ class PDFViewerWidget(QWidget):
         self.pdf_label.setText("No PDF document loaded\n\nSupported libraries:\n• PyMuPDF (recommended)\n• pdf2image + poppler")
         self.pdf_label.setMinimumSize(400, 500)
         
-        self.viewer_layout.addWidget(self.pdf_label)
+        # Страница отрисовывается в реальном масштабе и прокручивается
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.setFrameShape(QScrollArea.NoFrame)
+        self.scroll_area.setWidget(self.pdf_label)
+        self.viewer_layout.addWidget(self.scroll_area)
+        
+        # Режим непрерывной прокрутки всех страниц
+        self.page_view = PDFPageView()
+        self.page_view.setVisible(False)
+        self.viewer_layout.addWidget(self.page_view)
         
     def setup_status_bar(self):
         """Настройка статус бара"""
@@ -233,6 +306,14 @@ class PDFViewerWidget(QWidget):
         self.actions['zoom_in'].triggered.connect(self.zoom_in)
         self.actions['zoom_out'].triggered.connect(self.zoom_out)
         self.actions['zoom_fit'].triggered.connect(self.zoom_fit)
+        self.actions['rotate'].triggered.connect(self.rotate)
+        self.actions['continuous'].toggled.connect(self.set_continuous)
+        self.page_view.currentPageChanged.connect(self.on_view_page_changed)
+        self.actions['find_prev'].triggered.connect(self.find_previous)
+        self.actions['find_next'].triggered.connect(self.find_next)
+        self.search_input.returnPressed.connect(self.search)
+        self.search_shortcut = QShortcut(QtGui.QKeySequence.Find, self)
+        self.search_shortcut.activated.connect(self.search_input.setFocus)
         
         self.page_combo.currentTextChanged.connect(self.on_page_combo_changed)
         self.zoom_slider.valueChanged.connect(self.on_zoom_changed)
@@ -277,14 +358,24 @@ class PDFViewerWidget(QWidget):
         import fitz
         
         try:
+            if self.pdf_document is not None:
+                self.pdf_document.close()
             self.pdf_document = fitz.open(file_path)
             self.total_pages = len(self.pdf_document)
+            self.page_cache.clear()
+            self.current_image = None
+            self.render_worker.open_document(file_path)
+            self.page_view.set_document(file_path, self.pdf_document)
+            self.reset_search()
             
+            # Номер страницы выставляется в update_page_display
+            self.page_combo.blockSignals(True)
             # Заполнение комбо-бокса страницами
             self.page_combo.clear()
-            for i in range(self.total_pages):
-                self.page_combo.addItem(f"{i + 1}")
+            self.page_combo.addItems([f"{i + 1}" for i in range(self.total_pages)])
+            self.page_combo.blockSignals(False)
                 
+            self.zoom_fit()
             self.update_page_display()
             self.update_status(f"Loaded with PyMuPDF: {Path(file_path).name} - {self.total_pages} pages")
             self.document_loaded.emit(file_path)
@@ -293,40 +384,121 @@ class PDFViewerWidget(QWidget):
             raise Exception(f"PyMuPDF error: {str(e)}")
 
     def update_page_display(self):
-        """Обновить отображение текущей страницы (PyMuPDF)"""
+        """Обновить отображение текущей страницы (PyMuPDF)
+        
+        Страница берется из кеша, иначе ставится в очередь фоновой
+        отрисовки, а до ее готовности показывается та же страница в
+        ближайшем масштабе. Соседние страницы отрисовываются заранее.
+        """
         if not self.pdf_document:
             return
             
-        try:
-            import fitz
+        self.zoom_timer.stop()
+        if self.continuous:
+            self.page_view.set_view(self.zoom_level, self.rotation)
+            if self.page_view.current_page != self.current_page:
+                self.page_view.go_to_page(self.current_page)
+            self.update_page_indicator()
+            return
+            
+        self.render_worker.device_pixel_ratio = self.devicePixelRatioF()
+        key = self.render_key(self.current_page)
+        image = self.page_cache.get(key)
+        if image is not None:
+            self.show_image(image)
+        else:
+            self.show_preview()
             
-            page = self.pdf_document.load_page(self.current_page)
-            mat = fitz.Matrix(self.zoom_level / 100, self.zoom_level / 100)
-            pix = page.get_pixmap(matrix=mat)
+        before, after = self.PREFETCH_PAGES
+        neighbours = [self.current_page + offset for offset in range(1, after + 1)]
+        neighbours += [self.current_page - offset for offset in range(1, before + 1)]
+        keys = [key] if image is None else []
+        keys += [self.render_key(page) for page in neighbours
+                 if 0 <= page < self.total_pages and self.render_key(page) not in self.page_cache]
+        self.render_worker.request(keys)
+        self.update_page_indicator()
+        
+    def update_page_indicator(self):
+        self.page_combo.blockSignals(True)
+        self.page_combo.setCurrentIndex(self.current_page)
+        self.page_combo.blockSignals(False)
+        self.page_changed.emit(self.current_page + 1, self.total_pages)
+        self.update_status(f"Page {self.current_page + 1} of {self.total_pages}")
             
-            img_data = pix.tobytes("ppm")
-            qimage = QtGui.QImage()
-            qimage.loadFromData(img_data)
+    def set_continuous(self, enabled: bool):
+        """Переключение между постраничным просмотром и непрерывной прокруткой"""
+        self.continuous = enabled
+        self.scroll_area.setVisible(not enabled)
+        self.page_view.setVisible(enabled)
+        if enabled:
+            # Память постраничного режима больше не нужна
+            self.page_cache.clear()
+            self.current_image = None
+        else:
+            self.page_view.tile_cache.clear()
+        self.update_page_display_method()
+        
+    def on_view_page_changed(self, page: int):
+        if self.continuous and page != self.current_page:
+            self.current_page = page
+            self.update_page_indicator()
             
-            pixmap = QtGui.QPixmap.fromImage(qimage)
-            self.display_pixmap(pixmap)
+    def render_key(self, page: int):
+        return page, self.zoom_level, self.rotation
+        
+    def on_page_rendered(self, generation: int, key, image: QtGui.QImage):
+        if generation != self.render_worker.generation:
+            return
+        self.page_cache.put(key, image)
+        if key == self.render_key(self.current_page):
+            self.show_image(image)
             
-            self.page_combo.setCurrentText(f"{self.current_page + 1}")
-            self.page_changed.emit(self.current_page + 1, self.total_pages)
-            self.update_status(f"Page {self.current_page + 1} of {self.total_pages}")
+    def on_render_failed(self, generation: int, key, message: str):
+        if generation == self.render_worker.generation and key == self.render_key(self.current_page):
+            self.pdf_label.setText(f"Error displaying page: {message}")
             
-        except Exception as e:
-            self.pdf_label.setText(f"Error displaying page: {str(e)}")
+    def show_image(self, image: QtGui.QImage):
+        self.current_image = image
+        pixmap = QtGui.QPixmap.fromImage(image)
+        self.paint_highlights(pixmap)
+        self.display_pixmap(pixmap)
+        
+    def show_preview(self):
+        """Быстро масштабированная страница из кеша, пока идет отрисовка в нужном масштабе"""
+        closest = self.page_cache.closest(self.current_page, self.rotation, self.zoom_level)
+        if closest is None:
+            return
+        (_page, zoom, _rotation), image = closest
+        factor = self.zoom_level / zoom
+        pixmap = QtGui.QPixmap.fromImage(image.scaled(
+            int(image.width() * factor), int(image.height() * factor),
+            Qt.KeepAspectRatio, Qt.FastTransformation
+        ))
+        pixmap.setDevicePixelRatio(image.devicePixelRatio())
+        self.current_image = None
+        self.display_pixmap(pixmap)
+        
+    def close_file(self):
+        """Закрыть документ и освободить кеш страниц"""
+        self.zoom_timer.stop()
+        self.render_worker.close_document()
+        self.page_view.close_document()
+        self.reset_search()
+        self.page_cache.clear()
+        self.current_image = None
+        if self.pdf_document is not None:
+            self.pdf_document.close()
+            self.pdf_document = None
+            self.total_pages = 0
+            self.document_closed.emit()
             
     def display_pixmap(self, pixmap: QtGui.QPixmap):
-        """Отобразить pixmap с сохранением пропорций"""
+        """Отобразить pixmap: страница уже отрисована в размере отображения"""
         if not pixmap.isNull():
-            scaled_pixmap = pixmap.scaled(
-                self.pdf_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.pdf_label.setPixmap(scaled_pixmap)
+            # Метка не меньше страницы (с отступами), иначе область не прокручивается
+            ratio = pixmap.devicePixelRatio()
+            self.pdf_label.setMinimumSize(int(pixmap.width() / ratio) + 42, int(pixmap.height() / ratio) + 42)
+            self.pdf_label.setPixmap(pixmap)
         else:
             self.pdf_label.setText("Error loading page image")
             
@@ -387,30 +559,139 @@ class PDFViewerWidget(QWidget):
                 
     def zoom_in(self):
         if self.zoom_level < 400:
-            self.zoom_level = min(self.zoom_level + 25, 400)
-            self.zoom_slider.setValue(self.zoom_level)
-            self.update_page_display_method()
+            self.zoom_slider.setValue(min(self.zoom_level + 25, 400))
             
     def zoom_out(self):
         if self.zoom_level > 25:
-            self.zoom_level = max(self.zoom_level - 25, 25)
-            self.zoom_slider.setValue(self.zoom_level)
-            self.update_page_display_method()
+            self.zoom_slider.setValue(max(self.zoom_level - 25, 25))
             
     def zoom_fit(self):
-        self.zoom_level = 300
-        self.zoom_slider.setValue(self.zoom_level)
+        """Масштаб, при котором страница занимает ширину области просмотра"""
+        if not self.pdf_document:
+            return
+        rect = self.pdf_document.load_page(self.current_page).rect
+        width = rect.height if self.rotation % 180 else rect.width
+        if self.continuous:
+            available = self.page_view.viewport().width() - 2 * self.page_view.PAGE_GAP
+        else:
+            available = self.scroll_area.viewport().width() - 2 * 20 - 2
+        zoom = max(25, min(400, int(available / width * 100)))
+        self.zoom_slider.setValue(zoom)
+        self.zoom_level = zoom
+        self.zoom_label.setText(f"{zoom}%")
+        
+    def rotate(self):
+        self.rotation = (self.rotation + 90) % 360
         self.update_page_display_method()
         
     def on_zoom_changed(self, value: int):
+        """Во время перетаскивания слайдера показывается уже отрисованная страница,
+        в полном качестве страница отрисовывается после паузы"""
         self.zoom_level = value
         self.zoom_label.setText(f"{value}%")
-        self.update_page_display_method()
+        if self.pdf_document and not self.continuous:
+            self.show_preview()
+        self.zoom_timer.start()
         
     def update_status(self, message: str):
         self.status_label.setText(message)
         
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        if self.current_file_path:
-            QtCore.QTimer.singleShot(50, self.update_page_display_method)
\ No newline at end of file
+    # Поиск по тексту
+    
+    def reset_search(self):
+        self.text_indexer.cancel()
+        self.text_index = None
+        self.indexing = False
+        self.set_search_hits([])
+        self.search_label.setText("")
+        
+    def search(self):
+        """Поиск фразы; при первом поиске в документе сначала строится индекс"""
+        if not self.pdf_document or not self.search_input.text().strip():
+            self.set_search_hits([])
+            return
+        if self.text_index is None:
+            if not self.indexing:
+                self.indexing = True
+                self.text_indexer.build(self.current_file_path)
+            self.search_label.setText("Indexing...")
+            return
+        hits = self.text_index.search(self.search_input.text())
+        self.set_search_hits(hits)
+        if hits:
+            # Первое совпадение не раньше текущей страницы
+            following = [i for i, (page, _rects) in enumerate(hits) if page >= self.current_page]
+            self.go_to_hit(following[0] if following else 0)
+        else:
+            self.search_label.setText("No matches")
+            
+    def on_index_progress(self, generation: int, done: int, total: int):
+        if generation == self.text_indexer.generation:
+            self.search_label.setText(f"Indexing {done}/{total}")
+            
+    def on_index_ready(self, generation: int, index):
+        if generation != self.text_indexer.generation:
+            return
+        self.text_index = index
+        self.indexing = False
+        self.search()
+        
+    def on_index_failed(self, generation: int, message: str):
+        if generation == self.text_indexer.generation:
+            self.indexing = False
+            self.search_label.setText("Search unavailable")
+            self.update_status(f"Text index error: {message}")
+            
+    def set_search_hits(self, hits):
+        self.search_hits = hits
+        self.hit_index = -1
+        highlights = {}
+        for page, rects in hits:
+            highlights.setdefault(page, []).extend(rects)
+        self.page_view.set_highlights(highlights, None)
+        self.refresh_highlights()
+        
+    def go_to_hit(self, index: int):
+        self.hit_index = index
+        page, rects = self.search_hits[index]
+        self.search_label.setText(f"{index + 1}/{len(self.search_hits)}")
+        self.page_view.set_highlights(self.page_view.highlights, (page, rects))
+        if page != self.current_page:
+            self.current_page = page
+            self.update_page_display_method()
+        else:
+            self.refresh_highlights()
+        if self.continuous:
+            self.page_view.ensure_visible(page, rects[0])
+            
+    def find_next(self):
+        if self.search_hits:
+            self.go_to_hit((self.hit_index + 1) % len(self.search_hits))
+        elif self.search_input.text():
+            self.search()
+            
+    def find_previous(self):
+        if self.search_hits:
+            self.go_to_hit((self.hit_index - 1) % len(self.search_hits))
+            
+    def refresh_highlights(self):
+        if self.continuous:
+            self.page_view.viewport().update()
+        elif self.current_image is not None:
+            self.show_image(self.current_image)
+            
+    def paint_highlights(self, pixmap: QtGui.QPixmap):
+        """Подсветка совпадений на отрисованной странице (постраничный режим)"""
+        rects = self.page_view.highlights.get(self.current_page)
+        if not rects or not self.pdf_document:
+            return
+        page_rect = self.pdf_document.load_page(self.current_page).rect
+        page_size = (page_rect.width, page_rect.height)
+        current = self.page_view.current_hit
+        current_rects = current[1] if current and current[0] == self.current_page else []
+        painter = QtGui.QPainter(pixmap)
+        for rect in rects:
+            x0, y0, x1, y1 = map_rect(rect, page_size, self.zoom_level, self.rotation)
+            color = QColor(255, 140, 0, 110) if rect in current_rects else QColor(255, 230, 0, 90)
+            painter.fillRect(QtCore.QRectF(x0, y0, x1 - x0, y1 - y0), color)
+        painter.end()
@@ -132,13 +132,15 @@ class ProjectManager:
         projects.sort(key=lambda x: x.get_display_name().lower())
         return projects
     
-    def get_project_files(self) -> List[str]:
-        """Получение списка файлов проекта"""
-        if not self.current_project:
-            return []
+    def get_project_files(self, root_path: Optional[str] = None) -> List[str]:
+        """Получение списка файлов проекта (по умолчанию - текущего)"""
+        if root_path is None:
+            if not self.current_project:
+                return []
+            root_path = self.current_project.root_path
         
         project_files = []
-        root_path = Path(self.current_project.root_path)
+        root_path = Path(root_path)
         
         for ext in ['py', 'js', 'java', 'cpp', 'c', 'html', 'css', 'php', 'rb', 'go', 'rs']:
             project_files.extend(root_path.rglob(f"*.{ext}"))
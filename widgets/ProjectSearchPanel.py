@@ -0,0 +1,292 @@
+# widgets/ProjectSearchPanel.py
+import os
+from typing import List, Optional, Tuple
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QHBoxLayout, QLabel, QLineEdit, QPushButton, QToolButton, QTreeView, QVBoxLayout, QWidget
+
+from utils.FindEngine import SearchQuery
+from utils.ProjectSearch import ProjectSearch, SearchHit, compile_bytes_query
+
+
+# Пока совпадений меньше, новые файлы в дереве раскрываются сразу
+AUTO_EXPAND_HITS = 500
+
+
+class ProjectSearchModel(QAbstractItemModel):
+    """Результаты поиска: файлы и строки с совпадениями
+
+    Хранит только кортежи (путь, совпадения); строки добавляются пачками по
+    мере поступления, а элементы представления создаются лишь для видимых
+    строк дерева. internalId строки совпадения - номер ее файла + 1, у
+    строки файла - 0.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = ""
+        self.files: List[Tuple[str, List[SearchHit]]] = []
+        self.hit_count = 0
+
+    def clear(self, root: str = ""):
+        self.beginResetModel()
+        self.root = root
+        self.files = []
+        self.hit_count = 0
+        self.endResetModel()
+
+    def add_results(self, results: List[Tuple[str, List[SearchHit]]]):
+        first = len(self.files)
+        self.beginInsertRows(QModelIndex(), first, first + len(results) - 1)
+        self.files.extend(results)
+        self.hit_count += sum(len(hits) for _, hits in results)
+        self.endInsertRows()
+
+    def location(self, index: QModelIndex) -> Optional[Tuple[str, int, int]]:
+        """(путь, строка с 1, колонка с 0) для строки дерева"""
+        if not index.isValid():
+            return None
+        if index.internalId() == 0:
+            path, hits = self.files[index.row()]
+            return path, hits[0].line, hits[0].column
+        path, hits = self.files[index.internalId() - 1]
+        hit = hits[index.row()]
+        return path, hit.line, hit.column
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.files)
+        if parent.internalId() == 0:
+            return len(self.files[parent.row()][1])
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.internalId() == 0:
+            path, hits = self.files[index.row()]
+            if role == Qt.DisplayRole:
+                relative = os.path.relpath(path, self.root) if self.root else path
+                return f"{relative}  ({len(hits)})"
+            if role == Qt.ToolTipRole:
+                return path
+            if role == Qt.ForegroundRole:
+                return QColor("#E0E0E0")
+            return None
+        hit = self.files[index.internalId() - 1][1][index.row()]
+        if role == Qt.DisplayRole:
+            return f"{hit.line}: {hit.preview}"
+        if role == Qt.ForegroundRole:
+            return QColor("#CCCCCC")
+        return None
+
+
+class ProjectSearchPanel(QWidget):
+    """Поиск по всем файлам проекта (Find in Project)
+
+    Поиск выполняет ProjectSearch в фоне; результаты появляются в дереве
+    по мере готовности, поиск можно остановить. Двойной щелчок или Enter
+    по результату - сигнал openRequested(путь, строка с 1, колонка с 0).
+    """
+
+    openRequested = pyqtSignal(str, int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = ""
+        self.search_engine = ProjectSearch(parent=self)
+        self.search_engine.resultsReady.connect(self._on_results)
+        self.search_engine.finished.connect(self._on_finished)
+        self._searching = False
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+
+        toolbar = QHBoxLayout()
+        toolbar.setContentsMargins(5, 5, 5, 5)
+        toolbar.setSpacing(4)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Find in project")
+        self.query_input.returnPressed.connect(self.start_search)
+        self.query_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #1E1E1E;
+                color: #FFFFFF;
+                border: 1px solid #555555;
+                border-radius: 3px;
+                padding: 2px 6px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #0078D4;
+            }
+        """)
+
+        option_style = """
+            QToolButton {
+                background-color: transparent;
+                color: #CCCCCC;
+                border: 1px solid transparent;
+                border-radius: 3px;
+                padding: 2px 6px;
+            }
+            QToolButton:hover {
+                background-color: #3E3E42;
+            }
+            QToolButton:checked {
+                background-color: #094771;
+                border: 1px solid #0078D4;
+            }
+        """
+        self.case_button = QToolButton()
+        self.word_button = QToolButton()
+        self.regex_button = QToolButton()
+        for button, text, tooltip in ((self.case_button, "Aa", "Match case"),
+                                      (self.word_button, "ab", "Match whole word"),
+                                      (self.regex_button, ".*", "Use regular expression")):
+            button.setText(text)
+            button.setToolTip(tooltip)
+            button.setCheckable(True)
+            button.setStyleSheet(option_style)
+
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.cancel_search)
+        self.stop_button.setStyleSheet("""
+            QPushButton {
+                background-color: #333333;
+                color: #CCCCCC;
+                border: 1px solid #555555;
+                border-radius: 3px;
+                padding: 2px 8px;
+                font-size: 10px;
+            }
+            QPushButton:hover {
+                background-color: #444444;
+            }
+            QPushButton:disabled {
+                color: #666666;
+            }
+        """)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #CCCCCC;")
+
+        toolbar.addWidget(self.query_input, 1)
+        toolbar.addWidget(self.case_button)
+        toolbar.addWidget(self.word_button)
+        toolbar.addWidget(self.regex_button)
+        toolbar.addWidget(self.stop_button)
+        toolbar.addWidget(self.status_label)
+
+        self.model = ProjectSearchModel(self)
+        self.results_view = QTreeView()
+        self.results_view.setModel(self.model)
+        self.results_view.setHeaderHidden(True)
+        # Одинаковая высота строк: представлению не нужно измерять каждую
+        self.results_view.setUniformRowHeights(True)
+        self.results_view.activated.connect(self._on_activated)
+        self.results_view.setStyleSheet("""
+            QTreeView {
+                background-color: #1E1E1E;
+                color: #CCCCCC;
+                border: none;
+                font-family: 'Consolas', monospace;
+                font-size: 12px;
+            }
+            QTreeView::item:hover {
+                background-color: #2A2D2E;
+            }
+            QTreeView::item:selected {
+                background-color: #094771;
+            }
+        """)
+
+        layout.addLayout(toolbar)
+        layout.addWidget(self.results_view)
+
+    def set_root(self, root: str):
+        """Каталог, в котором ищет панель (корень проекта)"""
+        if root != self.root:
+            self.cancel_search()
+            self.root = root
+            self.model.clear(root)
+            self.status_label.setText("")
+
+    def focus_query(self, text: str = ""):
+        if text:
+            self.query_input.setText(text)
+        self.query_input.setFocus()
+        self.query_input.selectAll()
+
+    def query(self) -> SearchQuery:
+        return SearchQuery(self.query_input.text(), self.case_button.isChecked(),
+                           self.word_button.isChecked(), self.regex_button.isChecked())
+
+    def start_search(self):
+        if not self.root:
+            self.status_label.setText("No project")
+            return
+        pattern = compile_bytes_query(self.query())
+        if pattern is None:
+            self.status_label.setText("Invalid pattern" if self.query_input.text() else "")
+            return
+        self.model.clear(self.root)
+        self.search_engine.search(self.root, pattern)
+        self._searching = True
+        self.stop_button.setEnabled(True)
+        self.status_label.setText("Searching...")
+
+    def cancel_search(self):
+        if not self._searching:
+            return
+        self.search_engine.cancel()
+        self._searching = False
+        self.stop_button.setEnabled(False)
+        self.status_label.setText(f"Stopped: {self.model.hit_count} results in {len(self.model.files)} files")
+
+    def _on_results(self, generation: int, results):
+        if generation != self.search_engine.generation:
+            return
+        first = len(self.model.files)
+        expand = self.model.hit_count < AUTO_EXPAND_HITS
+        self.model.add_results(results)
+        if expand:
+            for row in range(first, len(self.model.files)):
+                self.results_view.expand(self.model.index(row, 0))
+        self.status_label.setText(f"Searching... {self.model.hit_count} results in {len(self.model.files)} files")
+
+    def _on_finished(self, generation: int, files: int, hits: int, seconds: float):
+        if generation != self.search_engine.generation:
+            return
+        self._searching = False
+        self.stop_button.setEnabled(False)
+        self.status_label.setText(f"{hits} results in {len(self.model.files)} files "
+                                  f"({files} searched, {seconds:.2f} s)")
+
+    def _on_activated(self, index: QModelIndex):
+        location = self.model.location(index)
+        if location:
+            self.openRequested.emit(*location)
+
+    def shutdown(self):
+        self.search_engine.shutdown()
@@ -0,0 +1,516 @@
+# widgets/PtyTerminalView.py
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from PyQt5.QtCore import Qt, QEvent, QPointF, QRect, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetricsF, QPainter
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication
+
+try:
+    import pyte
+    from pyte import charsets, modes
+    from pyte.screens import Margins
+except ImportError:
+    pyte = None
+
+from utils.OutputClassifier import classify_line
+from utils.PtyProcess import PTY_AVAILABLE, PtyProcess
+from .TerminalOutput import DEFAULT_SCROLLBACK_LINES
+
+
+# Встроенный терминал на pty доступен, если есть и псевдотерминалы, и pyte
+PTY_TERMINAL_AVAILABLE = PTY_AVAILABLE and pyte is not None
+
+# Время разбора вывода за одно срабатывание уведомителя pty
+FEED_BUDGET_MS = 12
+# Порция вывода, разбираемая за раз (разбор pyte - около 1 МБ/с и выше)
+FEED_CHUNK_SIZE = 8 * 1024
+
+# Частные режимы pyte хранятся со сдвигом на 5 бит
+DECCKM = 1 << 5
+BRACKETED_PASTE = 2004 << 5
+
+ANSI_COLORS = {
+    "black": "#1E1E1E", "red": "#CD3131", "green": "#0DBC79", "brown": "#E5E510",
+    "blue": "#2472C8", "magenta": "#BC3FBC", "cyan": "#11A8CD", "white": "#E5E5E5",
+    "brightblack": "#666666", "brightred": "#F14C4C", "brightgreen": "#23D18B",
+    "brightbrown": "#F5F543", "brightblue": "#3B8EEA", "brightmagenta": "#D670D6",
+    "brightcyan": "#29B8DB", "brightwhite": "#FFFFFF",
+}
+
+CURSOR_KEYS = {
+    Qt.Key_Up: b"A", Qt.Key_Down: b"B", Qt.Key_Right: b"C", Qt.Key_Left: b"D",
+    Qt.Key_Home: b"H", Qt.Key_End: b"F",
+}
+
+KEY_SEQUENCES = {
+    Qt.Key_Return: b"\r", Qt.Key_Enter: b"\r", Qt.Key_Backspace: b"\x7f",
+    Qt.Key_Tab: b"\t", Qt.Key_Backtab: b"\x1b[Z", Qt.Key_Escape: b"\x1b",
+    Qt.Key_Insert: b"\x1b[2~", Qt.Key_Delete: b"\x1b[3~",
+    Qt.Key_PageUp: b"\x1b[5~", Qt.Key_PageDown: b"\x1b[6~",
+    Qt.Key_F1: b"\x1bOP", Qt.Key_F2: b"\x1bOQ", Qt.Key_F3: b"\x1bOR", Qt.Key_F4: b"\x1bOS",
+    Qt.Key_F5: b"\x1b[15~", Qt.Key_F6: b"\x1b[17~", Qt.Key_F7: b"\x1b[18~", Qt.Key_F8: b"\x1b[19~",
+    Qt.Key_F9: b"\x1b[20~", Qt.Key_F10: b"\x1b[21~", Qt.Key_F11: b"\x1b[23~", Qt.Key_F12: b"\x1b[24~",
+}
+
+CONTROL_KEYS = {
+    Qt.Key_Space: b"\x00", Qt.Key_BracketLeft: b"\x1b",
+    Qt.Key_Backslash: b"\x1c", Qt.Key_BracketRight: b"\x1d",
+}
+
+
+class ScrollbackScreen(pyte.Screen if pyte is not None else object):
+    """Экран pyte с историей прокрутки
+
+    Строки, уходящие за верх экрана при прокрутке всего экрана, сохраняются
+    в deque ограниченной длины. В отличие от pyte.HistoryScreen, события не
+    оборачиваются и разбор вывода не замедляется. Печатный ASCII-текст,
+    помещающийся в строку, записывается без посимвольной обработки pyte:
+    символы с одинаковыми атрибутами неизменяемы и берутся из кеша.
+    """
+
+    def __init__(self, columns: int, lines: int, scrollback: int = DEFAULT_SCROLLBACK_LINES):
+        self.scrollback = deque(maxlen=scrollback)
+        # Сколько строк всего ушло в историю (для сохранения позиции просмотра)
+        self.scrolled = 0
+        self._chars = {}
+        super().__init__(columns, lines)
+
+    def draw(self, data: str):
+        cursor = self.cursor
+        end = cursor.x + len(data)
+        if (end > self.columns or self.charset or self.g0_charset is not charsets.LAT1_MAP
+                or modes.IRM in self.mode or not data.isascii() or not data.isprintable()):
+            super().draw(data)
+            return
+        chars = self._chars.get(cursor.attrs)
+        if chars is None:
+            chars = self._chars[cursor.attrs] = {}
+        for char in set(data).difference(chars):
+            chars[char] = cursor.attrs._replace(data=char)
+        self.buffer[cursor.y].update(zip(range(cursor.x, end), map(chars.__getitem__, data)))
+        cursor.x = end
+        self.dirty.add(cursor.y)
+
+    def index(self):
+        top, bottom = self.margins or Margins(0, self.lines - 1)
+        if self.cursor.y == bottom and top == 0:
+            self.scrollback.append(self.buffer[top])
+            self.scrolled += 1
+        super().index()
+
+    def erase_in_display(self, how: int = 0, *args, **kwargs):
+        super().erase_in_display(how, *args, **kwargs)
+        if how == 3:
+            self.scrollback.clear()
+
+
+class PtyTerminalView(QAbstractScrollArea):
+    """Эмулятор терминала: процесс в pty, разбор вывода pyte, отрисовка сетки
+
+    Вывод читается по сигналу PtyProcess.readyRead и разбирается не дольше
+    FEED_BUDGET_MS за раз, остаток дочитывается на следующей итерации цикла
+    событий, поэтому интерфейс не замирает даже под потоком вывода
+    компилятора. После разбора перерисовываются только строки, которые pyte
+    пометил измененными (screen.dirty), и строки старого и нового положения
+    курсора; при прокрутке экрана - вся область. Строки рисуются отрезками
+    символов с одинаковыми атрибутами. Вертикальная полоса прокрутки
+    листает историю; в самом низу отображается живой экран.
+    """
+
+    finished = pyqtSignal(int)
+    diagnosticActivated = pyqtSignal(str, int, int)  # путь, строка, колонка
+
+    def __init__(self, parent=None, scrollback_lines: int = DEFAULT_SCROLLBACK_LINES):
+        super().__init__(parent)
+        self.background = QColor("#1E1E1E")
+        self.foreground = QColor("#CCCCCC")
+        self.cursor_color = QColor("#AEAFAD")
+        self.selection_color = QColor(38, 79, 120, 160)
+        self.link_color = QColor("#4DABF7")
+
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.Monospace)
+        font.setFixedPitch(True)
+        font.setPixelSize(13)
+        self._fonts: Dict[Tuple[bool, bool, bool, bool], QFont] = {}
+        self._colors: Dict[str, QColor] = {}
+        self.set_font(font)
+
+        self.screen = ScrollbackScreen(80, 24, scrollback_lines)
+        self.screen.write_process_input = self._write_reply
+        self.stream = pyte.ByteStream(self.screen)
+        self._painted_cursor = (0, 0)
+        # Состояние истории на момент последней перерисовки
+        self._shown_scrolled = 0
+        self._shown_history = 0
+        # Выделение строк: (первая, последняя) в нумерации истории и экрана
+        self._selection: Optional[Tuple[int, int]] = None
+        self._selection_anchor: Optional[int] = None
+        self._press_pos = None
+
+        self.process = PtyProcess(self)
+        self.process.readyRead.connect(self._read_output)
+        self.process.finished.connect(self._on_finished)
+
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setAttribute(Qt.WA_InputMethodEnabled)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.viewport().setMouseTracking(True)
+        self.verticalScrollBar().setSingleStep(1)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+
+    # Процесс
+
+    def start(self, argv, cwd: Optional[str] = None):
+        self.screen.reset()
+        self.screen.scrollback.clear()
+        columns, lines = self._grid_size()
+        self.screen.resize(lines, columns)
+        self._update_scrollbar()
+        self.process.start(argv, cwd, columns, lines)
+
+    def is_running(self) -> bool:
+        return self.process.is_running()
+
+    def write(self, data: bytes):
+        self.process.write(data)
+
+    def send_text(self, text: str):
+        self.process.write(text.encode("utf-8"))
+
+    def interrupt(self):
+        self.process.write(b"\x03")
+
+    def terminate(self):
+        self.process.terminate()
+
+    def clear(self):
+        """Очистить историю; экран очищает сама оболочка (Ctrl+L)"""
+        self.screen.scrollback.clear()
+        self._selection = None
+        self._update_scrollbar()
+        self.process.write(b"\x0c")
+
+    def _write_reply(self, data: str):
+        # Ответы терминала на запросы программы (например, атрибуты устройства)
+        self.process.write(data.encode("utf-8"))
+
+    def _read_output(self):
+        deadline = time.perf_counter() + FEED_BUDGET_MS / 1000
+        while True:
+            data = self.process.read(FEED_CHUNK_SIZE)
+            if not data:
+                break
+            self.stream.feed(data)
+            if time.perf_counter() >= deadline:
+                break
+        self._on_screen_changed()
+
+    def _on_finished(self, exit_code: int):
+        self.stream.feed(f"\r\n[Process exited with code {exit_code}]\r\n".encode())
+        self._on_screen_changed()
+        self.finished.emit(exit_code)
+
+    def _on_screen_changed(self):
+        """Обновление полосы прокрутки и перерисовка измененных строк"""
+        screen = self.screen
+        added = screen.scrolled - self._shown_scrolled
+        history = self._shown_history
+        self._shown_scrolled = screen.scrolled
+        self._shown_history = len(screen.scrollback)
+        scrollbar = self.verticalScrollBar()
+        follow = scrollbar.value() >= scrollbar.maximum()
+        if added or len(screen.scrollback) != history:
+            # Из заполненной истории строки уходят сверху - содержимое смещается
+            dropped = max(0, added - (len(screen.scrollback) - history))
+            value = scrollbar.value()
+            self._update_scrollbar()
+            scrollbar.setValue(scrollbar.maximum() if follow else max(0, value - dropped))
+            if self._selection is not None:
+                self._selection = tuple(max(0, line - dropped) for line in self._selection)
+            self.viewport().update()
+        else:
+            top = scrollbar.value() - len(screen.scrollback)
+            rows = set(screen.dirty)
+            rows.update((self._painted_cursor[1], screen.cursor.y))
+            line_height = self._line_height
+            for row in rows:
+                view_row = row - top
+                if 0 <= view_row * line_height < self.viewport().height():
+                    self.viewport().update(QRect(0, int(view_row * line_height), self.viewport().width(), int(line_height) + 1))
+        screen.dirty.clear()
+
+    # Геометрия
+
+    def set_font(self, font: QFont):
+        self._fonts = {(False, False, False, False): font}
+        metrics = QFontMetricsF(font)
+        self._char_width = metrics.horizontalAdvance("M")
+        self._line_height = metrics.lineSpacing()
+        self._ascent = metrics.ascent()
+        self.viewport().update()
+
+    def _font(self, bold: bool, italics: bool, underscore: bool, strikethrough: bool) -> QFont:
+        key = (bold, italics, underscore, strikethrough)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = QFont(self._fonts[(False, False, False, False)])
+            font.setBold(bold)
+            font.setItalic(italics)
+            font.setUnderline(underscore)
+            font.setStrikeOut(strikethrough)
+        return font
+
+    def _grid_size(self) -> Tuple[int, int]:
+        viewport = self.viewport()
+        return max(2, int(viewport.width() // self._char_width)), max(1, int(viewport.height() // self._line_height))
+
+    def _update_scrollbar(self):
+        self._shown_scrolled = self.screen.scrolled
+        self._shown_history = len(self.screen.scrollback)
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setRange(0, len(self.screen.scrollback))
+        scrollbar.setPageStep(self.screen.lines)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        columns, lines = self._grid_size()
+        if (columns, lines) != (self.screen.columns, self.screen.lines):
+            self.screen.resize(lines, columns)
+            self.process.resize(lines, columns)
+            self._update_scrollbar()
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def _line(self, index: int):
+        """Строка истории или экрана по сквозному номеру (None - пустая)"""
+        history = self.screen.scrollback
+        if index < len(history):
+            return history[index]
+        # buffer - defaultdict, обращение по индексу создало бы строку
+        return self.screen.buffer.get(index - len(history))
+
+    def _line_text(self, index: int) -> str:
+        line = self._line(index)
+        if not line:
+            return ""
+        return "".join(line[x].data for x in range(self.screen.columns)).rstrip()
+
+    # Отрисовка
+
+    def _color(self, name: str, default: QColor) -> QColor:
+        if name == "default":
+            return default
+        color = self._colors.get(name)
+        if color is None:
+            color = self._colors[name] = QColor(ANSI_COLORS.get(name, "#" + name))
+        return color
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        area = event.rect()
+        painter.fillRect(area, self.background)
+        line_height = self._line_height
+        top_line = self.verticalScrollBar().value()
+        first_row = int(area.top() // line_height)
+        last_row = min(self.screen.lines - 1, int(area.bottom() // line_height))
+
+        for row in range(first_row, last_row + 1):
+            index = top_line + row
+            y = row * line_height
+            if self._selection and self._selection[0] <= index <= self._selection[1]:
+                painter.fillRect(QRect(0, int(y), self.viewport().width(), int(line_height) + 1), self.selection_color)
+            line = self._line(index)
+            if line:
+                self._paint_line(painter, line, y)
+                self._paint_link(painter, index, y)
+
+        # Курсор виден только на живом экране
+        screen = self.screen
+        cursor_row = len(screen.scrollback) + screen.cursor.y - top_line
+        self._painted_cursor = (screen.cursor.x, screen.cursor.y)
+        if not screen.cursor.hidden and first_row <= cursor_row <= last_row and top_line == len(screen.scrollback):
+            rect = QRect(int(screen.cursor.x * self._char_width), int(cursor_row * line_height),
+                         int(self._char_width), int(line_height))
+            if self.hasFocus():
+                painter.fillRect(rect, self.cursor_color)
+                line = screen.buffer.get(screen.cursor.y)
+                char = line[screen.cursor.x].data if line else ""
+                if char.strip():
+                    painter.setFont(self._fonts[(False, False, False, False)])
+                    painter.setPen(self.background)
+                    painter.drawText(QPointF(rect.left(), cursor_row * line_height + self._ascent), char)
+            else:
+                painter.setPen(self.cursor_color)
+                painter.drawRect(rect.adjusted(0, 0, -1, -1))
+
+    def _paint_line(self, painter: QPainter, line, y: float):
+        """Строка отрезками символов с одинаковыми атрибутами"""
+        columns = self.screen.columns
+        run_start = run_end = -1
+        run_char = None
+        text = []
+        for x in sorted(line):
+            if x >= columns:
+                break
+            char = line[x]
+            if x != run_end or char[1:] != run_char[1:]:
+                if text:
+                    self._paint_run(painter, run_start, run_end, "".join(text), run_char, y)
+                run_start, run_char, text = x, char, []
+            text.append(char.data)
+            run_end = x + 1
+        if text:
+            self._paint_run(painter, run_start, run_end, "".join(text), run_char, y)
+
+    def _paint_link(self, painter: QPainter, index: int, y: float):
+        """Подчеркивание диагностики компилятора (file:line: error) как ссылки"""
+        diagnostic = classify_line(self._line_text(index)).diagnostic
+        if diagnostic is None:
+            return
+        bottom = int(y + self._line_height) - 1
+        painter.setPen(self.link_color)
+        painter.drawLine(int(diagnostic.start * self._char_width), bottom,
+                         int(diagnostic.end * self._char_width) - 1, bottom)
+
+    def _paint_run(self, painter: QPainter, start: int, end: int, text: str, char, y: float):
+        foreground = self._color(char.fg, self.foreground)
+        background = self._color(char.bg, None)
+        if char.reverse:
+            foreground, background = background or self.background, foreground
+        left = start * self._char_width
+        if background is not None:
+            painter.fillRect(QRect(int(left), int(y), int((end - start) * self._char_width) + 1, int(self._line_height) + 1), background)
+        if text.isspace() and not (char.underscore or char.strikethrough):
+            return
+        painter.setFont(self._font(char.bold, char.italics, char.underscore, char.strikethrough))
+        painter.setPen(foreground)
+        painter.drawText(QPointF(left, y + self._ascent), text)
+
+    # Ввод
+
+    def event(self, event):
+        # Сочетания с Ctrl (Ctrl+C, Ctrl+L, ...) принадлежат программе в терминале, а не ярлыкам окна
+        if event.type() == QEvent.ShortcutOverride:
+            modifiers = event.modifiers()
+            if (modifiers & Qt.ControlModifier and not modifiers & Qt.ShiftModifier) or event.key() in (Qt.Key_Escape, Qt.Key_Tab):
+                event.accept()
+                return True
+        return super().event(event)
+
+    def focusNextPrevChild(self, next: bool) -> bool:
+        # Tab нужен оболочке для автодополнения
+        return False
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        modifiers = event.modifiers()
+        if modifiers == Qt.ControlModifier | Qt.ShiftModifier:
+            if key == Qt.Key_V:
+                self.paste()
+                return
+            if key == Qt.Key_C:
+                self.copy()
+                return
+        if modifiers == Qt.ShiftModifier and key in (Qt.Key_PageUp, Qt.Key_PageDown):
+            scrollbar = self.verticalScrollBar()
+            step = scrollbar.pageStep() if key == Qt.Key_PageDown else -scrollbar.pageStep()
+            scrollbar.setValue(scrollbar.value() + step)
+            return
+        data = self._key_bytes(event)
+        if data is None:
+            super().keyPressEvent(event)
+            return
+        self._selection = None
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        self.process.write(data)
+
+    def _key_bytes(self, event) -> Optional[bytes]:
+        key = event.key()
+        modifiers = event.modifiers()
+        if key in CURSOR_KEYS:
+            return (b"\x1bO" if DECCKM in self.screen.mode else b"\x1b[") + CURSOR_KEYS[key]
+        if key in KEY_SEQUENCES:
+            return KEY_SEQUENCES[key]
+        if modifiers & Qt.ControlModifier:
+            if Qt.Key_A <= key <= Qt.Key_Z:
+                return bytes([key - Qt.Key_A + 1])
+            if key in CONTROL_KEYS:
+                return CONTROL_KEYS[key]
+        text = event.text()
+        if not text:
+            return None
+        data = text.encode("utf-8")
+        if modifiers & Qt.AltModifier:
+            data = b"\x1b" + data
+        return data
+
+    def inputMethodEvent(self, event):
+        if event.commitString():
+            self.send_text(event.commitString())
+        event.accept()
+
+    def paste(self):
+        text = QApplication.clipboard().text().replace("\r\n", "\r").replace("\n", "\r")
+        if not text:
+            return
+        if BRACKETED_PASTE in self.screen.mode:
+            text = f"\x1b[200~{text}\x1b[201~"
+        self.send_text(text)
+
+    def copy(self):
+        if self._selection is not None:
+            first, last = self._selection
+            QApplication.clipboard().setText("\n".join(self._line_text(index) for index in range(first, last + 1)))
+
+    # Выделение строк мышью
+
+    def _line_at(self, y: int) -> int:
+        return self.verticalScrollBar().value() + int(y // self._line_height)
+
+    def diagnostic_at(self, pos):
+        """Диагностика под точкой pos области просмотра или None"""
+        diagnostic = classify_line(self._line_text(self._line_at(pos.y()))).diagnostic
+        if diagnostic is not None and diagnostic.start <= int(pos.x() // self._char_width) < diagnostic.end:
+            return diagnostic
+        return None
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._press_pos = event.pos()
+            self._selection_anchor = self._line_at(event.pos().y())
+            self._selection = None
+            self.viewport().update()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._selection_anchor is not None and event.buttons() & Qt.LeftButton:
+            line = self._line_at(event.pos().y())
+            self._selection = (min(line, self._selection_anchor), max(line, self._selection_anchor))
+            self.viewport().update()
+        elif not event.buttons():
+            link = self.diagnostic_at(event.pos()) is not None
+            self.viewport().setCursor(Qt.PointingHandCursor if link else Qt.IBeamCursor)
+
+    def mouseReleaseEvent(self, event):
+        self._selection_anchor = None
+        # Щелчок без перетаскивания по диагностике - переход к месту ошибки
+        press_pos, self._press_pos = self._press_pos, None
+        if (event.button() == Qt.LeftButton and press_pos is not None
+                and (event.pos() - press_pos).manhattanLength() < QApplication.startDragDistance()):
+            diagnostic = self.diagnostic_at(event.pos())
+            if diagnostic is not None:
+                self._selection = None
+                self.viewport().update()
+                self.diagnosticActivated.emit(diagnostic.path, diagnostic.line, diagnostic.column)
+        super().mouseReleaseEvent(event)
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.viewport().update()
+
+    def focusOutEvent(self, event):
+        super().focusOutEvent(event)
+        self.viewport().update()
@@ -1,27 +1,40 @@
 import ast
 import re
 import json
+import time
+from collections import deque
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Set, Any, Callable
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 from enum import Enum
 
-from PyQt5.QtCore import Qt, QRegExp, pyqtSlot, pyqtSignal, QStringListModel, QPoint, QTimer, QPropertyAnimation, QEasingCurve, QRect, QSize, QEvent
-from PyQt5.QtGui import QColor, QSyntaxHighlighter, QFont, QTextCursor, QKeySequence, QTextCharFormat, QPainter, QPen, QLinearGradient, QTextBlock, QMouseEvent, QKeyEvent
+from PyQt5.QtCore import Qt, QObject, QAbstractListModel, QModelIndex, pyqtSlot, pyqtSignal, QPoint, QTimer, QPropertyAnimation, QEasingCurve, QRect, QSize, QEvent
+from PyQt5.QtGui import QColor, QSyntaxHighlighter, QFont, QTextCursor, QKeySequence, QTextCharFormat, QPainter, QPen, QTextBlock, QTextLayout, QMouseEvent, QKeyEvent
 from PyQt5.QtWidgets import QCompleter, QPlainTextEdit, QShortcut, QWidget, QHBoxLayout, QVBoxLayout, QLabel, QApplication, QTextEdit
 from utils.CodeAnalyzer import *
+from utils.SyntaxEngine import create_highlight_engine, MAX_BLOCK_STATE, STATE_NORMAL
+from utils.HighlightWorker import HighlightWorker
+from utils.AnalysisPool import get_analysis_pool
+from utils.SymbolIndex import symbol_index
+from utils.CompletionIndex import CompletionIndex, merge_candidates
+from widgets.GutterRenderer import GutterRenderer
+from widgets.RectangleSelection import RectangleSelection
+from widgets.MultiCursor import MultiCursor
+from widgets.FindReplacePanel import FindReplacePanel
 
 class SelectionMode(Enum):
     """Режимы выделения текста"""
     NORMAL = "normal"
     RECTANGLE = "rectangle"
+    MULTI = "multi"
 
 
 class EnhancedTextEdit(QPlainTextEdit):
-    """Улучшенный текстовый редактор с поддержкой прямоугольного выделения"""
+    """Улучшенный текстовый редактор с поддержкой прямоугольного выделения и нескольких кареток"""
     
     rectangleSelectionChanged = pyqtSignal(bool)
+    multiCursorChanged = pyqtSignal(int)
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -30,33 +43,100 @@ class EnhancedTextEdit(QPlainTextEdit):
         self.rectangle_end_pos = QPoint()
         self.is_selecting_rectangle = False
         
-        # Дополнительные выделения для прямоугольного выделения
-        self.rectangle_selections = []
+        # Строки, колонки и выделения прямоугольника
+        self.rectangle = RectangleSelection(self.document())
+        # Несколько кареток: (образец, только целые слова) для добавления следующих
+        self.multi_cursor = MultiCursor(self.document())
+        self._multi_cursor_query: Optional[Tuple[str, bool]] = None
+        # Индекс совпадений панели поиска (MatchIndex); подсвечиваются только видимые
+        self.find_matches = None
+        self.find_format = QTextCharFormat()
+        self.find_format.setBackground(QColor("#623315"))
+        # Выделения показываются только для видимых строк - обновляем при прокрутке
+        self.verticalScrollBar().valueChanged.connect(self._on_rectangle_scrolled)
         
         # Настройка для прямоугольного выделения
         self.setMouseTracking(True)
+    
+    @property
+    def rectangle_selections(self) -> List[QTextEdit.ExtraSelection]:
+        """Дополнительные выделения видимых строк прямоугольника"""
+        if not self.rectangle.is_active():
+            return []
+        first = self.firstVisibleBlock().blockNumber()
+        line_height = max(1, self.fontMetrics().height())
+        return self.rectangle.selections(first, first + self.viewport().height() // line_height + 1)
+    
+    @property
+    def multi_cursor_selections(self) -> List[QTextEdit.ExtraSelection]:
+        """Дополнительные выделения видимых кареток"""
+        if not self.multi_cursor.is_active():
+            return []
+        return self.multi_cursor.selections(*self._visible_positions())
+    
+    @property
+    def find_selections(self) -> List[QTextEdit.ExtraSelection]:
+        """Дополнительные выделения видимых совпадений поиска"""
+        if not self.find_matches:
+            return []
+        selections = []
+        for start, end in self.find_matches.visible(*self._visible_positions()):
+            cursor = QTextCursor(self.document())
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = cursor
+            selection.format = self.find_format
+            selections.append(selection)
+        return selections
+    
+    def _visible_positions(self) -> Tuple[int, int]:
+        """Позиции документа в начале и конце видимой области"""
+        first = self.firstVisibleBlock().position()
+        viewport = self.viewport()
+        last_block = self.cursorForPosition(QPoint(viewport.width(), viewport.height())).block()
+        return first, last_block.position() + last_block.length()
+    
+    def _on_rectangle_scrolled(self):
+        if self.rectangle.is_active() or self.multi_cursor.is_active() or self.find_matches:
+            self.apply_extra_selections()
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._on_rectangle_scrolled()
         
     def mousePressEvent(self, event: QMouseEvent):
         """Обработка нажатия мыши"""
+        if event.modifiers() & Qt.AltModifier and event.modifiers() & Qt.ControlModifier:
+            # Ctrl+Alt+щелчок - еще одна каретка
+            self.add_cursor_at(self.cursorForPosition(event.pos()).position())
+            return
+        if self.selection_mode == SelectionMode.MULTI:
+            self.clear_multi_cursor()
         if event.modifiers() & Qt.AltModifier:
             # Начало прямоугольного выделения
             self.selection_mode = SelectionMode.RECTANGLE
             self.is_selecting_rectangle = True
             self.rectangle_start_pos = event.pos()
             self.rectangle_end_pos = event.pos()
+            self.rectangle.clear()
+            self.update_rectangle_selection()
             self.rectangleSelectionChanged.emit(True)
         else:
-            self.selection_mode = SelectionMode.NORMAL
+            if self.selection_mode == SelectionMode.RECTANGLE:
+                self.clear_rectangle_selection()
             self.is_selecting_rectangle = False
-            self.rectangleSelectionChanged.emit(False)
             super().mousePressEvent(event)
     
     def mouseMoveEvent(self, event: QMouseEvent):
         """Обработка движения мыши"""
         if self.is_selecting_rectangle:
+            previous = QRect(self.rectangle_start_pos, self.rectangle_end_pos).normalized()
             self.rectangle_end_pos = event.pos()
             self.update_rectangle_selection()
-            self.viewport().update()
+            # Рамка перерисовывается только в старых и новых границах
+            current = QRect(self.rectangle_start_pos, self.rectangle_end_pos).normalized()
+            self.viewport().update(previous.united(current).adjusted(-1, -1, 2, 2))
         else:
             super().mouseMoveEvent(event)
     
@@ -65,6 +145,7 @@ class EnhancedTextEdit(QPlainTextEdit):
         if self.is_selecting_rectangle:
             self.is_selecting_rectangle = False
             self.finalize_rectangle_selection()
+            self.viewport().update()
         else:
             super().mouseReleaseEvent(event)
     
@@ -73,144 +154,104 @@ class EnhancedTextEdit(QPlainTextEdit):
         # Alt + мышка уже обрабатывается в mousePressEvent
         # Alt + клавиши для управления прямоугольным выделением
         if event.key() == Qt.Key_Escape and self.selection_mode == SelectionMode.RECTANGLE:
-            self.selection_mode = SelectionMode.NORMAL
-            self.rectangle_selections.clear()
-            self.rectangleSelectionChanged.emit(False)
-            self.viewport().update()
+            self.clear_rectangle_selection()
+            return
+        if self.selection_mode == SelectionMode.MULTI and self.handle_multi_cursor_key(event):
             return
             
         super().keyPressEvent(event)
     
     def update_rectangle_selection(self):
-        """Обновление прямоугольного выделения"""
-        self.rectangle_selections.clear()
-        
-        # Получаем начальную и конечную позиции в координатах текста
+        """Обновление прямоугольного выделения по положению мыши"""
         start_cursor = self.cursorForPosition(self.rectangle_start_pos)
         end_cursor = self.cursorForPosition(self.rectangle_end_pos)
         
         if not start_cursor.block().isValid() or not end_cursor.block().isValid():
             return
         
-        # Определяем границы прямоугольника
-        start_line = min(start_cursor.blockNumber(), end_cursor.blockNumber())
-        end_line = max(start_cursor.blockNumber(), end_cursor.blockNumber())
-        start_col = min(start_cursor.positionInBlock(), end_cursor.positionInBlock())
-        end_col = max(start_cursor.positionInBlock(), end_cursor.positionInBlock())
-        
-        # Создаем выделения для каждой строки в прямоугольнике
-        for line in range(start_line, end_line + 1):
-            cursor = QTextCursor(self.document().findBlockByNumber(line))
-            
-            # Перемещаем курсор в пределах строки
-            line_text = cursor.block().text()
-            line_length = len(line_text)
-            
-            # Если строка достаточно длинная для выделения
-            if start_col <= line_length:
-                actual_end_col = min(end_col, line_length)
-                cursor.setPosition(cursor.block().position() + start_col)
-                cursor.setPosition(cursor.block().position() + actual_end_col, QTextCursor.KeepAnchor)
-                
-                # Создаем дополнительное выделение
-                selection = QTextEdit.ExtraSelection()
-                selection.cursor = cursor
-                
-                # Стиль для прямоугольного выделения
-                selection.format.setBackground(QColor("#264F78"))
-                selection.format.setForeground(QColor("#FFFFFF"))
-                selection.format.setProperty(QTextCharFormat.FullWidthSelection, False)
-                
-                self.rectangle_selections.append(selection)
+        changed = self.rectangle.set_rect(start_cursor.blockNumber(), end_cursor.blockNumber(),
+                                          start_cursor.positionInBlock(), end_cursor.positionInBlock())
+        if changed:
+            self.apply_extra_selections()
+    
+    def apply_extra_selections(self):
+        """Показать совпадения поиска, выделения прямоугольника и кареток (наследники добавляют свои)"""
+        self.setExtraSelections(self.find_selections + self.rectangle_selections + self.multi_cursor_selections)
+    
+    def clear_rectangle_selection(self):
+        """Выход из режима прямоугольного выделения"""
+        self.selection_mode = SelectionMode.NORMAL
+        self.is_selecting_rectangle = False
+        self.rectangle.clear()
+        self.apply_extra_selections()
+        self.rectangleSelectionChanged.emit(False)
+        self.viewport().update()
     
     def finalize_rectangle_selection(self):
         """Финализация прямоугольного выделения"""
-        if self.rectangle_selections:
+        for _, start, _ in self.rectangle.line_ranges():
             # Устанавливаем курсор в начало выделения
-            first_selection = self.rectangle_selections[0]
-            self.setTextCursor(first_selection.cursor)
-            
-            # Устанавливаем дополнительные выделения
-            self.setExtraSelections(self.rectangle_selections)
-        else:
-            self.setExtraSelections([])
+            cursor = self.textCursor()
+            cursor.setPosition(start)
+            self.setTextCursor(cursor)
+            break
+        self.apply_extra_selections()
     
     def paintEvent(self, event):
         """Отрисовка редактора с прямоугольным выделением"""
         # Сначала рисуем стандартный редактор
         super().paintEvent(event)
         
-        # Если идет процесс прямоугольного выделения, рисуем прямоугольник
         if self.is_selecting_rectangle:
+            # Идет процесс прямоугольного выделения - рисуем прямоугольник
             painter = QPainter(self.viewport())
             painter.setPen(QPen(QColor("#007ACC"), 1, Qt.DashLine))
             painter.setBrush(QColor(0, 122, 204, 30))  # Полупрозрачная заливка
-            
-            # Вычисляем прямоугольник
-            rect = QRect(self.rectangle_start_pos, self.rectangle_end_pos).normalized()
-            painter.drawRect(rect)
+            painter.drawRect(QRect(self.rectangle_start_pos, self.rectangle_end_pos).normalized())
+        elif self.selection_mode == SelectionMode.RECTANGLE and self.rectangle.is_collapsed():
+            # Выделение свернуто в каретки - рисуем их в видимых строках
+            self._paint_carets([selection.cursor.position() for selection in self.rectangle_selections], event.rect())
+        elif self.selection_mode == SelectionMode.MULTI:
+            self._paint_carets([end for _, end in self.multi_cursor.visible(*self._visible_positions())], event.rect())
+    
+    def _paint_carets(self, positions: List[int], rect: QRect):
+        """Дополнительные каретки в позициях positions (по возрастанию)"""
+        painter = QPainter(self.viewport())
+        painter.setPen(QPen(QColor("#AEAFAD"), 2))
+        cursor = QTextCursor(self.document())
+        for position in positions:
+            cursor.setPosition(position)
+            caret = self.cursorRect(cursor)
+            if caret.top() > rect.bottom():
+                break
+            if caret.bottom() >= rect.top():
+                painter.drawLine(caret.left(), caret.top(), caret.left(), caret.bottom())
     
     def get_rectangle_selection_text(self) -> str:
         """Получение текста из прямоугольного выделения"""
-        if not self.rectangle_selections:
+        if not self.rectangle.is_active():
             return ""
-        
-        lines = []
-        for selection in self.rectangle_selections:
-            cursor = selection.cursor
-            text = cursor.selectedText()
-            lines.append(text)
-        
-        return "\n".join(lines)
+        return self.rectangle.text()
     
     def insert_text_in_rectangle(self, text: str):
-        """Вставка текста в прямоугольное выделение"""
-        if not self.rectangle_selections:
+        """Вставка текста в прямоугольное выделение (одна правка документа)"""
+        if not self.rectangle.is_active():
             return
-        
-        # Начинаем редактирование
-        cursor = self.textCursor()
-        cursor.beginEditBlock()
-        
-        try:
-            # Разбиваем вставляемый текст на строки
-            lines_to_insert = text.split('\n')
-            
-            # Вставляем текст в каждую строку выделения
-            for i, selection in enumerate(self.rectangle_selections):
-                if i < len(lines_to_insert):
-                    insert_text = lines_to_insert[i]
-                else:
-                    # Если строк меньше, чем выделений, используем последнюю строку
-                    insert_text = lines_to_insert[-1] if lines_to_insert else ""
-                
-                selection.cursor.insertText(insert_text)
-            
-            # Обновляем выделение
-            self.update_rectangle_selection()
-            
-        finally:
-            cursor.endEditBlock()
-    
-    def delete_rectangle_selection(self):
-        """Удаление прямоугольного выделения"""
-        if not self.rectangle_selections:
+        # Курсоры дополнительных выделений документ сдвигал бы при каждой правке строки
+        self.setExtraSelections([])
+        self.rectangle.replace(text)
+        self.apply_extra_selections()
+        self.viewport().update()
+    
+    def delete_rectangle_selection(self, backward: bool = True):
+        """Удаление прямоугольного выделения; для кареток - символа перед ними (после - если not backward)"""
+        if not self.rectangle.is_active():
             return
-        
-        cursor = self.textCursor()
-        cursor.beginEditBlock()
-        
-        try:
-            # Удаляем текст в каждом выделении
-            for selection in self.rectangle_selections:
-                selection.cursor.removeSelectedText()
-            
-            # Очищаем выделения
-            self.rectangle_selections.clear()
-            self.setExtraSelections([])
-            
-        finally:
-            cursor.endEditBlock()
+        # Курсоры дополнительных выделений документ сдвигал бы при каждой правке строки
+        self.setExtraSelections([])
+        self.rectangle.delete(backward)
+        self.apply_extra_selections()
+        self.viewport().update()
     
     def copy_rectangle_selection(self):
         """Копирование прямоугольного выделения в буфер обмена"""
@@ -222,6 +263,123 @@ class EnhancedTextEdit(QPlainTextEdit):
         """Вырезание прямоугольного выделения"""
         self.copy_rectangle_selection()
         self.delete_rectangle_selection()
+    
+    def _multi_cursor_seed(self) -> bool:
+        """Первая каретка - выделение или слово под курсором; оно же - образец поиска"""
+        cursor = self.textCursor()
+        whole_words = not cursor.hasSelection()
+        if whole_words:
+            cursor.select(QTextCursor.WordUnderCursor)
+        text = cursor.selectedText()
+        if not text or '\u2029' in text:
+            return False
+        self._multi_cursor_query = (text, whole_words)
+        self.multi_cursor.clear()
+        self.multi_cursor.add(cursor.selectionStart(), cursor.selectionEnd())
+        return True
+    
+    def add_cursor_at_next_occurrence(self):
+        """Добавить каретку на следующее вхождение выделенного текста (слова под курсором)"""
+        if self.selection_mode != SelectionMode.MULTI or self._multi_cursor_query is None:
+            if self._multi_cursor_seed():
+                self._show_multi_cursor(self.multi_cursor.carets[0][1])
+            return
+        text, whole_words = self._multi_cursor_query
+        found = self.multi_cursor.find_next(text, self.textCursor().position(), whole_words)
+        if found is not None:
+            self.multi_cursor.add(*found)
+            self._show_multi_cursor(found[1])
+    
+    def add_cursors_at_all_occurrences(self):
+        """Каретки на всех вхождениях выделенного текста (слова под курсором)"""
+        if self.selection_mode != SelectionMode.MULTI or self._multi_cursor_query is None:
+            if not self._multi_cursor_seed():
+                return
+        text, whole_words = self._multi_cursor_query
+        self.multi_cursor.add_all(text, whole_words)
+        self._show_multi_cursor(self.textCursor().position())
+    
+    def add_cursor_at(self, position: int):
+        """Добавить каретку без выделения"""
+        if self.selection_mode != SelectionMode.MULTI:
+            self.clear_rectangle_selection()
+            self.multi_cursor.clear()
+            self._multi_cursor_query = None
+            self.multi_cursor.add(self.textCursor().position())
+        self.multi_cursor.add(position)
+        self._show_multi_cursor(position)
+    
+    def _show_multi_cursor(self, position: int):
+        """Войти в режим нескольких кареток; основная каретка - в position"""
+        self.selection_mode = SelectionMode.MULTI
+        cursor = self.textCursor()
+        cursor.setPosition(position)
+        self.setTextCursor(cursor)
+        self._refresh_multi_cursor()
+    
+    def _refresh_multi_cursor(self):
+        if not self.multi_cursor.is_active():
+            self.clear_multi_cursor()
+            return
+        self.apply_extra_selections()
+        self.viewport().update()
+        self.multiCursorChanged.emit(len(self.multi_cursor.carets))
+    
+    def clear_multi_cursor(self):
+        """Выход из режима нескольких кареток"""
+        self.multi_cursor.clear()
+        self._multi_cursor_query = None
+        if self.selection_mode == SelectionMode.MULTI:
+            self.selection_mode = SelectionMode.NORMAL
+        self.apply_extra_selections()
+        self.viewport().update()
+        self.multiCursorChanged.emit(0)
+    
+    def handle_multi_cursor_key(self, event: QKeyEvent) -> bool:
+        """Ввод во все каретки; False - клавиша обрабатывается обычным образом"""
+        key = event.key()
+        text = event.text()
+        moves = {
+            Qt.Key_Left: QTextCursor.Left, Qt.Key_Right: QTextCursor.Right,
+            Qt.Key_Home: QTextCursor.StartOfBlock, Qt.Key_End: QTextCursor.EndOfBlock,
+        }
+        if key in (Qt.Key_Shift, Qt.Key_Control, Qt.Key_Alt, Qt.Key_Meta):
+            return False
+        if key == Qt.Key_Escape:
+            self.clear_multi_cursor()
+            return True
+        if event.matches(QKeySequence.Undo):
+            # Отмена ввода кареток возвращает их на прежние места
+            if not self.multi_cursor.undo():
+                self.undo()
+            self._refresh_multi_cursor()
+            return True
+        if event.matches(QKeySequence.Redo):
+            # Каретки сдвигаются по contentsChange; задетые правкой сбрасываются
+            self.redo()
+            self._refresh_multi_cursor()
+            return True
+        if event.matches(QKeySequence.Copy) or event.matches(QKeySequence.Cut):
+            QApplication.clipboard().setText(self.multi_cursor.text())
+            if event.matches(QKeySequence.Copy):
+                return True
+            self.multi_cursor.delete()
+        elif event.matches(QKeySequence.Paste):
+            self.multi_cursor.paste(QApplication.clipboard().text())
+        elif key in (Qt.Key_Backspace, Qt.Key_Delete):
+            self.multi_cursor.delete(key == Qt.Key_Backspace)
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self.multi_cursor.replace("\n")
+        elif key in moves and not event.modifiers():
+            self.multi_cursor.move(moves[key])
+        elif text and text.isprintable() and not event.modifiers() & ~Qt.ShiftModifier:
+            self.multi_cursor.replace(text)
+        else:
+            # Остальные клавиши (стрелки вверх/вниз, сочетания) - выход из режима
+            self.clear_multi_cursor()
+            return False
+        self._refresh_multi_cursor()
+        return True
 
 
 class LineNumberArea(QWidget):
@@ -240,60 +398,381 @@ class LineNumberArea(QWidget):
 
 
 class ModernSyntaxHighlighter(QSyntaxHighlighter):
-    """Современный подсветчик синтаксиса с поддержкой различных языков"""
+    """Современный подсветчик синтаксиса с поддержкой различных языков
+
+    Разбор строки выполняет однопроходный HighlightEngine. Многострочные
+    конструкции (строки в тройных кавычках, блочные комментарии, шаблонные
+    строки) отслеживаются через состояние блока: после правки
+    QSyntaxHighlighter перелексирует следующие блоки только пока их выходное
+    состояние отличается от сохраненного.
+    """
     
     _format_cache = {}
 
     def __init__(self, document, language_config: LanguageConfig):
         super().__init__(document)
         self.language_config = language_config
-        self._rules = self._compile_rules()
-    
-    def _compile_rules(self) -> List[Tuple[QRegExp, QTextCharFormat]]:
-        """Компиляция правил подсветки"""
-        rules = []
-        
-        for rule in self.language_config.syntax_rules:
-            regex = QRegExp(rule.pattern)
-            fmt = self._get_cached_format(rule.color, rule.weight, rule.italic)
-            rules.append((regex, fmt))
-        
-        return rules
-    
-    def _get_cached_format(self, color: str, weight: int = QFont.Normal, italic: bool = False) -> QTextCharFormat:
+        self.engine = create_highlight_engine(language_config)
+        self._formats = [
+            self._get_cached_format(color, weight, italic)
+            for color, weight, italic in self.engine.styles
+        ]
+    
+    @classmethod
+    def _get_cached_format(cls, color: str, weight: int = QFont.Normal, italic: bool = False) -> QTextCharFormat:
         """Получение кэшированного формата текста"""
         cache_key = f"{color}_{weight}_{italic}"
         
-        if cache_key not in self._format_cache:
+        if cache_key not in cls._format_cache:
             fmt = QTextCharFormat()
             fmt.setForeground(QColor(color))
             fmt.setFontWeight(weight)
             fmt.setFontItalic(italic)
-            self._format_cache[cache_key] = fmt
+            cls._format_cache[cache_key] = fmt
         
-        return self._format_cache[cache_key]
+        return cls._format_cache[cache_key]
     
     def highlightBlock(self, text: str):
         """Подсветка блока текста"""
-        for regex, fmt in self._rules:
-            index = regex.indexIn(text)
-            while index >= 0:
-                length = regex.matchedLength()
-                self.setFormat(index, length, fmt)
-                index = regex.indexIn(text, index + length)
+        state = max(self.previousBlockState(), STATE_NORMAL)
+        tokens, exit_state = self.engine.tokenize(text, state)
+        
+        formats = self._formats
+        for start, length, style_id in tokens:
+            self.setFormat(start, length, formats[style_id])
+        
+        self.setCurrentBlockState(exit_state)
+
+
+class LazySyntaxHighlighter(QObject):
+    """Ленивый подсветчик для больших файлов
+
+    QSyntaxHighlighter перелексирует весь документ при setPlainText, что на
+    файлах в десятки мегабайт замораживает интерфейс. Этот подсветчик сразу
+    раскрашивает только видимые блоки (с запасом). Остальной документ
+    разбирает HighlightWorker в фоновом потоке, а в GUI-потоке готовые
+    диапазоны форматов применяются порциями по таймеру, не дольше slice_ms
+    за порцию. Результаты с устаревшей ревизией документа отбрасываются.
+
+    В userState блока упакованы поколение подсветчика, входное и выходное
+    состояние лексера. Блоки выше frontier подсвечены с точным входным
+    состоянием; видимые блоки ниже него подсвечиваются предварительно и
+    перепроверяются фоновым проходом.
+    """
+
+    STATE_STRIDE = MAX_BLOCK_STATE + 1
+    VISIBLE_MARGIN = 50
+    _generation_counter = 0
+
+    def __init__(self, editor, language_config: LanguageConfig, slice_ms: int = 8):
+        super().__init__(editor)
+        self.editor = editor
+        self.language_config = language_config
+        self.slice_ms = max(1, int(slice_ms))
+        self.engine = create_highlight_engine(language_config)
+        self._formats = [
+            ModernSyntaxHighlighter._get_cached_format(color, weight, italic)
+            for color, weight, italic in self.engine.styles
+        ]
+
+        LazySyntaxHighlighter._generation_counter = (LazySyntaxHighlighter._generation_counter + 1) % 256
+        self._generation = LazySyntaxHighlighter._generation_counter
+        self._document = None
+        self._frontier = 0
+        self._block_count = 0
+        self._applying = False
+
+        self._revision = 0
+        self._pending = deque()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._process_slice)
+
+        # Снимок документа при наборе текста берется не на каждое нажатие
+        self._submit_timer = QTimer(self)
+        self._submit_timer.setSingleShot(True)
+        self._submit_timer.setInterval(150)
+        self._submit_timer.timeout.connect(self._submit_job)
+
+        self.worker = HighlightWorker(self.engine, self)
+        self.worker.chunkReady.connect(self._on_chunk_ready)
+        self.destroyed.connect(self.worker.shutdown)
+
+        editor.updateRequest.connect(self._on_update_request)
+        self.setDocument(editor.document())
+
+    def document(self):
+        return self._document
+
+    def setDocument(self, document):
+        """Подключение к документу (None - отключение)"""
+        if self._document is not None:
+            self._document.contentsChange.disconnect(self._on_contents_change)
+            self._stop_background()
+        self._document = document
+        if document is not None:
+            document.contentsChange.connect(self._on_contents_change)
+            self.rehighlight()
+
+    def rehighlight(self):
+        """Полная перекраска: старые состояния блоков становятся недействительными"""
+        if self._document is None:
+            return
+        LazySyntaxHighlighter._generation_counter = (LazySyntaxHighlighter._generation_counter + 1) % 256
+        self._generation = LazySyntaxHighlighter._generation_counter
+        self._frontier = 0
+        self._block_count = self._document.blockCount()
+        self._stop_background()
+        self._timer.start()
+        self._submit_job()
+
+    def is_complete(self) -> bool:
+        """Весь документ подсвечен с точными состояниями"""
+        return self._document is None or self._frontier >= self._document.blockCount()
+
+    def _pack(self, entry: int, exit_state: int) -> int:
+        return (self._generation * self.STATE_STRIDE + entry) * self.STATE_STRIDE + exit_state
+
+    def _unpack(self, packed: int):
+        """(вход, выход) или None, если блок не подсвечен этим поколением"""
+        if packed < 0:
+            return None
+        generation, states = divmod(packed, self.STATE_STRIDE * self.STATE_STRIDE)
+        if generation != self._generation:
+            return None
+        return divmod(states, self.STATE_STRIDE)
+
+    def _exit_state(self, block) -> int:
+        """Выходное состояние блока (для невалидного или неподсвеченного - обычный код)"""
+        if not block.isValid():
+            return STATE_NORMAL
+        states = self._unpack(block.userState())
+        return states[1] if states else STATE_NORMAL
+
+    def _highlight(self, block, entry: int) -> int:
+        tokens, exit_state = self.engine.tokenize_flat(block.text(), entry)
+        self._apply(block, tokens, entry, exit_state)
+        return exit_state
+
+    def _apply(self, block, tokens, entry: int, exit_state: int):
+        """Применение плоского массива токенов (start, length, style_id) к блоку"""
+        formats = self._formats
+        ranges = []
+        for i in range(0, len(tokens), 3):
+            format_range = QTextLayout.FormatRange()
+            format_range.start = tokens[i]
+            format_range.length = tokens[i + 1]
+            format_range.format = formats[tokens[i + 2]]
+            ranges.append(format_range)
+        block.layout().setFormats(ranges)
+        block.setUserState(self._pack(entry, exit_state))
+
+    def _stop_background(self):
+        self._timer.stop()
+        self._submit_timer.stop()
+        self._pending.clear()
+        self.worker.cancel()
+
+    def _submit_job(self):
+        """Отправка снимка непроверенной части документа в фоновый поток"""
+        if self._document is None or self.is_complete():
+            return
+        block = self._document.findBlockByNumber(self._frontier)
+        text = self._document.toRawText()[block.position():]
+        self.worker.submit(self._revision, text, self._frontier, self._exit_state(block.previous()))
+
+    def _on_chunk_ready(self, revision: int, first_block: int, results):
+        if revision != self._revision or self._document is None:
+            return
+        self._pending.append((first_block, results))
+        self._timer.start()
+
+    def _mark_dirty(self, start: int, end: int):
+        """Перерисовка диапазона без повторной обработки contentsChange"""
+        if end <= start:
+            return
+        self._applying = True
+        try:
+            self._document.markContentsDirty(start, end - start)
+        finally:
+            self._applying = False
+
+    def _on_update_request(self, rect, dy):
+        if not self._applying:
+            self._highlight_visible()
+
+    def _highlight_visible(self):
+        """Предварительная подсветка видимых блоков и запаса вокруг них"""
+        if self._document is None:
+            return
+        block = self.editor.firstVisibleBlock()
+        for _ in range(self.VISIBLE_MARGIN):
+            if not block.previous().isValid():
+                break
+            block = block.previous()
+
+        line_height = max(1, self.editor.fontMetrics().height())
+        count = self.editor.viewport().height() // line_height + 2 * self.VISIBLE_MARGIN
+
+        dirty_start = dirty_end = -1
+        while block.isValid() and count > 0:
+            if self._unpack(block.userState()) is None:
+                self._highlight(block, self._exit_state(block.previous()))
+                if dirty_start < 0:
+                    dirty_start = block.position()
+                dirty_end = block.position() + block.length()
+            block = block.next()
+            count -= 1
+
+        if dirty_start >= 0:
+            self._mark_dirty(dirty_start, min(dirty_end, self._document.characterCount()))
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        if self._applying or self._document is None:
+            return
+        document = self._document
+        first = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not last.isValid():
+            last = document.lastBlock()
+        if not first.isValid():
+            return
+
+        # Промежуточные блоки правки новые, а у крайних сохранилось старое состояние
+        first.setUserState(-1)
+        last.setUserState(-1)
+
+        first_number = first.blockNumber()
+        last_number = last.blockNumber()
+        count = document.blockCount()
+        delta = count - self._block_count
+        self._block_count = count
+        if self._frontier > first_number:
+            self._frontier = max(first_number, self._frontier + delta)
+
+        # Фоновые результаты относятся к старому тексту
+        self._revision += 1
+        self._pending.clear()
+        self.worker.cancel()
+
+        if first_number < self._frontier:
+            self._relex_after_edit(first, first_number, last_number)
+
+        if not self.is_complete():
+            self._timer.start()
+            self._submit_timer.start()
+
+    def _relex_after_edit(self, block, number: int, last_number: int):
+        """Синхронная перекраска правки выше frontier, пока меняются состояния"""
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        entry = self._exit_state(block.previous())
+        dirty_start = block.position()
+        dirty_end = dirty_start
+
+        while block.isValid() and number < self._frontier:
+            states = self._unpack(block.userState())
+            if states is not None and states[0] == entry:
+                if number > last_number:
+                    # Дальше цепочка состояний не изменилась
+                    break
+                exit_state = states[1]
+            else:
+                exit_state = self._highlight(block, entry)
+                dirty_end = block.position() + block.length()
+            entry = exit_state
+            block = block.next()
+            number += 1
+            if time.perf_counter() > deadline:
+                self._frontier = min(self._frontier, number)
+                break
+
+        self._mark_dirty(dirty_start, min(dirty_end, self._document.characterCount()))
+
+    def _process_slice(self):
+        """Порция работы в GUI-потоке: видимая область, затем готовые результаты фонового разбора"""
+        if self._document is None:
+            self._timer.stop()
+            return
+        self._highlight_visible()
+
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        dirty_start = dirty_end = -1
+        block = None
+
+        while self._pending and time.perf_counter() < deadline:
+            first_block, results = self._pending[0]
+            offset = self._frontier - first_block
+            if offset >= len(results):
+                self._pending.popleft()
+                continue
+            if offset < 0:
+                # Разрыв между frontier и порцией: нужен новый снимок
+                self._pending.clear()
+                self._submit_timer.start()
+                break
+
+            if block is None or block.blockNumber() != self._frontier:
+                block = self._document.findBlockByNumber(self._frontier)
+            for tokens, entry, exit_state in results[offset:offset + 256]:
+                if not block.isValid():
+                    break
+                if self._unpack(block.userState()) != (entry, exit_state):
+                    self._apply(block, tokens, entry, exit_state)
+                    if dirty_start < 0:
+                        dirty_start = block.position()
+                    dirty_end = block.position() + block.length()
+                block = block.next()
+                self._frontier += 1
+
+        if dirty_start >= 0:
+            self._mark_dirty(dirty_start, min(dirty_end, self._document.characterCount()))
+        if not self._pending:
+            self._timer.stop()
+
+
+class CompletionModel(QAbstractListModel):
+    """Легкая модель списка дополнений: только готовые кандидаты, без фильтрации"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: List[str] = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.EditRole) and 0 <= index.row() < len(self._items):
+            return self._items[index.row()]
+        return None
+    
+    def set_items(self, items: List[str]):
+        if items == self._items:
+            return
+        self.beginResetModel()
+        self._items = list(items)
+        self.endResetModel()
 
 
 class SmartCompleter(QCompleter):
-    """Умный комплитер с кастомным отображением"""
+    """Умный комплитер с кастомным отображением
+    
+    Кандидаты отбирает и ранжирует CompletionIndex, поэтому QCompleter
+    работает без собственной фильтрации (UnfilteredPopupCompletion) и
+    только показывает модель.
+    """
     
     insertText = pyqtSignal(str)
     
     def __init__(self, word_list: List[str], background_color: str, font_size: int, parent=None):
-        super().__init__(word_list, parent)
+        super().__init__(parent)
+        self.completion_model = CompletionModel(self)
+        self.completion_model.set_items(word_list)
+        self.setModel(self.completion_model)
         self.setCaseSensitivity(Qt.CaseInsensitive)
-        self.setFilterMode(Qt.MatchContains)
-        self.setCompletionMode(QCompleter.PopupCompletion)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
         self.setMaxVisibleItems(8)
+        self.activated[str].connect(self.insertText)
         
         # Настройка анимации
         self.animation = QPropertyAnimation(self.popup(), b"geometry")
@@ -335,9 +814,7 @@ class SmartCompleter(QCompleter):
     
     def update_completions(self, word_list: List[str]):
         """Обновление списка автодополнений"""
-        model = QStringListModel()
-        model.setStringList(word_list)
-        self.setModel(model)
+        self.completion_model.set_items(word_list)
     
     def complete(self, rect):
         """Анимированное отображение автодополнения"""
@@ -383,20 +860,19 @@ class CodeEditor(EnhancedTextEdit):
         # Подключаем сигнал прямоугольного выделения
         self.rectangleSelectionChanged.connect(self._on_rectangle_selection_changed)
     
+    # Конфигурация по умолчанию для неподдерживаемых языков
+    PLAIN_TEXT_CONFIG = LanguageConfig(
+        name="Plain Text",
+        extensions=["txt"],
+        keywords=[],
+        syntax_rules=[],
+        auto_indent=False,
+        brace_auto_close=False
+    )
+    
     def _get_language_config(self, language: str) -> LanguageConfig:
         """Получение конфигурации языка"""
-        config = LanguageProviderFactory.get_language_config(language)
-        if not config:
-            # Конфигурация по умолчанию для неподдерживаемых языков
-            config = LanguageConfig(
-                name="Plain Text",
-                extensions=["txt"],
-                keywords=[],
-                syntax_rules=[],
-                auto_indent=False,
-                brace_auto_close=False
-            )
-        return config
+        return LanguageProviderFactory.get_language_config(language) or self.PLAIN_TEXT_CONFIG
     
     def _setup_editor(self):
         """Настройка базовых параметров редактора"""
@@ -430,22 +906,59 @@ class CodeEditor(EnhancedTextEdit):
         self.tab_width = 4
         self.setTabStopDistance(self.tab_width * self.fontMetrics().width(' '))
         
-        # Подсветка синтаксиса
-        self.highlighter = ModernSyntaxHighlighter(self.document(), self.language_config)
+        # Подсветка синтаксиса: для больших файлов включается ленивый режим
+        self.lazy_highlight_threshold = int(self.settings.get("lazy_highlight_threshold", 20000))
+        self.highlight_slice_ms = int(self.settings.get("highlight_slice_ms", 8))
+        self.highlighter = self._create_highlighter(lazy=False)
+    
+    def _create_highlighter(self, lazy: bool):
+        """Создание подсветчика для текущего языка"""
+        if lazy:
+            return LazySyntaxHighlighter(self, self.language_config, self.highlight_slice_ms)
+        return ModernSyntaxHighlighter(self.document(), self.language_config)
+    
+    def load_text(self, text: str):
+        """Загрузка текста с выбором режима подсветки по его размеру"""
+        lazy = text.count('\n') >= self.lazy_highlight_threshold
+        if lazy != isinstance(self.highlighter, LazySyntaxHighlighter):
+            self._replace_highlighter(lazy)
+        self.setPlainText(text)
+    
+    def _replace_highlighter(self, lazy: bool):
+        """Замена подсветчика; старый нужно отключить, иначе оба будут бороться за состояние блоков"""
+        self.highlighter.setDocument(None)
+        self.highlighter.deleteLater()
+        self.highlighter = self._create_highlighter(lazy)
     
     def _setup_line_numbers(self):
         """Настройка области номеров строк"""
         self.line_number_area = LineNumberArea(self)
+        self.gutter = GutterRenderer()
+        line_color = QColor("#2D3139")
+        line_color.setAlpha(80)
+        self._current_line_format = QTextCharFormat()
+        self._current_line_format.setBackground(line_color)
+        self._current_line_format.setProperty(QTextCharFormat.FullWidthSelection, True)
+        self._gutter_width = 0
+        self._gutter_current_line = self.textCursor().blockNumber()
+        self._gutter_block_count = self.document().blockCount()
+        self.document().contentsChange.connect(self._move_gutter_markers)
         self.blockCountChanged.connect(self.update_line_number_area_width)
         self.updateRequest.connect(self.update_line_number_area)
         self.cursorPositionChanged.connect(self.highlight_current_line)
+        self.cursorPositionChanged.connect(self._update_gutter_current_line)
         
         self.update_line_number_area_width()
         self.highlight_current_line()
     
     def _setup_autocomplete(self):
         """Настройка системы автодополнения"""
-        self.analyzer = CodeAnalyzer(self.language)
+        self.analyzer = IncrementalCodeAnalyzer(self.language)
+        self.analyzer.deferred = True
+        self._reset_completion_index()
+        self._analysis_block_count = self.document().blockCount()
+        self.document().contentsChange.connect(self._on_contents_change_for_analysis)
+        get_analysis_pool().resultsReady.connect(self._on_analysis_results)
         self.completer = SmartCompleter(
             [], 
             self.settings.get("second_color", "#1E1E1E"),
@@ -465,23 +978,81 @@ class CodeEditor(EnhancedTextEdit):
     
     def line_number_area_width(self):
         """Вычисление ширины области номеров строк"""
-        digits = len(str(max(1, self.blockCount())))
-        space = 20 + self.fontMetrics().width('9') * digits
-        return space
+        return self.gutter.width(self.font(), self.blockCount())
     
     def update_line_number_area_width(self):
-        """Обновление ширины области номеров строк"""
-        self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
+        """Обновление ширины области номеров строк (меняется вместе с числом разрядов)"""
+        width = self.line_number_area_width()
+        if width != self._gutter_width:
+            self._gutter_width = width
+            self.setViewportMargins(width, 0, 0, 0)
+            cr = self.contentsRect()
+            self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), width, cr.height()))
     
     def update_line_number_area(self, rect, dy):
-        """Обновление области номеров строк"""
+        """Обновление области номеров строк
+        
+        Прокрутка сдвигает уже нарисованное (перерисовывается только открывшаяся
+        полоса), правки текста перерисовывают свою полосу. Узкие прямоугольники -
+        мигание и перемещение курсора внутри строки - номера не меняют;
+        смену текущей строки обрабатывает _update_gutter_current_line.
+        """
         if dy:
             self.line_number_area.scroll(0, dy)
-        else:
+        elif rect.width() >= self.viewport().width():
             self.line_number_area.update(0, rect.y(), self.line_number_area.width(), rect.height())
-        
-        if rect.contains(self.viewport().rect()):
+    
+    def _update_gutter_current_line(self):
+        """Перерисовать номера прежней и новой текущей строки"""
+        line = self.textCursor().blockNumber()
+        if line == self._gutter_current_line:
+            return
+        previous, self._gutter_current_line = self._gutter_current_line, line
+        self.update_gutter_line(previous)
+        self.update_gutter_line(line)
+    
+    def update_gutter_line(self, block_number: int):
+        """Перерисовать поле одной строки, если она видна"""
+        block = self.document().findBlockByNumber(block_number)
+        if not block.isValid() or not block.isVisible():
+            return
+        geometry = self.blockBoundingGeometry(block).translated(self.contentOffset())
+        if geometry.bottom() >= 0 and geometry.top() <= self.viewport().height():
+            self.line_number_area.update(0, int(geometry.top()), self.line_number_area.width(),
+                                         int(geometry.height()) + 1)
+    
+    def _move_gutter_markers(self, position: int, removed: int, added: int):
+        """Отметки на полях хранятся по номерам строк - сдвигаем их, когда правка меняет число строк"""
+        document = self.document()
+        count = document.blockCount()
+        delta = count - self._gutter_block_count
+        self._gutter_block_count = count
+        if not delta:
+            return
+        block = document.findBlock(position)
+        first = block.blockNumber()
+        # Вставка в начало строки сдвигает вниз и саму строку с ее отметкой
+        if delta > 0 and not removed and position == block.position():
+            first -= 1
+        if self.gutter.move_markers(first, delta):
+            self.line_number_area.update()
+    
+    def set_gutter_marker(self, block_number: int, kind: int, enabled: bool = True):
+        """Поставить или снять отметку на полях (виды - MARKER_* из widgets.GutterRenderer)"""
+        if self.gutter.set_marker(block_number, kind, enabled):
+            self.update_gutter_line(block_number)
+    
+    def clear_gutter_markers(self, kind: int = None):
+        self.gutter.clear_markers(kind)
+        self.line_number_area.update()
+    
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange and hasattr(self, 'gutter'):
+            # Масштаб: цифры растеризуются заново, ширина полей пересчитывается
+            self.gutter.invalidate()
             self.update_line_number_area_width()
+            self.line_number_area.update()
     
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -490,38 +1061,28 @@ class CodeEditor(EnhancedTextEdit):
                                               self.line_number_area_width(), cr.height()))
     
     def line_number_area_paint_event(self, event):
-        """Отрисовка номеров строк"""
-        painter = QPainter(self.line_number_area)
-        painter.fillRect(event.rect(), QColor("#1E1E1E"))
+        """Отрисовка номеров строк в пределах перерисовываемой полосы"""
+        area = self.line_number_area
+        rect = event.rect()
+        width = area.width()
+        gutter = self.gutter
+        gutter.prepare(self.font(), area.devicePixelRatioF())
         
-        # Разделительная линия
-        gradient = QLinearGradient(0, 0, self.line_number_area.width(), 0)
-        gradient.setColorAt(0, QColor("#1E1E1E"))
-        gradient.setColorAt(1, QColor("#2D3139"))
-        painter.fillRect(QRect(self.line_number_area.width() - 2, 0, 2, self.height()), gradient)
+        painter = QPainter(area)
+        gutter.paint_background(painter, rect, width)
         
         block = self.firstVisibleBlock()
         block_number = block.blockNumber()
         top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
         bottom = top + self.blockBoundingRect(block).height()
         
-        current_line = self.textCursor().blockNumber() + 1
-        font_metrics = self.fontMetrics()
-        line_height = font_metrics.height()
+        current_line = self._gutter_current_line
+        rect_top = rect.top()
+        rect_bottom = rect.bottom()
         
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                number = str(block_number + 1)
-                
-                if block_number + 1 == current_line:
-                    painter.setPen(QColor("#FFFFFF"))
-                    painter.setFont(QFont("Cascadia Code", self.font().pointSize(), QFont.Bold))
-                else:
-                    painter.setPen(QColor("#6E7681"))
-                    painter.setFont(self.font())
-                
-                painter.drawText(0, int(top), self.line_number_area.width() - 8, 
-                            int(line_height), Qt.AlignRight, number)
+        while block.isValid() and top <= rect_bottom:
+            if bottom >= rect_top and block.isVisible():
+                gutter.paint_line(painter, block_number, int(top), width, block_number == current_line)
             
             block = block.next()
             top = bottom
@@ -529,34 +1090,94 @@ class CodeEditor(EnhancedTextEdit):
             block_number += 1
 
     def highlight_current_line(self):
-        """Подсветка текущей строки"""
+        """Подсветка текущей строки вместе с выделениями прямоугольника"""
         extra_selections = []
         
         if not self.isReadOnly():
             selection = QTextEdit.ExtraSelection()
-            line_color = QColor("#2D3139")
-            line_color.setAlpha(80)
-            selection.format.setBackground(line_color)
-            selection.format.setProperty(QTextCharFormat.FullWidthSelection, True)
+            selection.format = self._current_line_format
             selection.cursor = self.textCursor()
             selection.cursor.clearSelection()
             extra_selections.append(selection)
         
-        # Добавляем прямоугольные выделения, если они есть
-        if hasattr(self, 'rectangle_selections'):
-            extra_selections.extend(self.rectangle_selections)
-        
+        extra_selections.extend(self.find_selections)
+        extra_selections.extend(self.rectangle_selections)
+        extra_selections.extend(self.multi_cursor_selections)
         self.setExtraSelections(extra_selections)
     
+    def apply_extra_selections(self):
+        self.highlight_current_line()
+    
     def _insert_completion(self, completion: str):
-        """Вставка выбранного автодополнения"""
+        """Вставка выбранного автодополнения вместо набранного префикса"""
         tc = self.textCursor()
-        extra = len(completion) - len(self.completer.completionPrefix())
-        tc.movePosition(QTextCursor.Left)
-        tc.movePosition(QTextCursor.EndOfWord)
-        tc.insertText(completion[-extra:])
+        tc.movePosition(QTextCursor.Left, QTextCursor.KeepAnchor, len(self.completer.completionPrefix()))
+        tc.insertText(completion)
         self.setTextCursor(tc)
     
+    def _reset_completion_index(self):
+        """Индекс дополнения буфера: ключевые слова и элементы провайдера языка"""
+        self.completion_index = CompletionIndex(self.analyzer.defined_names)
+        if self.analyzer.provider:
+            self.completion_index.add(set(self.analyzer.provider.get_completion_items("") or ()))
+    
+    def _completion_candidates(self, prefix: str) -> List[str]:
+        """Лучшие кандидаты из буфера и из индекса символов проекта"""
+        return merge_candidates(
+            self.completion_index.search(prefix),
+            symbol_index.completion_index.search(prefix),
+        )
+    
+    def _on_contents_change_for_analysis(self, position: int, removed: int, added: int):
+        """Пометка измененных строк для инкрементального анализатора"""
+        document = self.document()
+        first = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not first.isValid():
+            return
+        last_number = last.blockNumber() if last.isValid() else document.blockCount() - 1
+        count = document.blockCount()
+        self.analyzer.lines_changed(first.blockNumber(), last_number, count - self._analysis_block_count)
+        self._analysis_block_count = count
+    
+    def _get_lines(self, start: int, end: int) -> List[str]:
+        """Строки документа [start, end)"""
+        count = self.document().blockCount()
+        if min(end, count) - start > count // 2:
+            # Большой диапазон быстрее получить одной копией текста
+            return self.toPlainText().split("\n")[start:end]
+        lines = []
+        block = self.document().findBlockByNumber(start)
+        while block.isValid() and start < end:
+            lines.append(block.text())
+            block = block.next()
+            start += 1
+        return lines
+    
+    def _update_analysis(self):
+        """Разбор только измененных с прошлого раза фрагментов
+
+        Сам разбор фрагментов выполняет общий AnalysisPool, здесь
+        применяются уже готовые результаты.
+        """
+        if self.analyzer.is_dirty():
+            self.analyzer.update(self._get_lines, self.document().blockCount())
+            if self.analyzer.missing:
+                get_analysis_pool().submit(self, self.language, self.analyzer.missing)
+            # В индекс дополнения попадают только изменения
+            added, removed = self.analyzer.pop_changes()
+            self.completion_index.remove(removed)
+            self.completion_index.add(added)
+    
+    def _on_analysis_results(self, owner, results):
+        """Результаты фонового анализа"""
+        if owner is not self:
+            return
+        self.analyzer.add_results(results)
+        self._update_analysis()
+        if self.completer.popup().isVisible():
+            self.completer.update_completions(self._completion_candidates(self.completer.completionPrefix()))
+    
     def _trigger_completion(self):
         """Активация автодополнения"""
         tc = self.textCursor()
@@ -564,23 +1185,27 @@ class CodeEditor(EnhancedTextEdit):
         prefix = tc.selectedText()
         
         if len(prefix) >= 1:
-            self.analyzer.analyze_code(self.toPlainText())
-            self.completer.update_completions(self.analyzer.get_completion_list())
+            self._update_analysis()
+            # Имена из других файлов проекта - из индекса символов
+            self.completer.update_completions(self._completion_candidates(prefix))
             
             self.completer.setCompletionPrefix(prefix)
-            if self.completer.completionCount() > 0:
+            if self.completer.completion_model.rowCount() > 0:
                 self.completer.complete(self.cursorRect())
+                self.completer.popup().setCurrentIndex(self.completer.completionModel().index(0, 0))
     
     def _delayed_analysis(self):
         """Отложенный анализ кода"""
-        self.analyzer.analyze_code(self.toPlainText())
+        self._update_analysis()
     
     def keyPressEvent(self, event):
         """Обработка нажатий клавиш с поддержкой прямоугольного выделения"""
+        if self.selection_mode == SelectionMode.MULTI and self.handle_multi_cursor_key(event):
+            return
         # Если активно прямоугольное выделение, обрабатываем специальные команды
-        if self.selection_mode == SelectionMode.RECTANGLE and self.rectangle_selections:
+        if self.selection_mode == SelectionMode.RECTANGLE and self.rectangle.is_active():
             if event.key() == Qt.Key_Delete or event.key() == Qt.Key_Backspace:
-                self.delete_rectangle_selection()
+                self.delete_rectangle_selection(event.key() == Qt.Key_Backspace)
                 return
             elif event.modifiers() & Qt.ControlModifier and event.key() == Qt.Key_C:
                 self.copy_rectangle_selection()
@@ -592,7 +1217,7 @@ class CodeEditor(EnhancedTextEdit):
                 # Вставка новой строки в каждую строку прямоугольного выделения
                 self.insert_text_in_rectangle("\n")
                 return
-            elif event.text() and not event.modifiers():
+            elif event.text().isprintable() and event.text() and not event.modifiers() & ~Qt.ShiftModifier:
                 # Вставка текста в прямоугольное выделение
                 self.insert_text_in_rectangle(event.text())
                 return
@@ -652,15 +1277,20 @@ class CodeEditor(EnhancedTextEdit):
         """Изменение языка программирования"""
         self.language = language
         self.language_config = self._get_language_config(language)
-        self.analyzer = CodeAnalyzer(language)
-        self.highlighter = ModernSyntaxHighlighter(self.document(), self.language_config)
-        self.analyzer.analyze_code(self.toPlainText())
+        get_analysis_pool().cancel(self)
+        self.analyzer = IncrementalCodeAnalyzer(language)
+        self.analyzer.deferred = True
+        self._reset_completion_index()
+        self._replace_highlighter(isinstance(self.highlighter, LazySyntaxHighlighter))
+        self._update_analysis()
 
 
 class ModernCodeEditor(QWidget):
     """Современный редактор кода с поддержкой различных языков и прямоугольного выделения"""
     
     rectangleSelectionActive = pyqtSignal(bool)
+    # Переход к определению в другом файле: путь, строка (с 1), колонка (с 0)
+    definitionRequested = pyqtSignal(str, int, int)
     
     def __init__(self, parent=None, language: str = "", settings: dict = None):
         super().__init__(parent)
@@ -674,11 +1304,13 @@ class ModernCodeEditor(QWidget):
     
     def _setup_ui(self):
         """Настройка пользовательского интерфейса"""
-        layout = QHBoxLayout(self)
+        layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
         
         self.editor = CodeEditor(language=self.language, settings=self.settings)
+        self.find_panel = FindReplacePanel(self.editor)
+        layout.addWidget(self.find_panel)
         layout.addWidget(self.editor)
     
     def _setup_status_bar(self):
@@ -713,6 +1345,7 @@ class ModernCodeEditor(QWidget):
         self.editor.cursorPositionChanged.connect(self.update_status_bar)
         self.editor.textChanged.connect(self.update_status_bar)
         self.editor.rectangleSelectionChanged.connect(self._on_rectangle_selection_status)
+        self.editor.multiCursorChanged.connect(self.update_status_bar)
     
     def _on_rectangle_selection_status(self, active: bool):
         """Обновление статуса прямоугольного выделения"""
@@ -727,13 +1360,15 @@ class ModernCodeEditor(QWidget):
         lines = self.editor.document().blockCount()
         
         # Информация о выделении
-        if self.editor.selection_mode == SelectionMode.RECTANGLE and self.editor.rectangle_selections:
-            rect_info = f" [RECT: {len(self.editor.rectangle_selections)} lines]"
+        if self.editor.selection_mode == SelectionMode.RECTANGLE and self.editor.rectangle.is_active():
+            rect_info = f" [RECT: {self.editor.rectangle.line_count()} lines]"
+        elif self.editor.selection_mode == SelectionMode.MULTI:
+            rect_info = f" [{len(self.editor.multi_cursor.carets)} cursors]"
         else:
             rect_info = ""
         
         # Информация о режиме
-        mode = "RECT" if self.editor.selection_mode == SelectionMode.RECTANGLE else "INS"
+        mode = {SelectionMode.RECTANGLE: "RECT", SelectionMode.MULTI: "MULTI"}.get(self.editor.selection_mode, "INS")
         
         self.status_bar.setText(f"Ln {line}, Col {column} | Lines: {lines} | Mode: {mode}{rect_info}")
     
@@ -752,6 +1387,13 @@ class ModernCodeEditor(QWidget):
             "Alt+X": self._cut_rectangle,
             "Alt+V": self._paste_rectangle,
             "Alt+Delete": self._delete_rectangle,
+            "Ctrl+Alt+D": self.editor.add_cursor_at_next_occurrence,
+            "Ctrl+Shift+L": self.editor.add_cursors_at_all_occurrences,
+            "Ctrl+F": self.find_panel.show_find,
+            "Ctrl+H": lambda: self.find_panel.show_find(replace=True),
+            "F3": self.find_panel.find_next,
+            "Shift+F3": self.find_panel.find_previous,
+            "F12": self._go_to_definition,
         }
         
         for key_sequence, callback in shortcuts.items():
@@ -848,12 +1490,11 @@ class ModernCodeEditor(QWidget):
         pass
     
     def _cancel_rectangle_selection(self):
-        """Отмена прямоугольного выделения"""
-        self.editor.selection_mode = SelectionMode.NORMAL
-        if hasattr(self.editor, 'rectangle_selections'):
-            self.editor.rectangle_selections.clear()
-        self.editor.setExtraSelections([])
-        self.rectangleSelectionActive.emit(False)
+        """Отмена прямоугольного выделения (и закрытие панели поиска)"""
+        if self.find_panel.isVisible():
+            self.find_panel.close_panel()
+        self.editor.clear_rectangle_selection()
+        self.editor.clear_multi_cursor()
         self.update_status_bar()
     
     def _copy_rectangle(self):
@@ -875,10 +1516,50 @@ class ModernCodeEditor(QWidget):
         """Удаление прямоугольного выделения"""
         self.editor.delete_rectangle_selection()
     
+    def _go_to_definition(self):
+        """Переход к определению имени под курсором по индексу символов проекта"""
+        cursor = self.editor.textCursor()
+        cursor.select(QTextCursor.WordUnderCursor)
+        name = cursor.selectedText()
+        if not name:
+            return
+        
+        definitions = symbol_index.find_definitions(name)
+        if not definitions:
+            return
+        
+        # Определение в этом же файле приоритетнее
+        current = str(self.file_path.resolve()) if self.file_path else None
+        local = [symbol for symbol in definitions
+                 if current and Path(symbol.path).resolve() == Path(current)]
+        symbol = local[0] if local else definitions[0]
+        if local:
+            self.go_to_position(symbol.line, symbol.column)
+        else:
+            self.definitionRequested.emit(symbol.path, symbol.line, symbol.column)
+    
+    def go_to_position(self, line: int, column: int = 0):
+        """Перемещение курсора на строку (с 1) и колонку (с 0)"""
+        block = self.editor.document().findBlockByNumber(max(0, line - 1))
+        if not block.isValid():
+            return
+        cursor = QTextCursor(block)
+        cursor.movePosition(QTextCursor.Right, QTextCursor.MoveAnchor, min(column, block.length() - 1))
+        self.editor.setTextCursor(cursor)
+        self.editor.centerCursor()
+        self.editor.setFocus()
+    
     def set_file_path(self, file_path: str):
         """Установка пути к файлу и автоматическое определение языка"""
         self.file_path = Path(file_path)
         
+        # Файлы без расширения (Dockerfile, Gemfile) определяются по имени
+        language = LanguageProviderFactory.get_language_by_filename(self.file_path.name)
+        if language:
+            if language != self.language:
+                self.set_language(language)
+            return
+        
         file_extension = self.file_path.suffix.lower()
         if file_extension:
             file_extension = file_extension[1:]
@@ -888,10 +1569,9 @@ class ModernCodeEditor(QWidget):
     
     def set_language_by_extension(self, extension: str):
         """Установка языка по расширению файла"""
-        provider = LanguageProviderFactory.get_provider_by_extension(extension)
-        if provider:
-            config = provider.get_config()
-            self.set_language(config.name.lower())
+        language = LanguageProviderFactory.get_language_by_extension(extension)
+        if language:
+            self.set_language(language)
     
     def set_language(self, language: str):
         """Явная установка языка"""
@@ -908,6 +1588,7 @@ class ModernCodeEditor(QWidget):
         try:
             if self.file_path:
                 self.file_path.write_text(self.get_code(), encoding='utf-8')
+                symbol_index.update_files([str(self.file_path)])
                 return True
             return False
         except Exception as e:
@@ -926,7 +1607,11 @@ class ModernCodeEditor(QWidget):
         return self.editor.toPlainText()
     
     def set_code(self, code: str):
-        self.editor.setPlainText(code)
+        self.editor.load_text(code)
+
+    def close_file(self):
+        """Вызывается при закрытии вкладки: пул анализа перестает держать редактор"""
+        get_analysis_pool().cancel(self.editor)
 
 
 # Демонстрационный пример использования
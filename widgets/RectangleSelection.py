@@ -0,0 +1,167 @@
+# widgets/RectangleSelection.py
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PyQt5.QtGui import QColor, QTextBlock, QTextCharFormat, QTextCursor, QTextDocument
+from PyQt5.QtWidgets import QTextEdit
+
+
+class RectangleSelection:
+    """Прямоугольное (колоночное) выделение: строки first_line..last_line,
+    колонки start_column..end_column
+
+    Прямоугольник хранится только границами, поэтому его изменение при
+    движении мыши не зависит от числа строк. ExtraSelection (с общим
+    форматом) создаются лишь для видимых строк, которые запрашивает
+    selections(), и переиспользуются, пока не изменились колонки; если
+    границы не изменились, не делается ничего. Строки обходятся по цепочке
+    block.next(). Правки всех строк выполняются одним курсором внутри одного
+    beginEditBlock: одно действие отмены и одно уведомление contentsChange
+    для подсветки и анализа. Строки короче start_column в выделение не входят.
+    """
+
+    def __init__(self, document: QTextDocument, background: str = "#264F78", foreground: str = "#FFFFFF"):
+        self.document = document
+        self.format = QTextCharFormat()
+        self.format.setBackground(QColor(background))
+        self.format.setForeground(QColor(foreground))
+
+        self.first_line = -1
+        self.last_line = -1
+        self.start_column = 0
+        self.end_column = 0
+        # Номер строки -> выделение (только для показанных строк)
+        self._selections: Dict[int, Optional[QTextEdit.ExtraSelection]] = {}
+
+    def is_active(self) -> bool:
+        return self.first_line >= 0
+
+    def is_collapsed(self) -> bool:
+        """Выделение свернуто в каретки (нулевая ширина)"""
+        return self.start_column == self.end_column
+
+    def line_count(self) -> int:
+        return self.last_line - self.first_line + 1 if self.is_active() else 0
+
+    def bounds(self) -> Tuple[int, int, int, int]:
+        return self.first_line, self.last_line, self.start_column, self.end_column
+
+    def clear(self):
+        self.first_line = self.last_line = -1
+        self.start_column = self.end_column = 0
+        self._selections = {}
+
+    def set_rect(self, first_line: int, last_line: int, start_column: int, end_column: int) -> bool:
+        """Задать прямоугольник; False - если он не изменился"""
+        if first_line > last_line:
+            first_line, last_line = last_line, first_line
+        if start_column > end_column:
+            start_column, end_column = end_column, start_column
+        last_line = min(last_line, self.document.blockCount() - 1)
+        bounds = (first_line, last_line, start_column, end_column)
+        if bounds == self.bounds():
+            return False
+        if (start_column, end_column) != (self.start_column, self.end_column):
+            self._selections = {}
+        self.first_line, self.last_line, self.start_column, self.end_column = bounds
+        return True
+
+    def selections(self, first_visible: int, last_visible: int) -> List[QTextEdit.ExtraSelection]:
+        """Выделения строк прямоугольника из диапазона first_visible..last_visible"""
+        first = max(first_visible, self.first_line)
+        last = min(last_visible, self.last_line)
+        if first > last:
+            self._selections = {}
+            return []
+
+        previous = self._selections
+        selections = {}
+        block = None
+        for line in range(first, last + 1):
+            if line in previous:
+                selections[line] = previous[line]
+                block = None
+                continue
+            block = block.next() if block is not None else self.document.findBlockByNumber(line)
+            selections[line] = self._make_selection(block)
+        self._selections = selections
+        return [selection for selection in selections.values() if selection is not None]
+
+    def _make_selection(self, block: QTextBlock) -> Optional[QTextEdit.ExtraSelection]:
+        length = block.length() - 1
+        if not block.isValid() or self.start_column > length:
+            return None
+        position = block.position()
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(position + self.start_column)
+        cursor.setPosition(position + min(self.end_column, length), QTextCursor.KeepAnchor)
+        selection = QTextEdit.ExtraSelection()
+        selection.cursor = cursor
+        selection.format = self.format
+        return selection
+
+    def line_ranges(self, start_column: Optional[int] = None,
+                    end_column: Optional[int] = None) -> Iterator[Tuple[QTextBlock, int, int]]:
+        """(блок, начало, конец) - позиции выделенной части каждой строки в документе"""
+        start_column = self.start_column if start_column is None else start_column
+        end_column = self.end_column if end_column is None else end_column
+        block = self.document.findBlockByNumber(self.first_line)
+        line = self.first_line
+        while block.isValid() and line <= self.last_line:
+            length = block.length() - 1
+            if start_column <= length:
+                position = block.position()
+                yield block, position + start_column, position + min(end_column, length)
+            block = block.next()
+            line += 1
+
+    def text(self) -> str:
+        return "\n".join(block.text()[start - block.position():end - block.position()]
+                         for block, start, end in self.line_ranges())
+
+    def replace(self, text: str):
+        """Заменить выделенную часть каждой строки; строки text распределяются
+        по строкам выделения, последняя повторяется. После вставки одной строки
+        выделение сворачивается в каретки сразу за ней (ввод продолжается в колонке)"""
+        if not self.is_active():
+            return
+        lines_to_insert = text.split('\n')
+        ranges = [(start, end) for _, start, end in self.line_ranges()]
+        self._edit([(start, end, lines_to_insert[min(index, len(lines_to_insert) - 1)])
+                    for index, (start, end) in enumerate(ranges)])
+
+        column = self.start_column + len(lines_to_insert[0]) if len(lines_to_insert) == 1 else self.start_column
+        self._reset_columns(column)
+
+    def delete(self, backward: bool = True):
+        """Удалить выделенную часть строк; если выделение свернуто в каретки -
+        символ перед ними (backward) или после них"""
+        if not self.is_active():
+            return
+        start_column, end_column = self.start_column, self.end_column
+        if start_column == end_column:
+            if backward:
+                if start_column == 0:
+                    return
+                start_column -= 1
+            else:
+                end_column += 1
+        self._edit([(start, end, "") for _, start, end in self.line_ranges(start_column, end_column) if start < end])
+        self._reset_columns(start_column)
+
+    def _edit(self, changes: List[Tuple[int, int, str]]):
+        """Заменить участки [start, end) текстом; позиции вычислены до правки,
+        поэтому строки обрабатываются снизу вверх - правка строки сдвигает
+        только следующие за ней"""
+        # Курсоры выделений документ сдвигал бы при каждой правке
+        self._selections = {}
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        for start, end, text in reversed(changes):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        cursor.endEditBlock()
+
+    def _reset_columns(self, column: int):
+        self.set_rect(self.first_line, self.last_line, column, column)
+        self._selections = {}
@@ -0,0 +1,227 @@
+# widgets/TerminalOutput.py
+from typing import Dict, List, Optional, Tuple
+
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextBlockUserData, QTextCharFormat, QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit
+
+from utils.OutputClassifier import COMMAND, ERROR, SUCCESS, WARNING, classify_line
+
+
+# Строк прокрутки по умолчанию
+DEFAULT_SCROLLBACK_LINES = 10000
+# Интервал вывода накопленного текста (~60 кадров в секунду)
+FLUSH_INTERVAL_MS = 16
+
+
+class TerminalOutputView(QPlainTextEdit):
+    """Вывод терминала с пакетной вставкой и ограниченной прокруткой
+
+    append_output() только складывает текст в буфер; раз в FLUSH_INTERVAL_MS
+    буфер вставляется в документ одной правкой (по одному insertText на
+    каждый подряд идущий цвет). Документ хранит не больше scrollback_lines
+    строк (maximumBlockCount), старые строки отбрасываются. Если программа
+    выводит быстрее, чем идет отрисовка, в буфере тоже остаются только
+    последние строки - они все равно вытеснили бы предыдущие.
+    Прокрутка следует за выводом, только если область была прокручена до конца.
+    """
+
+    def __init__(self, parent=None, scrollback_lines: int = DEFAULT_SCROLLBACK_LINES):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(scrollback_lines)
+
+        self._pending: List[Tuple[Optional[str], str]] = []
+        self._pending_lines = 0
+        self._formats: Dict[Optional[str], QTextCharFormat] = {None: QTextCharFormat()}
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    @property
+    def scrollback_lines(self) -> int:
+        return self.maximumBlockCount()
+
+    def set_scrollback_lines(self, lines: int):
+        self.setMaximumBlockCount(lines)
+
+    def append_output(self, text: str, color: Optional[str] = None):
+        """Добавить текст; color - цвет текста (по умолчанию цвет виджета)"""
+        if not text:
+            return
+        if self._pending and self._pending[-1][0] == color:
+            self._pending[-1] = (color, self._pending[-1][1] + text)
+        else:
+            self._pending.append((color, text))
+        self._pending_lines += text.count('\n')
+        if self._pending_lines > 2 * self.scrollback_lines:
+            self._trim_pending()
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def _trim_pending(self):
+        """Оставить в буфере примерно scrollback_lines последних строк"""
+        excess = self._pending_lines - self.scrollback_lines
+        while excess > 0 and self._pending:
+            color, text = self._pending[0]
+            lines = text.count('\n')
+            if lines <= excess:
+                self._pending.pop(0)
+                self._pending_lines -= lines
+                excess -= lines
+                continue
+            # Отбрасываем начало порции до нужной строки
+            cut = -1
+            for _ in range(excess):
+                cut = text.index('\n', cut + 1)
+            self._pending[0] = (color, text[cut + 1:])
+            self._pending_lines -= excess
+            excess = 0
+
+    def flush(self):
+        """Вставить накопленный текст в документ"""
+        self.flush_timer.stop()
+        if not self._pending:
+            return
+        # Новый текст вытесняет весь документ: очистка дешевле удаления строк по одной
+        replace = self._pending_lines >= self.scrollback_lines
+        if replace:
+            self._trim_pending()
+        pending, self._pending, self._pending_lines = self._pending, [], 0
+
+        scrollbar = self.verticalScrollBar()
+        follow = replace or scrollbar.value() >= scrollbar.maximum()
+
+        if replace:
+            self.document().clear()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for color, text in pending:
+            cursor.insertText(text, self._format(color))
+        cursor.endEditBlock()
+
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def _format(self, color: Optional[str]) -> QTextCharFormat:
+        text_format = self._formats.get(color)
+        if text_format is None:
+            text_format = self._formats[color] = QTextCharFormat()
+            text_format.setForeground(QColor(color))
+        return text_format
+
+    def clear(self):
+        self._pending.clear()
+        self._pending_lines = 0
+        self.flush_timer.stop()
+        super().clear()
+
+
+class TerminalLineData(QTextBlockUserData):
+    """Классификация строки, сохраненная в блоке документа (для переходов по ссылкам)"""
+
+    def __init__(self, line_class):
+        super().__init__()
+        self.line_class = line_class
+
+
+class TerminalHighlighter(QSyntaxHighlighter):
+    """Подсветка вывода терминала
+
+    Форматы создаются один раз; строка классифицируется за один проход
+    (utils.OutputClassifier.classify_line, с кешем повторяющихся строк),
+    результат хранится в данных блока. Диагностики компиляторов
+    (file:line:col: error) подчеркиваются как ссылки.
+    """
+
+    def __init__(self, document):
+        super().__init__(document)
+
+        # Ошибки (красный)
+        error_format = QTextCharFormat()
+        error_format.setForeground(QColor("#FF6B6B"))
+        error_format.setFontWeight(QFont.Bold)
+
+        # Предупреждения (желтый)
+        warning_format = QTextCharFormat()
+        warning_format.setForeground(QColor("#FFD93D"))
+
+        # Успех (зеленый)
+        success_format = QTextCharFormat()
+        success_format.setForeground(QColor("#6BCF7F"))
+
+        # Команды (бирюзовый)
+        command_format = QTextCharFormat()
+        command_format.setForeground(QColor("#3BC9DB"))
+
+        self.line_formats = {
+            ERROR: error_format,
+            WARNING: warning_format,
+            SUCCESS: success_format,
+            COMMAND: command_format,
+        }
+
+        # Пути (синий)
+        self.path_format = QTextCharFormat()
+        self.path_format.setForeground(QColor("#4DABF7"))
+
+        # Ссылки на место в файле
+        self.link_format = QTextCharFormat()
+        self.link_format.setForeground(QColor("#4DABF7"))
+        self.link_format.setFontUnderline(True)
+
+        # Номера строк (серый)
+        self.line_number_format = QTextCharFormat()
+        self.line_number_format.setForeground(QColor("#868E96"))
+
+    def highlightBlock(self, text):
+        line_class = classify_line(text)
+        self.setCurrentBlockUserData(TerminalLineData(line_class))
+
+        line_format = self.line_formats.get(line_class.kind)
+        if line_format is not None:
+            self.setFormat(0, len(text), line_format)
+        for start, end in line_class.paths:
+            self.setFormat(start, end - start, self.path_format)
+        if line_class.number:
+            self.setFormat(0, line_class.number, self.line_number_format)
+        diagnostic = line_class.diagnostic
+        if diagnostic is not None:
+            self.setFormat(diagnostic.start, diagnostic.end - diagnostic.start, self.link_format)
+
+
+class DiagnosticOutputView(TerminalOutputView):
+    """Вывод терминала с подсветкой строк и ссылками на диагностики компиляторов"""
+
+    diagnosticActivated = pyqtSignal(str, int, int)  # путь, строка, колонка
+
+    def __init__(self, parent=None, scrollback_lines=DEFAULT_SCROLLBACK_LINES):
+        super().__init__(parent, scrollback_lines)
+        self.highlighter = TerminalHighlighter(self.document())
+        self.viewport().setMouseTracking(True)
+
+    def diagnostic_at(self, pos):
+        """Диагностика под точкой pos области просмотра или None"""
+        cursor = self.cursorForPosition(pos)
+        data = cursor.block().userData()
+        if isinstance(data, TerminalLineData) and data.line_class.diagnostic is not None:
+            diagnostic = data.line_class.diagnostic
+            if diagnostic.start <= cursor.positionInBlock() < diagnostic.end:
+                return diagnostic
+        return None
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        link = not event.buttons() and self.diagnostic_at(event.pos()) is not None
+        self.viewport().setCursor(Qt.PointingHandCursor if link else Qt.IBeamCursor)
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if event.button() == Qt.LeftButton and not self.textCursor().hasSelection():
+            diagnostic = self.diagnostic_at(event.pos())
+            if diagnostic is not None:
+                self.diagnosticActivated.emit(diagnostic.path, diagnostic.line, diagnostic.column)
@@ -1,26 +1,51 @@
 # widgets/TerminalWidget.py
+import codecs
 import subprocess
 import sys
 import os
 import platform
 
 from PyQt5.QtCore import Qt, QProcess, QTimer, pyqtSignal
-from PyQt5.QtGui import QFont, QColor, QTextCharFormat, QKeySequence, QTextCursor
+from PyQt5.QtGui import QFont, QColor, QTextCharFormat, QKeySequence
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
-                            QTextEdit, QLineEdit, QLabel, QPushButton, 
+                            QLineEdit, QLabel, QPushButton, 
                             QShortcut, QTabWidget)
 
+from .PtyTerminalView import PTY_TERMINAL_AVAILABLE, PtyTerminalView
+from .TerminalOutput import DEFAULT_SCROLLBACK_LINES, DiagnosticOutputView
+
+
+def resolve_diagnostic_path(file_path, pid, working_dir):
+    """Путь из диагностики относительно текущей директории shell (если ее видно в /proc)"""
+    if not os.path.isabs(file_path):
+        base = working_dir
+        if pid:
+            try:
+                base = os.readlink(f"/proc/{pid}/cwd")
+            except OSError:
+                pass
+        file_path = os.path.normpath(os.path.join(base, file_path))
+    return file_path if os.path.isfile(file_path) else None
+
+
 class TerminalTab(QWidget):
     """Один таб терминала"""
     
     output_received = pyqtSignal(str)
+    diagnosticActivated = pyqtSignal(str, int, int)  # путь, строка, колонка
     
-    def __init__(self, tab_id, title="Terminal", working_dir=None, parent=None):
+    def __init__(self, tab_id, title="Terminal", working_dir=None, parent=None,
+                 scrollback_lines=DEFAULT_SCROLLBACK_LINES):
         super().__init__(parent)
         self.tab_id = tab_id
         self.title = title
         self.working_dir = working_dir or os.getcwd()
+        self.scrollback_lines = scrollback_lines
         self.process = None
+        # Порции вывода могут разрывать многобайтные символы
+        encoding = 'cp866' if platform.system() == 'Windows' else 'utf-8'
+        self.stdout_decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self.stderr_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
         
         self.setup_ui()
         self.start_shell()
@@ -31,10 +56,10 @@ class TerminalTab(QWidget):
         layout.setSpacing(0)
         
         # Terminal output
-        self.output_text = QTextEdit()
-        self.output_text.setReadOnly(True)
+        self.output_text = DiagnosticOutputView(scrollback_lines=self.scrollback_lines)
+        self.output_text.diagnosticActivated.connect(self.open_diagnostic)
         self.output_text.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1E1E1E;
                 color: #CCCCCC;
                 font-family: 'Consolas', 'Monaco', monospace;
@@ -48,6 +73,8 @@ class TerminalTab(QWidget):
         
     def start_shell(self):
         """Запускает shell"""
+        self.stdout_decoder.reset()
+        self.stderr_decoder.reset()
         self.process = QProcess()
         self.process.setWorkingDirectory(self.working_dir)
         
@@ -64,32 +91,17 @@ class TerminalTab(QWidget):
         """Читает stdout"""
         if self.process:
             data = self.process.readAllStandardOutput().data()
-            try:
-                if platform.system() == 'Windows':
-                    text = data.decode('cp866')
-                else:
-                    text = data.decode('utf-8')
-                self.append_output(text)
-            except:
-                self.append_output("Error [Fail decode]\n")
+            self.append_output(self.stdout_decoder.decode(data))
                 
     def read_error(self):
         """Читает stderr"""
         if self.process:
             data = self.process.readAllStandardError().data()
-            try:
-                text = data.decode('utf-8', errors='replace')
-                self.append_output(text)
-            except:
-                self.append_output("[Error]\n")
+            self.append_output(self.stderr_decoder.decode(data))
                 
     def append_output(self, text):
-        """Добавляет текст в вывод"""
-        cursor = self.output_text.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        cursor.insertText(text)
-        self.output_text.setTextCursor(cursor)
-        self.output_text.ensureCursorVisible()
+        """Добавляет текст в вывод (вставляется пакетом при следующей отрисовке)"""
+        self.output_text.append_output(text)
         
     def write_input(self, text):
         """Отправляет команду в shell"""
@@ -105,6 +117,12 @@ class TerminalTab(QWidget):
             return True
         return False
         
+    def open_diagnostic(self, file_path, line, column):
+        pid = self.process.processId() if self.process else 0
+        file_path = resolve_diagnostic_path(file_path, pid, self.working_dir)
+        if file_path:
+            self.diagnosticActivated.emit(file_path, line, column)
+            
     def clear(self):
         """Очищает терминал"""
         self.output_text.clear()
@@ -115,11 +133,61 @@ class TerminalTab(QWidget):
             self.process.kill()
 
 
+class PtyTerminalTab(QWidget):
+    """Таб терминала на псевдотерминале: цвета, курсор и ввод как в обычном терминале"""
+    
+    diagnosticActivated = pyqtSignal(str, int, int)  # путь, строка, колонка
+    
+    def __init__(self, tab_id, title="Terminal", working_dir=None, parent=None,
+                 scrollback_lines=DEFAULT_SCROLLBACK_LINES):
+        super().__init__(parent)
+        self.tab_id = tab_id
+        self.title = title
+        self.working_dir = working_dir or os.getcwd()
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.view = PtyTerminalView(self, scrollback_lines)
+        self.view.diagnosticActivated.connect(self.open_diagnostic)
+        layout.addWidget(self.view)
+        
+        self.start_shell()
+        
+    def start_shell(self):
+        """Запускает shell в псевдотерминале"""
+        if not self.view.is_running():
+            self.view.start([os.environ.get('SHELL', '/bin/bash')], self.working_dir)
+            
+    def write_input(self, text):
+        """Отправляет команду в shell (эхо выводит сам терминал)"""
+        if self.view.is_running():
+            self.view.send_text(f"{text}\r")
+            return True
+        return False
+        
+    def open_diagnostic(self, file_path, line, column):
+        file_path = resolve_diagnostic_path(file_path, self.view.process.pid, self.working_dir)
+        if file_path:
+            self.diagnosticActivated.emit(file_path, line, column)
+            
+    def interrupt(self):
+        self.view.interrupt()
+        
+    def clear(self):
+        self.view.clear()
+        
+    def kill(self):
+        self.view.terminate()
+
+
 class TerminalWidget(QWidget):
     """Виджет терминала с вкладками"""
     
-    def __init__(self, parent=None):
+    diagnosticActivated = pyqtSignal(str, int, int)  # путь, строка, колонка
+    
+    def __init__(self, parent=None, scrollback_lines=DEFAULT_SCROLLBACK_LINES):
         super().__init__(parent)
+        self.scrollback_lines = scrollback_lines
         self.tabs = {}
         self.next_tab_id = 1
         self.current_tab = None
@@ -186,7 +254,9 @@ class TerminalWidget(QWidget):
         tab_id = self.next_tab_id
         self.next_tab_id += 1
         
-        tab = TerminalTab(tab_id, f"Terminal {tab_id}")
+        tab_class = PtyTerminalTab if PTY_TERMINAL_AVAILABLE else TerminalTab
+        tab = tab_class(tab_id, f"Terminal {tab_id}", scrollback_lines=self.scrollback_lines)
+        tab.diagnosticActivated.connect(self.diagnosticActivated)
         self.tabs[tab_id] = tab
         self.tab_widget.addTab(tab, f"Terminal {tab_id}")
         self.tab_widget.setCurrentIndex(self.tab_widget.count() - 1)
@@ -251,7 +321,9 @@ class TerminalWidget(QWidget):
         """Отправляет Ctrl+C"""
         if self.current_tab in self.tabs:
             tab = self.tabs[self.current_tab]
-            if platform.system() == 'Windows':
+            if hasattr(tab, 'interrupt'):
+                tab.interrupt()
+            elif platform.system() == 'Windows':
                 tab.write_input("\x03")
             else:
                 tab.write_input("\x03")